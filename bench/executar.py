@@ -0,0 +1,295 @@
+from src.interpreter import Interpreter
+from src.Saida import Saida
+from src.Perfil import Perfil
+from src.Substituicao import verificaPolitica
+from src.constantes import *
+from bench.geradores import GERADORES
+from bench.geradores import HIERARQUIA
+from bench.geradores import escreverCarga
+from argparse import ArgumentParser
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from traceback import print_exc
+import platform
+import json
+import sys
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Versão do formato da linha de base.
+VERSAO_LINHA_BASE = 2
+
+# Opções que precisam ser iguais às da linha de base para comparar.
+OPCOES_COMPARAVEIS = ('acessos', 'semente', 'streaming', 'somenteTags', 'armazenamento', 'politica')
+
+# Motores de armazenamento das caches, pelo nome da opção --armazenamento.
+ARMAZENAMENTOS = {'objetos': STORAGE_OBJECTS, 'array': STORAGE_ARRAY}
+
+
+# Pico de memória residente do processo, em KB (None se a plataforma
+# não informa).
+#
+# @return int.
+#
+def rssPico():
+    if resource == None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if sys.platform == 'darwin' else pico
+
+
+# Executa uma carga uma vez, do arquivo até o relatório, sem mensagens dos
+# comandos. Roda em um processo novo para o pico de memória ser só dela,
+# então recebe e devolve só dados simples.
+#
+# @param tarefa : tuple - (caminho da carga, streaming, somenteTags, nome do
+#                         armazenamento, política de substituição de todos os níveis).
+#
+# @return dict - tempos em segundos, acessos e pico de memória em KB.
+#
+def medir(tarefa):
+    caminho, streaming, somenteTags, armazenamento, politica = tarefa
+    perfil = Perfil()
+
+    # a política vai nos argumentos das caches da hierarquia das cargas.
+    configuracao = {cmd: args + [politica] for cmd, args in HIERARQUIA if cmd.startswith('cl')}
+
+    inicio = perf_counter()
+    with open(caminho, 'r') as arquivo:
+        simulador = Interpreter(arquivo, ARMAZENAMENTOS[armazenamento], streaming=streaming,
+                                saida=Saida(SAIDA_SILENCIOSA), configuracao=configuracao,
+                                somenteTags=somenteTags, perfil=perfil)
+        simulador.fechar()
+    total = perf_counter() - inicio
+
+    medidas = perfil.getMedidas()
+    return {
+        'total': total,
+        'leitura': medidas['leitura'],
+        'construcao': medidas.get('construção', 0.0),
+        'execucao': medidas.get('execução', 0.0),
+        'acessos': perfil.getNumAcessos(),
+        'rssPicoKB': rssPico(),
+    }
+
+
+# Executa uma carga várias vezes, cada uma em um processo novo, e fica com
+# o menor tempo de cada fase e o maior pico de memória.
+#
+# @param tarefa : tuple - ver medir.
+# @param repeticoes : int - número de execuções.
+#
+# @return dict - medidas de medir mais 'acessosPorSegundo' (na execução).
+#
+def medirCarga(tarefa, repeticoes):
+    execucoes = []
+    for i in range(repeticoes):
+        with get_context('spawn').Pool(1) as pool:
+            execucoes.append(pool.apply(medir, (tarefa,)))
+
+    resultado = {x: min(e[x] for e in execucoes) for x in ('total', 'leitura', 'construcao', 'execucao')}
+    resultado['acessos'] = execucoes[0]['acessos']
+    picos = [e['rssPicoKB'] for e in execucoes if e['rssPicoKB'] != None]
+    resultado['rssPicoKB'] = max(picos) if picos else None
+    execucao = resultado['execucao']
+    resultado['acessosPorSegundo'] = resultado['acessos'] / execucao if execucao > 0 else 0.0
+    return resultado
+
+
+# Compara os resultados com a linha de base. Uma carga regride se os
+# acessos por segundo caírem, ou o tempo total ou o pico de memória
+# subirem, mais que o limite relativo.
+#
+# @param resultados : dict - carga -> medidas (ver medirCarga).
+# @param linhaBase : dict - conteúdo do arquivo de linha de base.
+# @param opcoes : dict - opções da execução atual.
+# @param limite : float - variação relativa tolerada (0.1 = 10%).
+#
+# @raise ValueError.
+#
+# @return list - mensagens das regressões.
+#
+def comparar(resultados, linhaBase, opcoes, limite):
+    if linhaBase.get('versao') != VERSAO_LINHA_BASE:
+        raise ValueError('Versão da linha de base não suportada.')
+
+    for x in OPCOES_COMPARAVEIS:
+        if linhaBase['opcoes'].get(x) != opcoes[x]:
+            raise ValueError('A linha de base foi gravada com {} = {}, não {}.'.format(
+                x, linhaBase['opcoes'].get(x), opcoes[x]
+                )
+            )
+
+    regressoes = []
+    for carga, atual in resultados.items():
+        base = linhaBase['cargas'].get(carga)
+        if base == None:
+            continue
+
+        if atual['acessosPorSegundo'] < base['acessosPorSegundo'] * (1 - limite):
+            regressoes.append('{}: {:.0f} acessos/s, linha de base {:.0f}.'.format(
+                carga, atual['acessosPorSegundo'], base['acessosPorSegundo']
+            ))
+        if atual['total'] > base['total'] * (1 + limite):
+            regressoes.append('{}: {:.4f} s no total, linha de base {:.4f} s.'.format(
+                carga, atual['total'], base['total']
+            ))
+        if atual['rssPicoKB'] != None and base['rssPicoKB'] != None \
+                and atual['rssPicoKB'] > base['rssPicoKB'] * (1 + limite):
+            regressoes.append('{}: pico de {} KB, linha de base {} KB.'.format(
+                carga, atual['rssPicoKB'], base['rssPicoKB']
+            ))
+
+    return regressoes
+
+
+# Variação relativa para a tabela.
+#
+def variacao(atual, base):
+    return '{:+.1f}%'.format(100 * (atual / base - 1)) if base else '-'
+
+
+# Gera as cargas, mede cada uma e grava ou compara a linha de base.
+#
+# @param cargas : list - nomes das cargas (ver GERADORES).
+# @param opcoes : dict - 'acessos', 'semente', 'streaming', 'somenteTags',
+#                        'armazenamento' (ver ARMAZENAMENTOS) e 'politica'.
+# @param repeticoes : int - execuções por carga.
+# @param caminhoLinhaBase : str - arquivo JSON da linha de base.
+# @param gravar : bool - grava a linha de base em vez de comparar.
+# @param limite : float - variação relativa tolerada (0.1 = 10%).
+# @param diretorio : str - onde guardar as cargas geradas (None usa um
+#                          diretório temporário).
+#
+# @return bool - se não houve regressão.
+#
+def main(cargas, opcoes, repeticoes, caminhoLinhaBase, gravar, limite, diretorio=None):
+    verificaPolitica(opcoes['politica'])
+
+    linhaBase = None
+    if not gravar:
+        with open(caminhoLinhaBase, 'r') as arquivo:
+            linhaBase = json.load(arquivo)
+
+    temporario = None
+    if diretorio == None:
+        temporario = TemporaryDirectory()
+        diretorio = temporario.name
+    else:
+        os.makedirs(diretorio, exist_ok=True)
+
+    linha = '+--------------+-----------+-----------+-----------+-----------+-----------+-------------+-----------+'
+    print(linha)
+    print('| Carga        |   Leitura | Construç. |  Execução |     Total |   Acessos |   Acessos/s |  RSS (KB) |')
+    print(linha)
+
+    resultados = {}
+    try:
+        for carga in cargas:
+            caminho = os.path.join(diretorio, carga + '.txt')
+            with open(caminho, 'w') as arquivo:
+                escreverCarga(arquivo, GERADORES[carga](opcoes['acessos'], opcoes['semente']))
+
+            tarefa = (caminho, opcoes['streaming'], opcoes['somenteTags'], opcoes['armazenamento'],
+                      opcoes['politica'])
+            r = medirCarga(tarefa, repeticoes)
+            resultados[carga] = r
+            print('| {:<12} | {:>9.4f} | {:>9.4f} | {:>9.4f} | {:>9.4f} | {:>9} | {:>11.0f} | {:>9} |'.format(
+                carga, r['leitura'], r['construcao'], r['execucao'], r['total'], r['acessos'],
+                r['acessosPorSegundo'], '-' if r['rssPicoKB'] == None else r['rssPicoKB']
+            ))
+    finally:
+        if temporario != None:
+            temporario.cleanup()
+
+    print(linha)
+
+    if gravar:
+        with open(caminhoLinhaBase, 'w') as arquivo:
+            json.dump({
+                'versao': VERSAO_LINHA_BASE,
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'opcoes': opcoes,
+                'cargas': resultados,
+            }, arquivo, indent=2, sort_keys=True)
+            arquivo.write('\n')
+        print('Linha de base gravada em {}.'.format(caminhoLinhaBase))
+        return True
+
+    regressoes = comparar(resultados, linhaBase, opcoes, limite)
+
+    print('Em relação à linha de base ({}):'.format(caminhoLinhaBase))
+    for carga, r in resultados.items():
+        base = linhaBase['cargas'].get(carga)
+        if base == None:
+            print('  {}: sem linha de base.'.format(carga))
+        else:
+            print('  {}: acessos/s {}, total {}.'.format(
+                carga, variacao(r['acessosPorSegundo'], base['acessosPorSegundo']),
+                variacao(r['total'], base['total'])
+            ))
+
+    if regressoes:
+        print('Regressões acima de {:.0f}%:'.format(100 * limite))
+        for mensagem in regressoes:
+            print('  ' + mensagem)
+        return False
+
+    print('Nenhuma regressão acima de {:.0f}%.'.format(100 * limite))
+    return True
+
+
+
+# Faz a correção dos parâmetros se o arquivo for executado direto
+# do terminal (python -m bench.executar, da raiz do repositório).
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Mede o simulador com cargas sintéticas e compara com uma linha de base.')
+    parser.add_argument('--cargas', nargs='+', default=list(GERADORES), choices=list(GERADORES),
+                        help='cargas a medir (padrão: todas)')
+    parser.add_argument('--acessos', type=int, default=50000, help='acessos por carga')
+    parser.add_argument('--semente', type=int, default=1, help='semente dos geradores aleatórios')
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help='execuções por carga; fica o menor tempo de cada fase')
+    parser.add_argument('--streaming', action='store_true',
+                        help='executa cada comando assim que é lido (a leitura fica dentro da execução)')
+    parser.add_argument('--somente-tags', action='store_true', help='simula só as tags, sem os valores')
+    parser.add_argument('--armazenamento', default='objetos', choices=list(ARMAZENAMENTOS),
+                        help='motor de armazenamento das caches: um TACache por conjunto ou '
+                             'buffers contíguos (padrão: objetos)')
+    parser.add_argument('--politica', default=POLITICA_FIFO, metavar='POLITICA',
+                        help='política de substituição de todos os níveis: fifo, lru, plru, '
+                             'random[:semente] ou lfu (padrão: fifo)')
+    parser.add_argument('--linha-base', default=os.path.join('bench', 'linha_base.json'), metavar='ARQUIVO',
+                        help='arquivo JSON da linha de base (padrão: bench/linha_base.json)')
+    parser.add_argument('--gravar', action='store_true', help='grava a linha de base em vez de comparar')
+    parser.add_argument('--limite', type=float, default=0.1,
+                        help='variação relativa tolerada antes de falhar (padrão: 0.1 = 10%%)')
+    parser.add_argument('--salvar', metavar='DIRETORIO',
+                        help='guarda as cargas geradas neste diretório, para usar com main.py')
+    args = parser.parse_args()
+
+    opcoes = {
+        'acessos': args.acessos,
+        'semente': args.semente,
+        'streaming': args.streaming,
+        'somenteTags': args.somente_tags,
+        'armazenamento': args.armazenamento,
+        'politica': args.politica,
+    }
+
+    try:
+        semRegressao = main(args.cargas, opcoes, args.repeticoes, args.linha_base, args.gravar,
+                            args.limite, args.salvar)
+    except:
+        print_exc()
+        exit(1)
+
+    if not semRegressao:
+        exit(1)
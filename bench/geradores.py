@@ -0,0 +1,187 @@
+from itertools import accumulate
+from bisect import bisect_left
+import random
+
+
+# Geradores de cargas sintéticas para o simulador. Cada gerador recebe o
+# número de acessos e uma semente (os determinísticos a ignoram) e gera
+# comandos (cmd, args) no formato do interpretador, todos no núcleo 0 e com
+# endereços múltiplos de 4 dentro de uma região que começa em 0.
+
+
+# Construção da hierarquia usada pelas cargas (a mesma de teste.txt, com
+# um núcleo): L1d/L1i de 32 KB, L2 de 256 KB, L3 de 8 MB e 96 MB de memória.
+HIERARQUIA = (
+    ('cl1d', [32768, 8, 64]),
+    ('cl1i', [32768, 4, 64]),
+    ('cl2', [262144, 8, 64]),
+    ('cl3', [8388608, 16, 128]),
+    ('cmp', [33554432, 67108864]),
+    ('cmem', []),
+    ('cp', [1]),
+)
+
+# Região padrão dos acessos, em bytes (maior que o L3).
+REGIAO = 1 << 24
+
+
+# Acessos sequenciais a words consecutivas, voltando ao início da região.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - ignorada.
+# @param regiao : int - bytes percorridos.
+#
+# @return generator.
+#
+def sequencial(numAcessos, semente=0, regiao=REGIAO):
+    for i in range(numAcessos):
+        yield 'rd', [0, (4 * i) % regiao]
+
+
+# Acessos com passo fixo, recomeçando uma word adiante a cada volta na
+# região para não repetir sempre as mesmas linhas.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - ignorada.
+# @param passo : int - distância em bytes entre acessos, múltiplo de 4.
+# @param regiao : int - bytes percorridos.
+#
+# @return generator.
+#
+def strided(numAcessos, semente=0, passo=4096, regiao=REGIAO):
+    porVolta = max(regiao // passo, 1)
+    for i in range(numAcessos):
+        volta, k = divmod(i, porVolta)
+        yield 'rd', [0, (k * passo + 4 * volta) % regiao]
+
+
+# Acessos uniformemente aleatórios, com uma fração de escritas.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - semente do gerador aleatório.
+# @param regiao : int - bytes sorteados.
+# @param fracaoEscrita : float - probabilidade de cada acesso ser escrita.
+#
+# @return generator.
+#
+def aleatorio(numAcessos, semente=0, regiao=REGIAO, fracaoEscrita=0.25):
+    gerador = random.Random(semente)
+    numWords = regiao // 4
+    for i in range(numAcessos):
+        addr = 4 * gerador.randrange(numWords)
+        if gerador.random() < fracaoEscrita:
+            yield 'wd', [0, addr, i & 0xFFFFFFFF]
+        else:
+            yield 'rd', [0, addr]
+
+
+# Acessos a linhas com popularidade Zipf: a linha de posto k é acessada com
+# probabilidade proporcional a 1 / k ** expoente. Os postos são espalhados
+# pela região por uma permutação, para a popularidade não coincidir com a
+# vizinhança.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - semente do gerador aleatório.
+# @param numLinhas : int - linhas distintas.
+# @param expoente : float - expoente da distribuição.
+# @param tamLinha : int - bytes por linha.
+#
+# @return generator.
+#
+def zipf(numAcessos, semente=0, numLinhas=1 << 16, expoente=1.0, tamLinha=64):
+    gerador = random.Random(semente)
+    acumulado = list(accumulate(1.0 / k ** expoente for k in range(1, numLinhas + 1)))
+    total = acumulado[-1]
+
+    linhas = list(range(numLinhas))
+    gerador.shuffle(linhas)
+
+    for i in range(numAcessos):
+        posto = min(bisect_left(acumulado, gerador.random() * total), numLinhas - 1)
+        yield 'rd', [0, linhas[posto] * tamLinha + 4 * gerador.randrange(tamLinha // 4)]
+
+
+# Perseguição de ponteiros: os nós formam um único ciclo aleatório
+# (algoritmo de Sattolo) e cada acesso lê o nó apontado pelo anterior,
+# então não há localidade além do tamanho do nó.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - semente do gerador aleatório.
+# @param numNos : int - nós do ciclo.
+# @param tamNo : int - bytes por nó, múltiplo de 4.
+#
+# @return generator.
+#
+def perseguicaoPonteiro(numAcessos, semente=0, numNos=1 << 16, tamNo=64):
+    gerador = random.Random(semente)
+    proximo = list(range(numNos))
+    for i in range(numNos - 1, 0, -1):
+        j = gerador.randrange(i)
+        proximo[i], proximo[j] = proximo[j], proximo[i]
+
+    no = 0
+    for i in range(numAcessos):
+        yield 'rd', [0, no * tamNo]
+        no = proximo[no]
+
+
+# Multiplicação de matrizes de words (C += A x B) em ladrilhos, na ordem
+# de acesso do laço i, j, k dentro de cada ladrilho: lê A[i][k] e B[k][j]
+# e escreve C[i][j] ao fim de cada k. Recomeça se os acessos não acabarem.
+#
+# @param numAcessos : int - número de acessos.
+# @param semente : int - ignorada.
+# @param n : int - ordem das matrizes.
+# @param ladrilho : int - ordem dos ladrilhos, divisor de n.
+#
+# @return generator.
+#
+def ladrilhosMatriz(numAcessos, semente=0, n=256, ladrilho=32):
+    tamMatriz = 4 * n * n
+    baseA, baseB, baseC = 0, tamMatriz, 2 * tamMatriz
+
+    def multiplicar():
+        for ii in range(0, n, ladrilho):
+            for jj in range(0, n, ladrilho):
+                for kk in range(0, n, ladrilho):
+                    for i in range(ii, ii + ladrilho):
+                        for j in range(jj, jj + ladrilho):
+                            for k in range(kk, kk + ladrilho):
+                                yield 'rd', [0, baseA + 4 * (i * n + k)]
+                                yield 'rd', [0, baseB + 4 * (k * n + j)]
+                            yield 'wd', [0, baseC + 4 * (i * n + j), (i + j) & 0xFFFFFFFF]
+
+    gerados = 0
+    while gerados < numAcessos:
+        for comando in multiplicar():
+            if gerados == numAcessos:
+                return
+            gerados += 1
+            yield comando
+
+
+# Cargas por nome.
+GERADORES = {
+    'sequencial': sequencial,
+    'strided': strided,
+    'aleatorio': aleatorio,
+    'zipf': zipf,
+    'ponteiros': perseguicaoPonteiro,
+    'matriz': ladrilhosMatriz,
+}
+
+
+# Escreve uma carga como arquivo de comandos texto, com a construção da
+# hierarquia antes dos acessos.
+#
+# @param arquivo : file - destino, aberto em modo texto.
+# @param comandos : iterable - comandos (cmd, args) da carga.
+# @param hierarquia : tuple - comandos de construção (ver HIERARQUIA).
+#
+# @return None.
+#
+def escreverCarga(arquivo, comandos, hierarquia=HIERARQUIA):
+    for cmd, args in hierarquia:
+        arquivo.write(' '.join([cmd] + [str(x) for x in args]) + '\n')
+    for cmd, args in comandos:
+        arquivo.write('{} {}\n'.format(cmd, ' '.join(str(x) for x in args)))
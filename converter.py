@@ -0,0 +1,32 @@
+from src.trace import converterTrace
+from sys import argv
+from sys import stderr
+from traceback import print_exc
+
+
+# Converte um arquivo de comandos texto para o formato de trace
+# binário, que o main.py executa sem o custo de interpretar texto.
+#
+# @param entrada : str - caminho do arquivo texto.
+# @param saida : str - caminho do trace binário a ser criado.
+#
+def main(entrada, saida):
+    with open(entrada) as arquivoTexto, open(saida, 'wb') as arquivoBinario:
+        total = converterTrace(arquivoTexto, arquivoBinario)
+
+    print('Convertidos {} acessos para "{}".'.format(total, saida))
+
+
+
+# Faz a correção dos parâmetros se o arquivo for executado direto
+# do terminal.
+if __name__ == '__main__':
+    if len(argv) != 3:
+        stderr.writelines('Parâmetro incorreto.\nUso:\n  python3 converter.py <arquivo texto> <trace binário>\n')
+        exit(1)
+
+    try:
+        main(argv[1], argv[2])
+    except:
+        print_exc()
+        exit(1)
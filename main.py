@@ -1,47 +1,132 @@
 from src.interpreter import Interpreter
 from src.interpreter import CompilationError
-from sys import argv
+from src.trace import ehTraceBinario
+from src.Saida import Saida
+from src.Perfil import Perfil
+from src.exportacao import FORMATO_CSV
+from src.exportacao import FORMATO_NPY
+from src.constantes import *
 from sys import stderr
+from argparse import ArgumentParser
 from traceback import print_exc
 
 
 # Programa principal para executar tudo automaticamente só
-# com o caminho do arquivo de comandos.
+# com o caminho do arquivo de comandos (texto ou trace binário).
 #
 # @param filePath : str - caminho do arquivo.
+# @param streaming : bool - executa os comandos conforme são lidos.
+# @param saida : Saida - modo e destino das mensagens dos comandos.
+# @param somenteTags : bool - simula só as tags, sem os valores.
+# @param classificarMisses : bool - classifica os misses de cada nível (3C).
+# @param prefixoConjuntos : str - exporta os contadores por conjunto de cada
+#                                 nível com este prefixo (None não exporta).
+# @param formatoConjuntos : str - formato dos contadores por conjunto (csv ou npy).
+# @param perfil : Perfil - mede os tempos da execução (None não mede).
+# @param checkpoint : str - grava o estado do simulador neste arquivo a cada
+#                           intervaloCheckpoint comandos (None não grava).
+# @param intervaloCheckpoint : int - comandos entre checkpoints.
+# @param retomar : str - continua a execução a partir deste checkpoint.
+# @param nucleos : list - caminhos dos arquivos com timestamp de cada núcleo,
+#                         intercalados depois do arquivo de comandos.
 #
-def main(filePath):
+def main(filePath, streaming=False, saida=None, somenteTags=False, classificarMisses=False,
+         prefixoConjuntos=None, formatoConjuntos=FORMATO_CSV, perfil=None, checkpoint=None,
+         intervaloCheckpoint=1000000, retomar=None, nucleos=None):
     arquivoComandos = None
+    arquivosNucleos = []
+    binario = ehTraceBinario(filePath)
 
     try:
-        arquivoComandos = open(filePath)
+        arquivoComandos = open(filePath, 'rb' if binario else 'r')
+        for caminho in (nucleos if nucleos != None else []):
+            arquivosNucleos.append(open(caminho, 'r'))
     except BaseException as e:
         if arquivoComandos != None: arquivoComandos.close()
+        for arquivo in arquivosNucleos: arquivo.close()
         raise e
 
-    simulador = Interpreter(arquivoComandos)
+    simulador = Interpreter(arquivoComandos, binario=binario, streaming=streaming, saida=saida,
+                            somenteTags=somenteTags, classificarMisses=classificarMisses,
+                            contarConjuntos=prefixoConjuntos != None, perfil=perfil,
+                            checkpoint=checkpoint, intervaloCheckpoint=intervaloCheckpoint,
+                            retomar=retomar, nucleos=arquivosNucleos)
     relatorio = simulador.getRelatorio().gerarRelatorio()
 
     print('\n')
     print(relatorio)
 
+    if prefixoConjuntos != None:
+        arquivos = simulador.getRelatorio().exportarConjuntos(prefixoConjuntos, formatoConjuntos)
+        print('\nContadores por conjunto exportados em {}.'.format(', '.join(arquivos)))
+
+    simulador.fechar()
     arquivoComandos.close()
+    for arquivo in arquivosNucleos: arquivo.close()
 
 
 
 # Faz a correção dos parâmetros se o arquivo for executado direto
 # do terminal.
 if __name__ == '__main__':
-    if len(argv) != 2:
-        stderr.writelines('Parâmetro incorreto.\nUso:\n  python3 main.py <arquivo>\n')
-        exit(1)
+    parser = ArgumentParser(description='Simulador de hierarquia de memória cache.')
+    parser.add_argument('arquivo', help='arquivo de comandos (texto ou trace binário)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='executa cada comando assim que é lido, em memória constante')
+    parser.add_argument('--saida', default=SAIDA_NORMAL,
+                        choices=(SAIDA_NORMAL, SAIDA_SILENCIOSA, SAIDA_BUFFER, SAIDA_FALHAS),
+                        help='mensagens dos comandos: todas, nenhuma (só o relatório), '
+                             'todas em lotes ou só os asserts que falharam')
+    parser.add_argument('--destino', metavar='ARQUIVO',
+                        help='arquivo para as mensagens dos comandos (padrão: saída padrão)')
+    parser.add_argument('--lote', type=int, default=4096,
+                        help='mensagens por escrita no modo buffer')
+    parser.add_argument('--somente-tags', action='store_true',
+                        help='simula só tags e estado das linhas, sem guardar os valores '
+                             '(mesmo relatório, menos memória e tempo)')
+    parser.add_argument('--classificar-misses', action='store_true',
+                        help='classifica os misses de cada nível em compulsórios, de capacidade '
+                             'e de conflito (mais lento)')
+    parser.add_argument('--conjuntos', metavar='PREFIXO',
+                        help='exporta acessos, misses e substituições por conjunto de cada nível '
+                             'em arquivos PREFIXO_<nível>...')
+    parser.add_argument('--formato-conjuntos', default=FORMATO_CSV, choices=(FORMATO_CSV, FORMATO_NPY),
+                        help='formato dos arquivos de --conjuntos')
+    parser.add_argument('--perfil', action='store_true',
+                        help='mede o tempo de leitura, construção, execução e de cada comando, '
+                             'e os acessos por segundo, no fim do relatório')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='com --perfil, inclui as funções mais caras segundo o cProfile')
+    parser.add_argument('--checkpoint', metavar='ARQUIVO',
+                        help='grava o estado de toda a hierarquia neste arquivo a cada '
+                             '--intervalo-checkpoint comandos (implica --streaming)')
+    parser.add_argument('--intervalo-checkpoint', type=int, default=1000000, metavar='N',
+                        help='comandos executados entre checkpoints (padrão: 1000000)')
+    parser.add_argument('--retomar', metavar='ARQUIVO',
+                        help='continua a execução de um checkpoint gravado com o mesmo arquivo '
+                             'de comandos e as mesmas opções')
+    parser.add_argument('--nucleos', nargs='+', metavar='ARQUIVO',
+                        help='arquivos texto de acessos do núcleo 0, 1, ..., com um timestamp '
+                             'antes de cada um ("<timestamp> rd <addr>"), executados depois do '
+                             'arquivo de comandos intercalados pelo timestamp')
+    args = parser.parse_args()
+
+    destino = None
 
     try:
-        main(argv[1])
+        if args.destino != None:
+            destino = open(args.destino, 'w')
+        saida = Saida(args.saida, destino, args.lote)
+        perfil = Perfil(args.cprofile) if args.perfil or args.cprofile else None
+        main(args.arquivo, args.streaming, saida, args.somente_tags, args.classificar_misses,
+             args.conjuntos, args.formato_conjuntos, perfil, args.checkpoint,
+             args.intervalo_checkpoint, args.retomar, args.nucleos)
     except CompilationError as e:
         stderr.writelines(e.getMessage())
         stderr.writelines('\n')
         exit(1)
     except:
         print_exc()
-        exit(1)
\ No newline at end of file
+        exit(1)
+    finally:
+        if destino != None: destino.close()
@@ -0,0 +1,81 @@
+from src.StackDistance import MissRatioCurve
+from src.trace import ehTraceBinario
+from src.trace import lerCabecalho
+from src.trace import lerRegistros
+from src.trace import lerRegistrosTexto
+from src.trace import OP_RI, OP_WI, OP_RD, OP_WD, OP_ASSERTI, OP_ASSERTD
+from argparse import ArgumentParser
+from traceback import print_exc
+
+
+# Operações consideradas por tipo de acesso.
+TIPOS = {
+    'dados': (OP_RD, OP_WD, OP_ASSERTD),
+    'instrucoes': (OP_RI, OP_WI, OP_ASSERTI),
+    'todos': (OP_RI, OP_WI, OP_RD, OP_WD, OP_ASSERTI, OP_ASSERTD),
+}
+
+
+# Calcula a curva de miss ratio de um trace em uma única passada e
+# imprime uma tabela com todas as configurações.
+#
+# @param filePath : str - caminho do arquivo de comandos (texto ou binário).
+# @param tamLinha : int - bytes por linha.
+# @param capacidades : list - capacidades em bytes.
+# @param associatividades : list - associatividades.
+# @param tipo : str - chave de TIPOS.
+#
+def main(filePath, tamLinha, capacidades, associatividades, tipo):
+    curva = MissRatioCurve(tamLinha, capacidades, associatividades)
+    operacoes = TIPOS[tipo]
+    ignorados = 0
+
+    binario = ehTraceBinario(filePath)
+    with open(filePath, 'rb' if binario else 'r') as arquivo:
+        if binario:
+            lerCabecalho(arquivo)
+            registros = lerRegistros(arquivo)
+        else:
+            registros = lerRegistrosTexto(arquivo)
+
+        for op, level, n, addr, value in registros:
+            if op in operacoes:
+                try:
+                    curva.acessar(addr)
+                except ValueError:
+                    # Endereço inválido, a simulação contaria como erro.
+                    ignorados += 1
+
+    print('Curva de miss ratio LRU, linha de {} bytes, {} acessos ({} ignorados).'.format(
+        tamLinha, curva.getNumAcessos(), ignorados
+        )
+    )
+    print('+--------------+---------+--------------+--------------+------------+')
+    print('|  Capacidade  |  Assoc. |     Hits     |    Misses    | Miss ratio |')
+    print('+--------------+---------+--------------+--------------+------------+')
+    for c, a, hits, misses in curva.getResultados():
+        taxa = misses / curva.getNumAcessos() if curva.getNumAcessos() else 0.0
+        print('| {:>12} | {:>7} | {:>12} | {:>12} | {:>10.4f} |'.format(c, a, hits, misses, taxa))
+    print('+--------------+---------+--------------+--------------+------------+')
+
+
+
+# Faz a correção dos parâmetros se o arquivo for executado direto
+# do terminal.
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Curva de miss ratio em uma passada (distância de pilha).')
+    parser.add_argument('arquivo', help='arquivo de comandos (texto ou trace binário)')
+    parser.add_argument('--linha', type=int, default=64, help='tamanho da linha em bytes')
+    parser.add_argument('--capacidades', type=int, nargs='+',
+                        default=[2 ** k for k in range(12, 25)], help='capacidades em bytes')
+    parser.add_argument('--associatividades', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16], help='associatividades')
+    parser.add_argument('--acessos', choices=tuple(TIPOS), default='todos',
+                        help='tipo de acesso considerado')
+    args = parser.parse_args()
+
+    try:
+        main(args.arquivo, args.linha, args.capacidades, args.associatividades, args.acessos)
+    except:
+        print_exc()
+        exit(1)
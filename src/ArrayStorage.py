@@ -0,0 +1,392 @@
+from array import array
+from src.util import log2
+from src.util import copiarBuffer
+from src.constantes import *
+
+
+class ArrayStorage:
+    # estático:
+    bytesPorBloco = 4096    # bytes de linhas por bloco de conjuntos (como as páginas da MainMemory)
+
+    # Motor de armazenamento compacto de uma cache associativa por conjuntos.
+    # Os conjuntos ficam em blocos de buffers contíguos, no lugar de um
+    # TACache por conjunto, e cada bloco só é alocado no primeiro
+    # preenchimento de um conjunto dele: a memória cresce com os conjuntos
+    # usados, não com a capacidade da cache. As linhas são numeradas por
+    # (conjunto * numVias + via), e o bloco de uma linha e a posição nele
+    # saem desse número. O endereçamento dentro de cada conjunto é o mesmo
+    # do TACache. Os argumentos não são verificados, isso é feito pela SACache.
+    #
+    # @param numConjuntos : int - número de conjuntos da cache.
+    # @param numVias : int - número de linhas por conjunto (associatividade).
+    # @param tamLinha : int - número de bytes por linha.
+    # @param estado : object - estado da política de substituição (criarPolitica).
+    # @param dados : bool - guarda as words das linhas; se False, só as tags e o
+    #                       estado, e as leituras que acertam retornam 0.
+    #
+    def __init__(self, numConjuntos, numVias, tamLinha, estado, dados=True):
+        self.__numConjuntos = numConjuntos
+        self.__numVias = numVias
+        self.__tamLinha = tamLinha
+        self.__numColunas = tamLinha // 4
+        self.__tamOffset = log2(self.__numColunas)
+
+        # words guardadas por linha, 0 no modo só de tags (as fatias dos
+        # buffers de dados ficam vazias).
+        self.__armazenaDados = dados
+        self.__largura = self.__numColunas if dados else 0
+
+        # conjuntos por bloco, potência de 2 como numVias e tamLinha; um
+        # bloco tem ao menos um conjunto e a cache ao menos um bloco.
+        self.__conjuntosPorBloco = min(max(ArrayStorage.bytesPorBloco // (numVias * tamLinha), 1),
+                                       numConjuntos)
+        self.__tamBloco = log2(self.__conjuntosPorBloco * numVias)
+        self.__mascaraBloco = self.__conjuntosPorBloco * numVias - 1
+        numBlocos = numConjuntos // self.__conjuntosPorBloco
+
+        # por bloco: words das linhas, tags, bits de válido, bits de sujo
+        # das words (também no modo só de tags) e linhas ocupadas por
+        # conjunto; None até o bloco ser alocado.
+        self.__dados = [None] * numBlocos
+        self.__tags = [None] * numBlocos
+        self.__validos = [None] * numBlocos
+        self.__sujas = [None] * numBlocos
+        self.__numOcupadas = [None] * numBlocos
+        self.__limpas = bytes(self.__numColunas)
+
+        self.__estado = estado
+
+        # índice tag -> número da linha, a tag já identifica o conjunto.
+        self.__indice = {}
+
+        # vias de linhas invalidadas (coerência) por conjunto, ocupadas
+        # antes de haver nova substituição; só conjuntos com alguma.
+        self.__livres = {}
+
+    # Aloca os buffers de um bloco. Enquanto nenhum conjunto dele foi
+    # preenchido o índice não tem linhas dele, então as buscas não precisam
+    # dos buffers.
+    #
+    # @param b : int - número do bloco.
+    #
+    # @return None.
+    #
+    def __alocar(self, b):
+        numSlots = self.__conjuntosPorBloco * self.__numVias
+
+        self.__dados[b] = array('I', bytes(4 * numSlots * self.__largura))
+        self.__tags[b] = array('I', bytes(4 * numSlots))
+        self.__validos[b] = bytearray(numSlots)
+        self.__sujas[b] = bytearray(numSlots * self.__numColunas)
+        self.__numOcupadas[b] = array('I', bytes(4 * self.__conjuntosPorBloco))
+
+    # Obtém o dado salvo do endereço.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de 32 bits (4 bytes).
+    #
+    # @raise IndexError.
+    #
+    # @return int - valor de 32 bits, ou None em caso de miss.
+    #
+    def lerDado(self, lookup, address):
+        offset = address & (self.__numColunas - 1)
+
+        if offset % 4 != 0:
+            raise IndexError('Offset deve ser múltiplo de 4.')
+
+        slot = self.__indice.get(address >> self.__tamOffset)
+
+        if slot == None:
+            return None
+        else:
+            self.__estado.acesso(lookup, slot - lookup * self.__numVias)
+            if not self.__armazenaDados:
+                return 0
+            pos = (slot & self.__mascaraBloco) * self.__largura + offset
+            return self.__dados[slot >> self.__tamBloco][pos]
+
+    # Obtém uma cópia da linha que começa no endereço.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de início da linha.
+    #
+    # @return array - words da linha, ou None se ela não estiver na cache.
+    #
+    def lerLinha(self, lookup, address):
+        slot = self.__indice.get(address >> self.__tamOffset)
+
+        if slot == None:
+            return None
+        else:
+            n = self.__largura
+            pos = (slot & self.__mascaraBloco) * n
+            return self.__dados[slot >> self.__tamBloco][pos:pos + n]
+
+    # Insere uma linha da memória no conjunto, na menor via invalidada, na
+    # próxima via livre ou na vítima escolhida pela política. Se a vítima
+    # estiver suja, ela é retornada para ser escrita de volta.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de origem.
+    # @param linha : list - valores (int) da linha da memória.
+    #
+    # @raise OverflowError.
+    #
+    # @return tuple - (LINHA_*, (endereço, words, bits de sujo) da linha suja
+    #                 substituída ou None).
+    #
+    def escreverLinha(self, lookup, address, linha):
+        b = (lookup * self.__numVias) >> self.__tamBloco
+        if self.__tags[b] == None:
+            self.__alocar(b)
+
+        n = self.__largura
+        dados = self.__dados[b]
+        tag = address >> self.__tamOffset
+        slot = self.__indice.get(tag)
+        codigo = LINHA_ATUALIZADA
+        vitima = None
+
+        if slot == None:
+            tags = self.__tags[b]
+            validos = self.__validos[b]
+            ocupadas = self.__numOcupadas[b]
+            k = lookup & (self.__conjuntosPorBloco - 1)
+
+            if lookup in self.__livres:
+                livres = self.__livres[lookup]
+                via = min(livres)
+                livres.remove(via)
+                if not livres:
+                    del self.__livres[lookup]
+            elif ocupadas[k] < self.__numVias:
+                via = ocupadas[k]
+                ocupadas[k] += 1
+            else:
+                via = self.__estado.vitima(lookup)
+            slot = lookup * self.__numVias + via
+            pos = slot & self.__mascaraBloco
+
+            if validos[pos]:
+                vitima = self.__retirarSuja(b, pos)
+                del self.__indice[tags[pos]]
+                codigo = LINHA_SUBSTITUIDA
+            else:
+                codigo = LINHA_PREENCHIDA
+
+            self.__indice[tag] = slot
+            tags[pos] = tag
+            validos[pos] = 1
+            self.__estado.preenchimento(lookup, via)
+        else:
+            pos = slot & self.__mascaraBloco
+
+        valores = array('I', linha[:n])
+        if len(valores) < n:
+            valores.extend(bytes(4 * (n - len(valores))))
+        dados[pos * n:(pos + 1) * n] = valores
+
+        return codigo, vitima
+
+    # Insere um dado na linha que contém o endereço, se ela estiver na cache.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de origem do dado.
+    # @param valor : int - dado a ser inserido, 32 bits sem sinal.
+    # @param sujar : bool - marca a linha como suja (write-back).
+    #
+    # @raise IndexError, OverflowError.
+    #
+    # @return bool.
+    #
+    def escreverDado(self, lookup, address, valor, sujar=False):
+        slot = self.__indice.get(address >> self.__tamOffset)
+
+        if slot == None:
+            return CACHE_MISS
+        else:
+            offset = address & (self.__numColunas - 1)
+
+            if offset % 4 != 0:
+                raise IndexError('Offset deve ser múltiplo de 4.')
+
+            b, pos = slot >> self.__tamBloco, slot & self.__mascaraBloco
+            if self.__armazenaDados:
+                self.__dados[b][pos * self.__largura + offset] = valor
+            self.__estado.acesso(lookup, slot - lookup * self.__numVias)
+            if sujar:
+                self.__sujas[b][pos * self.__numColunas + offset] = 1
+            return CACHE_HIT
+
+    # Escreve words na linha que começa no endereço, se ela estiver na
+    # cache, e as marca como sujas.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de início da linha.
+    # @param inicio : int - índice da primeira word na linha.
+    # @param words : list - valores (int) a escrever.
+    # @param sujas : bytes - bits de sujo das words; só as sujas são
+    #                        escritas (None escreve todas).
+    #
+    # @raise IndexError.
+    #
+    # @return bool.
+    #
+    def escreverPalavras(self, lookup, address, inicio, words, sujas=None):
+        slot = self.__indice.get(address >> self.__tamOffset)
+
+        if slot == None:
+            return CACHE_MISS
+
+        if sujas == None:
+            sujas = b'\x01' * len(words)
+
+        if inicio < 0 or inicio + len(sujas) > self.__numColunas:
+            raise IndexError('Words fora da linha.')
+
+        b, pos = slot >> self.__tamBloco, slot & self.__mascaraBloco
+        dados = self.__dados[b]
+        bits = self.__sujas[b]
+        k = pos * self.__numColunas + inicio
+        for j, suja in enumerate(sujas):
+            if suja:
+                if self.__armazenaDados:
+                    dados[pos * self.__largura + inicio + j] = words[j]
+                bits[k + j] = 1
+        return CACHE_HIT
+
+    # Remove a linha que começa no endereço, se ela estiver na cache
+    # (invalidação por coerência). A via fica livre para o próximo
+    # preenchimento do conjunto.
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def invalidarLinha(self, lookup, address):
+        vitima = self.limparLinha(lookup, address)
+        slot = self.__indice.pop(address >> self.__tamOffset, None)
+
+        if slot == None:
+            return None
+
+        self.__validos[slot >> self.__tamBloco][slot & self.__mascaraBloco] = 0
+        self.__livres.setdefault(lookup, []).append(slot - lookup * self.__numVias)
+        return vitima
+
+    # Limpa os bits de sujo da linha que começa no endereço, que continua
+    # na cache (rebaixamento por coerência).
+    #
+    # @param lookup : int - conjunto do endereço.
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def limparLinha(self, lookup, address):
+        slot = self.__indice.get(address >> self.__tamOffset)
+
+        if slot == None:
+            return None
+
+        return self.__retirarSuja(slot >> self.__tamBloco, slot & self.__mascaraBloco)
+
+    # Retira a linha de uma posição do bloco para ser escrita de volta, se
+    # ela tem alguma word suja, limpando os bits de sujo.
+    #
+    # @param b : int - número do bloco.
+    # @param pos : int - posição da linha no bloco.
+    #
+    # @return tuple - (endereço, words, bits de sujo das words), ou None.
+    #
+    def __retirarSuja(self, b, pos):
+        c = self.__numColunas
+        bits = self.__sujas[b]
+        if bits.find(1, pos * c, (pos + 1) * c) == -1:
+            return None
+
+        n = self.__largura
+        sujas = bits[pos * c:(pos + 1) * c]
+        bits[pos * c:(pos + 1) * c] = self.__limpas
+        return self.__tags[b][pos] << self.__tamOffset, self.__dados[b][pos * n:(pos + 1) * n], sujas
+
+    # Obtém o estado dos conjuntos para um checkpoint (sem o da política,
+    # que é da SACache): os buffers dos blocos alocados. Eles não são
+    # copiados, então o estado deve ser gravado antes de a cache ser alterada.
+    #
+    # @return dict - número do bloco -> (dados, tags, validos, sujas,
+    #                numOcupadas), ou None se nada foi preenchido.
+    #
+    def getEstado(self):
+        blocos = {}
+        for b, tags in enumerate(self.__tags):
+            if tags != None:
+                blocos[b] = (self.__dados[b], tags, self.__validos[b], self.__sujas[b],
+                             self.__numOcupadas[b])
+        return blocos if blocos else None
+
+    # Restaura um estado obtido com getEstado de um motor de mesma
+    # configuração, refazendo o índice de tags e as vias invalidadas
+    # (as não válidas entre as já ocupadas do conjunto).
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        numBlocos = len(self.__tags)
+        self.__indice = {}
+        self.__livres = {}
+
+        for buffers in (self.__dados, self.__tags, self.__validos, self.__sujas, self.__numOcupadas):
+            buffers[:] = [None] * numBlocos
+
+        if estado == None:
+            return
+
+        numSlots = self.__conjuntosPorBloco * self.__numVias
+
+        for b, (dados, tags, validos, sujas, numOcupadas) in estado.items():
+            if not 0 <= b < numBlocos:
+                raise ValueError('Estado salvo incompatível com a cache (bloco inexistente).')
+
+            self.__alocar(b)
+            self.__dados[b] = copiarBuffer(self.__dados[b], dados)
+            self.__tags[b] = copiarBuffer(self.__tags[b], tags)
+            self.__validos[b] = copiarBuffer(self.__validos[b], validos)
+            self.__sujas[b] = copiarBuffer(self.__sujas[b], sujas)
+            self.__numOcupadas[b] = copiarBuffer(self.__numOcupadas[b], numOcupadas)
+
+            for pos, valido in enumerate(self.__validos[b]):
+                slot = b * numSlots + pos
+                if valido:
+                    self.__indice[self.__tags[b][pos]] = slot
+                else:
+                    lookup, via = divmod(slot, self.__numVias)
+                    if via < self.__numOcupadas[b][lookup & (self.__conjuntosPorBloco - 1)]:
+                        self.__livres.setdefault(lookup, []).append(via)
+
+    # Representação em string de um conjunto, no mesmo formato do TACache.
+    #
+    # @param lookup : int - conjunto a ser representado.
+    #
+    # @return str.
+    #
+    def reprConjunto(self, lookup):
+        n = self.__largura
+        b = (lookup * self.__numVias) >> self.__tamBloco
+        linhas = []
+        for slot in range(lookup * self.__numVias, (lookup + 1) * self.__numVias):
+            pos = slot & self.__mascaraBloco
+            if self.__tags[b] == None:
+                tag, linha = None, [0] * n
+            else:
+                tag = self.__tags[b][pos] if self.__validos[b][pos] else None
+                linha = self.__dados[b][pos * n:(pos + 1) * n].tolist()
+            linhas.append('{} -> {}'.format(tag, linha))
+        return '\n'.join(linhas)
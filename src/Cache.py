@@ -1,38 +1,55 @@
 from src.SACache import SACache
+from src.Diretorio import Diretorio
 from src.constantes import *
 
 class Cache:
-    # estático:
-    __l3Instace = None      # instância única
-    __l2Reference = None    # referência para cópia
-    __l1iReference = None   # referência para cópia
-    __l1dReference = None   # referência para cópia
-
-    # Cosntrutor da cache inclusiva de 3 níveis.
+    # Cosntrutor da cache inclusiva de 3 níveis. Os núcleos de um mesmo
+    # processador compartilham o L3, as demais hierarquias são criadas com
+    # duplicate a partir desta.
     #
     # @param l1d : SACache - cache L1 de dados.
     # @param l1i : SACache - cache L1 de instruções.
     # @param l2 : SACache - cache L2.
     # @param l3 : SACache - cache L3.
+    # @param escrita : str - política de escrita (ESCRITA_*).
+    # @param coerencia : str - protocolo de coerência entre os núcleos
+    #                          (COERENCIA_*), ou None para não manter.
+    # @param contadores : dict - contadores de escrita de outra hierarquia,
+    #                            para serem compartilhados (ver duplicate).
+    # @param diretorio : Diretorio - diretório de coerência de outra
+    #                                hierarquia, para ser compartilhado.
     #
-    # @raise PermissionError, TypeError, ValueError.
+    # @raise TypeError, ValueError.
     #
-    def __init__(self, l1d, l1i, l2, l3):
-        if Cache.__l3Instace != None and Cache.__l3Instace != l3:
-            # Só cria um, o resto deve ser cópia (estruturas iguais).
-            raise PermissionError('Já existe uma instância de Cache, utilize duplicate.')
-        elif Cache.__l3Instace == None:
-            # Primeira instância.
-            self.__veririficaArgumentos(l1d, l1i, l2, l3)
-            Cache.__l1dReference = l1d
-            Cache.__l1iReference = l1i
-            Cache.__l2Reference = l2
-            Cache.__l3Instace = l3
+    def __init__(self, l1d, l1i, l2, l3, escrita=ESCRITA_WRITE_THROUGH, coerencia=None,
+                 contadores=None, diretorio=None):
+        self.__veririficaArgumentos(l1d, l1i, l2, l3, escrita, coerencia)
 
         self.__l1d = l1d
         self.__l1i = l1i
         self.__l2 = l2
         self.__l3 = l3
+        self.__escrita = escrita
+
+        # Linhas sujas escritas de volta por cada nível e escritas na memória
+        # principal, em linhas (write-backs) e em words (stores), somados
+        # entre todos os núcleos.
+        if contadores == None:
+            contadores = {'L1d': 0, 'L1i': 0, 'L2': 0, 'L3': 0, 'linhas': 0, 'words': 0}
+        self.__contadores = contadores
+
+        # Linhas preenchidas, substituídas e escritas de volta por nível
+        # por esta hierarquia (um núcleo), inclusive no L3 compartilhado.
+        self.__eventos = {}
+        for nome in ('L1d', 'L1i', 'L2', 'L3'):
+            self.__eventos[nome] = {'preenchimentos': 0, 'substituicoes': 0, 'escritasDeVolta': 0}
+
+        # Diretório de coerência junto do L3, compartilhado como ele; cada
+        # hierarquia é um núcleo registrado no diretório.
+        if coerencia != None and diretorio == None:
+            diretorio = Diretorio(coerencia, l3.getTamOffset())
+        self.__diretorio = diretorio
+        self.__nucleo = diretorio.registrar(self) if diretorio != None else 0
 
     # Lança exceção se algum dos argumentos do construtor estiver errado.
     #
@@ -40,12 +57,14 @@ class Cache:
     # @param l1i : SACache - mesmo do construtor.
     # @param l2 : SACache - mesmo do construtor.
     # @param l3 : SACache - mesmo do construtor.
+    # @param escrita : str - mesmo do construtor.
+    # @param coerencia : str - mesmo do construtor.
     #
     # @raise TypeError, ValueError.
     #
     # @return None.
     #
-    def __veririficaArgumentos(self, l1d, l1i, l2, l3):
+    def __veririficaArgumentos(self, l1d, l1i, l2, l3, escrita, coerencia):
         if type(l1d) != SACache:
             raise TypeError('L1 dados deve ser SACache.')
 
@@ -64,6 +83,21 @@ class Cache:
         if sorted([l1i, l2, l3]) != [l1i, l2, l3]:
             raise ValueError('Tamanhos de linha inválidos, devem ser crescentes.')
 
+        if not l1d.armazenaDados() == l1i.armazenaDados() == l2.armazenaDados() == l3.armazenaDados():
+            raise ValueError('Níveis devem estar no mesmo modo (dados ou só tags).')
+
+        if escrita not in (ESCRITA_WRITE_THROUGH, ESCRITA_WRITE_BACK):
+            raise ValueError('Política de escrita inválida, deve ser {} ou {}.'.format(
+                ESCRITA_WRITE_THROUGH, ESCRITA_WRITE_BACK
+                )
+            )
+
+        if coerencia not in (None, COERENCIA_MSI, COERENCIA_MESI):
+            raise ValueError('Protocolo de coerência inválido, deve ser {} ou {}.'.format(
+                COERENCIA_MSI, COERENCIA_MESI
+                )
+            )
+
     # Get instance.
     # @return SACache.
     #
@@ -88,21 +122,117 @@ class Cache:
     def getL1d(self):
         return self.__l1d
 
-    # Cria uma nova Cache com a mesma estrutura, mas vazia.
+    # Informa se os níveis guardam as words das linhas (falso no modo só
+    # de tags).
+    # @return bool.
     #
-    # @raise ModuleNotFoundError.
+    def armazenaDados(self):
+        return self.__l1d.armazenaDados()
+
+    # Obtém a política de escrita.
+    # @return str.
+    #
+    def getEscrita(self):
+        return self.__escrita
+
+    # Obtém o protocolo de coerência entre os núcleos.
+    # @return str - COERENCIA_*, ou None se não é mantida.
+    #
+    def getCoerencia(self):
+        return self.__diretorio.getProtocolo() if self.__diretorio != None else None
+
+    # Obtém o diretório de coerência, compartilhado entre os núcleos.
+    # @return Diretorio - ou None se a coerência não é mantida.
+    #
+    def getDiretorio(self):
+        return self.__diretorio
+
+    # Obtém os contadores de escrita (write-backs por nível e escritas
+    # na memória principal).
+    # @return dict.
+    #
+    def getContadoresEscrita(self):
+        return dict(self.__contadores)
+
+    # Obtém os eventos de linha por nível causados por esta hierarquia:
+    # preenchimentos, substituições e escritas de volta.
+    # @return dict - nome do nível -> dict de contagens.
+    #
+    def getEventos(self):
+        return {nome: dict(contagens) for nome, contagens in self.__eventos.items()}
+
+    # Conta um store escrito direto na memória principal.
+    # @return None.
+    #
+    def contabilizaEscritaMemoria(self):
+        self.__contadores['words'] += 1
+
+    # Obtém o estado da hierarquia do núcleo para um checkpoint: L1d, L1i,
+    # L2 e eventos de linha e, se pedido, o L3, os contadores de escrita e
+    # o diretório de coerência, que são compartilhados entre os núcleos
+    # (basta salvá-los uma vez).
+    # @param compartilhado : bool - inclui o L3, os contadores de escrita e
+    #                               o diretório.
+    # @return dict.
+    #
+    def getEstado(self, compartilhado=True):
+        estado = {
+            'L1d': self.__l1d.getEstado(),
+            'L1i': self.__l1i.getEstado(),
+            'L2': self.__l2.getEstado(),
+            'eventos': self.getEventos(),
+            'L3': None,
+            'contadores': None,
+            'diretorio': None,
+        }
+
+        if compartilhado:
+            estado['L3'] = self.__l3.getEstado()
+            estado['contadores'] = self.getContadoresEscrita()
+            if self.__diretorio != None:
+                estado['diretorio'] = self.__diretorio.getEstado()
+
+        return estado
+
+    # Restaura um estado obtido com getEstado de uma hierarquia de mesma
+    # configuração. O L3, os contadores de escrita e o diretório só são
+    # restaurados se estiverem no estado.
+    # @param estado : dict - estado salvo.
+    # @raise ValueError.
+    # @return None.
+    #
+    def setEstado(self, estado):
+        self.__l1d.setEstado(estado['L1d'])
+        self.__l1i.setEstado(estado['L1i'])
+        self.__l2.setEstado(estado['L2'])
+
+        for nome, contagens in estado['eventos'].items():
+            self.__eventos[nome].update(contagens)
+
+        if estado['L3'] != None:
+            self.__l3.setEstado(estado['L3'])
+
+        # Atualizado no lugar, o dict é compartilhado com as outras hierarquias.
+        if estado['contadores'] != None:
+            self.__contadores.update(estado['contadores'])
+
+        if estado['diretorio'] != None:
+            if self.__diretorio == None:
+                raise ValueError('Estado salvo incompatível com a hierarquia (coerência).')
+            self.__diretorio.setEstado(estado['diretorio'])
+
+    # Cria uma nova Cache com a mesma estrutura, mas vazia, que
+    # compartilha o L3, os contadores de escrita e o diretório de
+    # coerência com esta.
     #
     # return Cache.
     #
     def duplicate(self):
-        if Cache.__l3Instace == None:
-            raise ModuleNotFoundError('Não existe instância a ser duplicada.')
-        else:
-            l1d = Cache.__l1dReference.duplicate()
-            l1i = Cache.__l1iReference.duplicate()
-            l2 = Cache.__l2Reference.duplicate()
-            l3 = Cache.__l3Instace
-            return Cache(l1d, l1i, l2, l3)
+        l1d = self.__l1d.duplicate()
+        l1i = self.__l1i.duplicate()
+        l2 = self.__l2.duplicate()
+        return Cache(l1d, l1i, l2, self.__l3, self.__escrita, self.getCoerencia(), self.__contadores,
+                     self.__diretorio)
 
     # Representação em string.
     #
@@ -125,6 +255,8 @@ class Cache:
     # Método para inserir em todos os níveis da cache uma linha buscada na
     # memória através do endereço dado, mantendo a coerência da cache inclusiva,
     # pois os tamanhos de linha de cada nível pode ser diferente.
+    # Usado pelos stores em write-through, depois de escrever a memória;
+    # as leituras usam trazerLinha.
     #
     # @param mainMem : MainMemory - referência para a memória principal.
     # @param address : int - endreço de 32 bits.
@@ -147,13 +279,13 @@ class Cache:
         address2 = self.firstAddressLine(offsetl2, address)
         address1 = self.firstAddressLine(offsetl1, address)
 
-        linhaL3 = mainMem.getMemoryLine(address3, tamLinhaL3)
-        linhaL2 = mainMem.getMemoryLine(address2, tamLinhaL2)
-        linhaL1 = mainMem.getMemoryLine(address1, tamLinhaL1)
+        linhaL3 = mainMem.getMemoryLine(address3, tamLinhaL3 // 4)
+        linhaL2 = mainMem.getMemoryLine(address2, tamLinhaL2 // 4)
+        linhaL1 = mainMem.getMemoryLine(address1, tamLinhaL1 // 4)
 
-        self.__l3.setLine(address3, linhaL3)
-        self.__l2.setLine(address2, linhaL2)
-        self.__l1d.setLine(address1, linhaL1)
+        self.__inserirLinha('L3', self.__l3, address3, linhaL3)
+        self.__inserirLinha('L2', self.__l2, address2, linhaL2)
+        self.__inserirLinha('L1d', self.__l1d, address1, linhaL1)
 
         # print(self.__l1d)
 
@@ -161,6 +293,8 @@ class Cache:
     # Método para inserir em todos os níveis da cache uma linha buscada na
     # memória através do endereço dado, mantendo a coerência da cache inclusiva,
     # pois os tamanhos de linha de cada nível pode ser diferente.
+    # Usado pelos stores em write-through, depois de escrever a memória;
+    # as leituras usam trazerLinha.
     #
     # @param mainMem : MainMemory - referência para a memória principal.
     # @param address : int - endreço de 32 bits.
@@ -183,68 +317,97 @@ class Cache:
         address2 = self.firstAddressLine(offsetl2, address)
         address1 = self.firstAddressLine(offsetl1, address)
 
-        linhaL3 = mainMem.getMemoryLine(address3, tamLinhaL3)
-        linhaL2 = mainMem.getMemoryLine(address2, tamLinhaL2)
-        linhaL1 = mainMem.getMemoryLine(address1, tamLinhaL1)
+        linhaL3 = mainMem.getMemoryLine(address3, tamLinhaL3 // 4)
+        linhaL2 = mainMem.getMemoryLine(address2, tamLinhaL2 // 4)
+        linhaL1 = mainMem.getMemoryLine(address1, tamLinhaL1 // 4)
 
-        self.__l3.setLine(address3, linhaL3)
-        self.__l2.setLine(address2, linhaL2)
-        self.__l1i.setLine(address1, linhaL1)
+        self.__inserirLinha('L3', self.__l3, address3, linhaL3)
+        self.__inserirLinha('L2', self.__l2, address2, linhaL2)
+        self.__inserirLinha('L1i', self.__l1i, address1, linhaL1)
 
     # Busca um dado na cache pelo endereço, retorna o nível em que foi
-    # encontrado.
+    # encontrado e o valor. O endereço não é verificado (ver Memory). Com
+    # coerência, um miss no L1 passa pelo diretório antes dos outros níveis.
     #
     # @param mainMem : MainMemory - referência para a memória principal.
     # @param address : int - endreço de 32 bits.
-    # @param data : Word - palavra a ser retornada de 32 bits.
     #
-    # @raise TypeError, ValueError.
+    # @raise IndexError.
     #
-    # @return int.
+    # @return tuple - (nível, valor de 32 bits).
     #
-    def getCacheData(self, mainMem, address, data):
-        if self.getL1d().getDado(address, data) == CACHE_HIT:
-            return FOUND_IN_L1
-        elif self.getL2().getDado(address, data) == CACHE_HIT:
-            self.setLineCacheData(mainMem, address)
-            return FOUND_IN_L2
-        elif self.getL3().getDado(address, data) == CACHE_HIT:
-            self.setLineCacheData(mainMem, address)
-            return FOUND_IN_L3
-        else:
-            self.setLineCacheData(mainMem, address)
-            return mainMem.getDado(address, data) # FOUND_IN_MEM
+    def getCacheData(self, mainMem, address):
+        valor = self.__l1d.lerDado(address)
+        if valor != None:
+            return FOUND_IN_L1, valor
+
+        if self.__diretorio != None:
+            self.__diretorio.leitura(self.__nucleo, mainMem, address)
+
+        valor = self.__l2.lerDado(address)
+        if valor != None:
+            self.trazerLinha(mainMem, address, False, FOUND_IN_L2)
+            return FOUND_IN_L2, valor
+
+        valor = self.__l3.lerDado(address)
+        if valor != None:
+            self.trazerLinha(mainMem, address, False, FOUND_IN_L3)
+            return FOUND_IN_L3, valor
+
+        self.trazerLinha(mainMem, address, False, FOUND_IN_MEM)
+        return self.__lerMemoria(mainMem, address)
 
     # Busca uma instrução na cache pelo endereço, retorna o nível em que foi
-    # encontrado.
+    # encontrada e o valor. O endereço não é verificado (ver Memory). Com
+    # coerência, um miss no L1 passa pelo diretório antes dos outros níveis.
     #
     # @param mainMem : MainMemory - referência para a memória principal.
     # @param address : int - endreço de 32 bits.
-    # @param value : Word - palavra a ser retornada de 32 bits.
     #
-    # @raise TypeError, ValueError.
+    # @raise IndexError.
     #
-    # @return int.
+    # @return tuple - (nível, valor de 32 bits).
     #
-    def getCacheInst(self, mainMem, address, instruction):
-        if self.getL1i().getDado(address, instruction) == CACHE_HIT:
-            return FOUND_IN_L1
-        elif self.getL2().getDado(address, instruction) == CACHE_HIT:
-            self.setLineCacheInst(mainMem, address)
-            return FOUND_IN_L2
-        elif self.getL3().getDado(address, instruction) == CACHE_HIT:
-            self.setLineCacheInst(mainMem, address)
-            return FOUND_IN_L3
-        else:
-            self.setLineCacheInst(mainMem, address)
-            # print(self.getL1d())
-            return mainMem.getDado(address, instruction) # FOUND_IN_MEM
+    def getCacheInst(self, mainMem, address):
+        valor = self.__l1i.lerDado(address)
+        if valor != None:
+            return FOUND_IN_L1, valor
+
+        if self.__diretorio != None:
+            self.__diretorio.leitura(self.__nucleo, mainMem, address)
+
+        valor = self.__l2.lerDado(address)
+        if valor != None:
+            self.trazerLinha(mainMem, address, True, FOUND_IN_L2)
+            return FOUND_IN_L2, valor
+
+        valor = self.__l3.lerDado(address)
+        if valor != None:
+            self.trazerLinha(mainMem, address, True, FOUND_IN_L3)
+            return FOUND_IN_L3, valor
+
+        self.trazerLinha(mainMem, address, True, FOUND_IN_MEM)
+        return self.__lerMemoria(mainMem, address)
+
+    # Lê da memória principal um endereço que não está em nenhum nível.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param address : int - endreço de 32 bits.
+    #
+    # @return tuple - (FOUND_IN_MEM, valor) ou (ADDRESS_OUT_OF_RANGE, None).
+    #
+    def __lerMemoria(self, mainMem, address):
+        valor = mainMem.getDado(address)
+        if valor == None:
+            return ADDRESS_OUT_OF_RANGE, None
+        return FOUND_IN_MEM, valor
 
     # Insere um dado em toda a hierarquia de cache inclusivo. Retorna
-    # o nível em que o valor foi encontrado na hierarquia.
+    # o nível em que o valor foi encontrado na hierarquia. O endereço não
+    # é verificado (ver Memory).
     #
     # @param address : int - endereço de 32 bits.
-    # @param value : Word - palavra de 32 bits de retorno.
+    # @param value : int - palavra de 32 bits.
     #
     # @return int.
     #
@@ -252,20 +415,23 @@ class Cache:
         #####################
         # Não feito...
         ####################
-        if self.getL1d().setDado(address, value) == CACHE_HIT:
+        sujar = self.__escrita == ESCRITA_WRITE_BACK
+
+        if self.__l1d.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L1
-        elif self.getL2().setDado(address, value) == CACHE_HIT:
+        elif self.__l2.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L2
-        elif self.getL3().setDado(address, value) == CACHE_HIT:
+        elif self.__l3.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L3
         else:
             return FOUND_IN_MEM
 
     # Insere uma instrução em toda a hierarquia de cache inclusivo. Retorna
-    # o nível em que o valor foi encontrado na hierarquia.
+    # o nível em que o valor foi encontrado na hierarquia. O endereço não
+    # é verificado (ver Memory).
     #
     # @param address : int - endereço de 32 bits.
-    # @param value : Word - palavra de 32 bits de retorno.
+    # @param value : int - palavra de 32 bits.
     #
     # @return int.
     #
@@ -273,15 +439,232 @@ class Cache:
         #####################
         # Não feito...
         ####################
-        if self.getL1i().setDado(address, value) == CACHE_HIT:
+        sujar = self.__escrita == ESCRITA_WRITE_BACK
+
+        if self.__l1i.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L1
-        elif self.getL2().setDado(address, value) == CACHE_HIT:
+        elif self.__l2.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L2
-        elif self.getL3().setDado(address, value) == CACHE_HIT:
+        elif self.__l3.escreverDado(address, value, sujar) == CACHE_HIT:
             return FOUND_IN_L3
         else:
             return FOUND_IN_MEM
 
+    # Obtém, pelo diretório de coerência, a permissão de escrita na linha
+    # do endereço, invalidando as cópias dos outros núcleos. Chamado antes
+    # de cada store (ver Memory); sem coerência não faz nada.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param address : int - endereço de 32 bits.
+    #
+    # @return None.
+    #
+    def obterExclusividade(self, mainMem, address):
+        if self.__diretorio != None:
+            self.__diretorio.escrita(self.__nucleo, mainMem, address)
+
+    # Invalida nas caches privadas (L1d, L1i e L2) as linhas dentro da
+    # faixa, a pedido do diretório. As sujas são escritas de volta antes,
+    # as do L1 no L2 e as do L2 no L3 ou na memória principal.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param inicio : int - endereço de início da linha do L3.
+    # @param tamanho : int - tamanho em bytes da linha do L3.
+    #
+    # @return int - linhas sujas escritas de volta.
+    #
+    def invalidarLinha(self, mainMem, inicio, tamanho):
+        return self.__recolherLinha(mainMem, inicio, tamanho, True)
+
+    # Rebaixa nas caches privadas as linhas dentro da faixa, a pedido do
+    # diretório: as sujas são escritas de volta e continuam na cache, limpas.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param inicio : int - endereço de início da linha do L3.
+    # @param tamanho : int - tamanho em bytes da linha do L3.
+    #
+    # @return int - linhas sujas escritas de volta.
+    #
+    def rebaixarLinha(self, mainMem, inicio, tamanho):
+        return self.__recolherLinha(mainMem, inicio, tamanho, False)
+
+    # Invalida no L3 as linhas que têm algum byte da faixa, escrevendo as
+    # sujas de volta na memória principal antes. Como o L3 é compartilhado,
+    # deve ser chamado depois de as caches privadas de todos os núcleos
+    # terem sido invalidadas (ver Processor.invalidarFaixa).
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param inicio : int - endereço inicial da faixa.
+    # @param tamanho : int - tamanho em bytes da faixa.
+    #
+    # @return int - linhas sujas escritas de volta.
+    #
+    def invalidarFaixaL3(self, mainMem, inicio, tamanho):
+        niveis = self.__getNiveis(False)
+        escritas = 0
+
+        for endereco in self.__linhasDaFaixa(self.__l3, inicio, tamanho):
+            vitima = self.__l3.invalidarLinha(endereco)
+            if vitima != None:
+                self.__escreverDeVolta(mainMem, niveis, 2, vitima)
+                escritas += 1
+
+        return escritas
+
+    # Invalida ou limpa as linhas da faixa em L1d, L1i e L2, nesta ordem,
+    # para que as words sujas do L1 cheguem ao L2 antes de ele ser recolhido.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param inicio : int - endereço inicial da faixa (início da linha do L3,
+    #                       a pedido do diretório).
+    # @param tamanho : int - tamanho em bytes da faixa.
+    # @param invalidar : bool - remove as linhas (senão só as limpa).
+    #
+    # @return int - linhas sujas escritas de volta.
+    #
+    def __recolherLinha(self, mainMem, inicio, tamanho, invalidar):
+        dados = self.__getNiveis(False)
+        instrucoes = self.__getNiveis(True)
+        escritas = 0
+
+        for niveis, i in ((dados, 0), (instrucoes, 0), (dados, 1)):
+            cache = niveis[i][1]
+            for endereco in self.__linhasDaFaixa(cache, inicio, tamanho):
+                if invalidar:
+                    vitima = cache.invalidarLinha(endereco)
+                else:
+                    vitima = cache.limparLinha(endereco)
+
+                if vitima != None:
+                    self.__escreverDeVolta(mainMem, niveis, i, vitima)
+                    escritas += 1
+
+        return escritas
+
+    # Endereços de início das linhas de um nível que têm algum byte da faixa.
+    #
+    # @param cache : SACache - o nível.
+    # @param inicio : int - endereço inicial da faixa.
+    # @param tamanho : int - tamanho em bytes da faixa.
+    #
+    # @return range.
+    #
+    def __linhasDaFaixa(self, cache, inicio, tamanho):
+        primeira = self.firstAddressLine(cache.getTamOffset(), inicio)
+        return range(primeira, inicio + tamanho, cache.getTamLinha())
+
+    # Traz para os níveis acima do nível onde o endereço foi encontrado
+    # a linha que o contém. Cada nível é preenchido a partir do nível de
+    # baixo (que em write-back pode ter a linha suja), então só um miss em
+    # todos os níveis lê a memória principal; as vítimas sujas são escritas
+    # de volta.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param address : int - endereço de 32 bits.
+    # @param instrucao : bool - usa o L1 de instruções.
+    # @param nivel : int - onde o endereço foi encontrado (FOUND_IN_*).
+    #
+    # @return None.
+    #
+    def trazerLinha(self, mainMem, address, instrucao, nivel):
+        self.__preencher(mainMem, address, self.__getNiveis(instrucao), nivel)
+
+    # Níveis da hierarquia de um tipo de acesso, de cima para baixo.
+    #
+    # @param instrucao : bool - usa o L1 de instruções.
+    #
+    # @return tuple - pares (nome, SACache).
+    #
+    def __getNiveis(self, instrucao):
+        if instrucao:
+            return (('L1i', self.__l1i), ('L2', self.__l2), ('L3', self.__l3))
+        else:
+            return (('L1d', self.__l1d), ('L2', self.__l2), ('L3', self.__l3))
+
+    # Preenche, de baixo para cima, os níveis acima do nível onde o
+    # endereço foi encontrado. Um nível que já tem a linha não é alterado.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param address : int - endereço de 32 bits.
+    # @param niveis : tuple - níveis da hierarquia (ver __getNiveis).
+    # @param nivel : int - onde o endereço foi encontrado (FOUND_IN_*).
+    #
+    # @return None.
+    #
+    def __preencher(self, mainMem, address, niveis, nivel):
+        for i in range(nivel - 2, -1, -1):
+            cache = niveis[i][1]
+            inicio = self.firstAddressLine(cache.getTamOffset(), address)
+
+            if cache.lerLinha(inicio) != None:
+                continue
+
+            numWords = cache.getTamLinha() // 4
+
+            if i + 1 < len(niveis):
+                origem = niveis[i + 1][1]
+                inicioOrigem = self.firstAddressLine(origem.getTamOffset(), address)
+                k = (inicio - inicioOrigem) // 4
+                linha = origem.lerLinha(inicioOrigem)[k:k + numWords]
+            else:
+                linha = mainMem.getMemoryLine(inicio, numWords)
+
+            vitima = self.__inserirLinha(niveis[i][0], cache, inicio, linha)
+
+            if vitima != None:
+                self.__escreverDeVolta(mainMem, niveis, i, vitima)
+
+    # Insere uma linha em um nível e conta o preenchimento e a
+    # substituição, se houve.
+    #
+    # @param nome : str - nome do nível ('L1d', 'L1i', 'L2' ou 'L3').
+    # @param cache : SACache - o nível.
+    # @param inicio : int - endereço de início da linha.
+    # @param linha : list - valores (int) da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha suja
+    #                 substituída, ou None.
+    #
+    def __inserirLinha(self, nome, cache, inicio, linha):
+        codigo, vitima = cache.escreverLinha(inicio, linha)
+
+        if codigo != LINHA_ATUALIZADA:
+            eventos = self.__eventos[nome]
+            eventos['preenchimentos'] += 1
+            if codigo == LINHA_SUBSTITUIDA:
+                eventos['substituicoes'] += 1
+
+        return vitima
+
+    # Escreve as words sujas de uma linha substituída no primeiro nível
+    # abaixo que tenha a linha que a contém, ou na memória principal. As
+    # words limpas não são escritas: podem ter sido alteradas depois do
+    # preenchimento por escritas que não acertaram a linha e foram direto
+    # para baixo.
+    #
+    # @param mainMem : MainMemory - referência para a memória principal.
+    # @param niveis : tuple - níveis da hierarquia (ver __getNiveis).
+    # @param i : int - índice em niveis do nível de onde a linha saiu.
+    # @param vitima : tuple - (endereço, words, bits de sujo) retornado por setLine.
+    #
+    # @return None.
+    #
+    def __escreverDeVolta(self, mainMem, niveis, i, vitima):
+        endereco, words, sujas = vitima
+        self.__contadores[niveis[i][0]] += 1
+        self.__eventos[niveis[i][0]]['escritasDeVolta'] += 1
+
+        for nome, cache in niveis[i + 1:]:
+            inicio = self.firstAddressLine(cache.getTamOffset(), endereco)
+            if cache.escreverPalavras(inicio, (endereco - inicio) // 4, words, sujas) == CACHE_HIT:
+                return
+
+        for k, valor in enumerate(words):
+            if sujas[k]:
+                mainMem.escreverWord(endereco // 4 + k, valor)
+
+        self.__contadores['linhas'] += 1
+
     # Formata o endereço para pegar a linha toda.
     # @param addr : int - endereço de 32 bits.
     # @return int.]
@@ -297,8 +680,8 @@ class Cache:
 ### FUNÇÕES DE INTERFACE (adapter):
 
 
-def createCache(l1d, l1i, l2, l3):
-    return Cache(l1d, l1i, l2, l3)
+def createCache(l1d, l1i, l2, l3, escrita=ESCRITA_WRITE_THROUGH, coerencia=None):
+    return Cache(l1d, l1i, l2, l3, escrita, coerencia)
 
 
 def fetchCacheData(c, mmem, address):
@@ -310,19 +693,25 @@ def fetchCacheInstruction(c, mmem, address):
 
 
 def getCacheData(c, mmem, address, value):
-    return c.getCacheData(mmem, address, value)
+    nivel, valor = c.getCacheData(mmem, address)
+    if valor != None:
+        value.set(valor)
+    return nivel
 
 
 def getCacheInstruction(c, mmem, address, value):
-    return c.getCacheInst(mmem, address, value)
+    nivel, valor = c.getCacheInst(mmem, address)
+    if valor != None:
+        value.set(valor)
+    return nivel
 
 
 def setCacheData(c, address, value):
-    return c.setCacheData(address, value)
+    return c.setCacheData(address, value.get())
 
 
 def setCacheInstruction(c, address, value):
-    return c.setCacheInst(address, value)
+    return c.setCacheInst(address, value.get())
 
 
 def duplicateCache(c):
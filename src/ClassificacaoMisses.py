@@ -0,0 +1,96 @@
+from array import array
+from src.TACache import TACache
+from src.util import log2
+from src.constantes import *
+
+
+class ClassificacaoMisses:
+    # Classifica os misses de uma cache em compulsórios, de capacidade e de
+    # conflito (os "3 Cs"). Todos os acessos da cache são repetidos em uma
+    # sombra totalmente associativa LRU de mesma capacidade e tamanho de
+    # linha, que só guarda as tags e as busca pelo índice do TACache. Um miss
+    # é de conflito se a sombra acertou, de capacidade se a sombra errou mas
+    # já teve a tag do endereço (e a expulsou) e compulsório se nunca a teve.
+    #
+    # A sombra é preenchida como a cache observada, com a linha alinhada
+    # que contém o endereço, então acerta e erra pelos mesmos critérios. As
+    # tags são as do TACache (endereço >> log2(tamLinha // 4)), de modo que
+    # um endereço do fim da linha pode errar mesmo depois de ela ser trazida.
+    #
+    # @param capacidade : int - capacidade da cache observada, em bytes.
+    # @param tamLinha : int - tamanho de linha da cache observada, em bytes.
+    #
+    # @raise TypeError, ValueError.
+    #
+    def __init__(self, capacidade, tamLinha):
+        self.__sombra = TACache(capacidade, tamLinha, POLITICA_LRU, dados=False)
+        self.__bitsLinha = log2(tamLinha)
+        self.__tamOffset = log2(tamLinha // 4)
+
+        # tags (endereço >> tamOffset, como na sombra) já inseridas na sombra.
+        self.__vistas = set()
+
+        self.__compulsorios = 0
+        self.__capacidade = 0
+        self.__conflito = 0
+
+    # Registra um acesso da cache observada.
+    #
+    # @param address : int - endereço de 32 bits, já verificado.
+    # @param hit : bool - se o acesso acertou na cache observada.
+    #
+    # @return None.
+    #
+    def acesso(self, address, hit):
+        if self.__sombra.lerDado(address) != None:
+            if not hit:
+                self.__conflito += 1
+            return
+
+        primeiro = address >> self.__tamOffset not in self.__vistas
+
+        inicio = address >> self.__bitsLinha << self.__bitsLinha
+        self.__sombra.escreverLinha(inicio, [])
+        self.__vistas.add(inicio >> self.__tamOffset)
+
+        if not hit:
+            if primeiro:
+                self.__compulsorios += 1
+            else:
+                self.__capacidade += 1
+
+    # Obtém as contagens de misses por classe.
+    #
+    # @return dict - 'compulsorios', 'capacidade' e 'conflito'.
+    #
+    def getContagens(self):
+        return {
+            'compulsorios': self.__compulsorios,
+            'capacidade': self.__capacidade,
+            'conflito': self.__conflito,
+        }
+
+    # Obtém o estado da classificação para um checkpoint: sombra, tags já
+    # inseridas nela e contagens.
+    #
+    # @return dict.
+    #
+    def getEstado(self):
+        return {
+            'sombra': self.__sombra.getEstado(),
+            'vistas': array('I', self.__vistas),
+            'contagens': (self.__compulsorios, self.__capacidade, self.__conflito),
+        }
+
+    # Restaura um estado obtido com getEstado.
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        self.__sombra.setEstado(estado['sombra'])
+        self.__vistas = set(estado['vistas'])
+        self.__compulsorios, self.__capacidade, self.__conflito = estado['contagens']
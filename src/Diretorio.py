@@ -0,0 +1,213 @@
+from src.constantes import *
+
+
+class Diretorio:
+    # Diretório de coerência das caches privadas (L1d, L1i e L2) dos
+    # núcleos, guardado junto do L3 compartilhado e na granularidade das
+    # linhas dele: por linha, a máscara de bits dos núcleos que a têm e,
+    # se um só núcleo a tem com permissão de escrita, se ela está exclusiva
+    # (só no MESI, limpa) ou modificada. Invalidações e rebaixamentos vão
+    # só para os núcleos da máscara, sem consultar os outros.
+    #
+    # As caches de cada núcleo avisam o diretório:
+    #
+    #   leitura(n, ...) - miss no L1 do núcleo n, antes de buscar abaixo;
+    #   escrita(n, ...) - antes de todo store do núcleo n.
+    #
+    # Substituições de linhas limpas nas caches privadas não são avisadas,
+    # então a máscara pode ter núcleos que já não têm a linha (como em um
+    # diretório com substituições silenciosas), e as mensagens para eles
+    # também contam no tráfego. As entradas não dependem de a linha estar no
+    # L3, que não invalida os níveis de cima ao substituir.
+    #
+    # @param protocolo : str - COERENCIA_MSI ou COERENCIA_MESI.
+    # @param tamOffset : int - bits de offset das linhas do L3.
+    #
+    def __init__(self, protocolo, tamOffset):
+        self.__protocolo = protocolo
+        self.__tamOffset = tamOffset
+        self.__tamLinha = 1 << tamOffset
+
+        # hierarquias (Cache) dos núcleos, na ordem em que foram criadas.
+        self.__nucleos = []
+
+        # linha do L3 -> máscara dos núcleos que a têm; só linhas que algum
+        # núcleo já acessou.
+        self.__compartilhadores = {}
+
+        # linha do L3 -> modificada (bool), para as linhas com um só núcleo
+        # com permissão de escrita; as demais da máscara estão compartilhadas.
+        self.__exclusivas = {}
+
+        # linha do L3 -> máscara dos núcleos que a perderam por invalidação
+        # e ainda não voltaram a acessá-la (o próximo acesso é um miss de
+        # coerência).
+        self.__invalidadas = {}
+
+        # por núcleo: misses de coerência, invalidações e rebaixamentos
+        # recebidos, pedidos de escrita de linhas compartilhadas
+        # (atualizações) e linhas sujas escritas de volta por invalidações
+        # e rebaixamentos.
+        self.__contagens = []
+
+    # Registra a hierarquia de um núcleo, para receber as invalidações e
+    # rebaixamentos.
+    #
+    # @param cache : Cache - hierarquia do núcleo.
+    #
+    # @return int - número do núcleo no diretório.
+    #
+    def registrar(self, cache):
+        self.__nucleos.append(cache)
+        self.__contagens.append({'missesCoerencia': 0, 'invalidacoes': 0, 'rebaixamentos': 0,
+                                 'atualizacoes': 0, 'escritasDeVolta': 0})
+        return len(self.__nucleos) - 1
+
+    # Obtém o protocolo de coerência.
+    #
+    # @return str.
+    #
+    def getProtocolo(self):
+        return self.__protocolo
+
+    # Obtém uma cópia das contagens de cada núcleo.
+    #
+    # @return list - dict de contagens por núcleo.
+    #
+    def getContagens(self):
+        return [dict(contagens) for contagens in self.__contagens]
+
+    # Leitura que não acertou o L1 do núcleo. Se outro núcleo tem a linha
+    # exclusiva ou modificada, ele é rebaixado (escreve de volta o que está
+    # sujo e fica com a linha compartilhada). No MESI, quem lê uma linha que
+    # nenhum outro núcleo tem fica com ela exclusiva.
+    #
+    # @param n : int - núcleo da leitura.
+    # @param mainMem : MainMemory - memória principal, para as escritas de volta.
+    # @param address : int - endereço lido.
+    #
+    # @return None.
+    #
+    def leitura(self, n, mainMem, address):
+        linha = address >> self.__tamOffset
+        bit = 1 << n
+        mascara = self.__compartilhadores.get(linha, 0)
+
+        self.__acessoDepoisDeInvalidar(n, linha, bit)
+
+        if linha in self.__exclusivas:
+            if mascara == bit:
+                return
+            del self.__exclusivas[linha]
+            self.__enviar(mascara.bit_length() - 1, mainMem, linha, False)
+        elif mascara & ~bit == 0 and self.__protocolo == COERENCIA_MESI:
+            self.__exclusivas[linha] = False
+
+        self.__compartilhadores[linha] = mascara | bit
+
+    # Escrita do núcleo, antes de ela chegar às caches. Se o núcleo não tem
+    # a linha exclusiva ou modificada, os outros núcleos da máscara são
+    # invalidados (escrevendo de volta o que está sujo) e ela fica
+    # modificada no núcleo. Uma linha exclusiva passa a modificada sem
+    # mensagens.
+    #
+    # @param n : int - núcleo da escrita.
+    # @param mainMem : MainMemory - memória principal, para as escritas de volta.
+    # @param address : int - endereço escrito.
+    #
+    # @return None.
+    #
+    def escrita(self, n, mainMem, address):
+        linha = address >> self.__tamOffset
+        bit = 1 << n
+        mascara = self.__compartilhadores.get(linha, 0)
+
+        if mascara == bit and linha in self.__exclusivas:
+            self.__exclusivas[linha] = True
+            return
+
+        self.__acessoDepoisDeInvalidar(n, linha, bit)
+
+        if mascara & bit:
+            self.__contagens[n]['atualizacoes'] += 1
+
+        outros = mascara & ~bit
+        if outros:
+            self.__invalidadas[linha] = self.__invalidadas.get(linha, 0) | outros
+            while outros:
+                dono = outros.bit_length() - 1
+                outros ^= 1 << dono
+                self.__enviar(dono, mainMem, linha, True)
+
+        self.__compartilhadores[linha] = bit
+        self.__exclusivas[linha] = True
+
+    # Conta um miss de coerência se o núcleo perdeu a linha por invalidação
+    # desde o último acesso a ela.
+    #
+    # @param n : int - núcleo do acesso.
+    # @param linha : int - linha do L3.
+    # @param bit : int - bit do núcleo na máscara.
+    #
+    # @return None.
+    #
+    def __acessoDepoisDeInvalidar(self, n, linha, bit):
+        invalidadas = self.__invalidadas.get(linha, 0)
+        if invalidadas & bit:
+            self.__contagens[n]['missesCoerencia'] += 1
+            if invalidadas == bit:
+                del self.__invalidadas[linha]
+            else:
+                self.__invalidadas[linha] = invalidadas & ~bit
+
+    # Envia uma invalidação ou um rebaixamento da linha para um núcleo.
+    #
+    # @param n : int - núcleo de destino.
+    # @param mainMem : MainMemory - memória principal, para as escritas de volta.
+    # @param linha : int - linha do L3.
+    # @param invalidar : bool - invalida (senão rebaixa) a linha.
+    #
+    # @return None.
+    #
+    def __enviar(self, n, mainMem, linha, invalidar):
+        cache = self.__nucleos[n]
+        contagens = self.__contagens[n]
+        endereco = linha << self.__tamOffset
+
+        if invalidar:
+            contagens['invalidacoes'] += 1
+            contagens['escritasDeVolta'] += cache.invalidarLinha(mainMem, endereco, self.__tamLinha)
+        else:
+            contagens['rebaixamentos'] += 1
+            contagens['escritasDeVolta'] += cache.rebaixarLinha(mainMem, endereco, self.__tamLinha)
+
+    # Obtém o estado do diretório para um checkpoint. Os dicts não são
+    # copiados, então o estado deve ser gravado antes de haver novos acessos.
+    #
+    # @return dict.
+    #
+    def getEstado(self):
+        return {
+            'compartilhadores': self.__compartilhadores,
+            'exclusivas': self.__exclusivas,
+            'invalidadas': self.__invalidadas,
+            'contagens': self.getContagens(),
+        }
+
+    # Restaura um estado obtido com getEstado de um diretório com o mesmo
+    # número de núcleos.
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if len(estado['contagens']) != len(self.__nucleos):
+            raise ValueError('Estado salvo incompatível com o diretório (número de núcleos diferente).')
+
+        self.__compartilhadores = dict(estado['compartilhadores'])
+        self.__exclusivas = dict(estado['exclusivas'])
+        self.__invalidadas = dict(estado['invalidadas'])
+        self.__contagens = [dict(contagens) for contagens in estado['contagens']]
@@ -1,24 +1,38 @@
+from array import array
+import sys
 from src.util import log2
-from src.util import Word
+from src.util import copiarBuffer
 from src.constantes import *
 
 
 class MainMemory:
+    # estático:
+    palavrasPagina = 1024   # words por página (4 KB)
+
     # Construtor da Memória principal.
     #
     # @param ramsize : int - Capacidade total da memória real, que deve ser múltiplo de 4.
     #
     # @param tamLinha : int - Capacidade total da memória virtual, que deve ser múltiplo de 4.
     #
+    # @param dados : bool - guarda as words; se False (modo só de tags), as
+    #                       escritas são descartadas e as leituras retornam 0.
+    #
     # @raise TypeError, ValueError.
     #
-    def __init__(self, ramsize, vmsize):
+    def __init__(self, ramsize, vmsize, dados=True):
         self.__apuraInput(ramsize, vmsize)
 
+        self.__dados = dados
+
         self.__ramSize = ramsize
         self.__vmSize = vmsize
         self.__totalSize = ramsize + vmsize
-        self.__dataList = [Word(0)] * (self.__totalSize // 4)
+        self.__numWords = self.__totalSize // 4
+
+        # Páginas materializadas (número da página -> words). Só existem as
+        # páginas já escritas, as demais são lidas como zero.
+        self.__paginas = {}
 
     # Lança exceção se algum dos argumentos do construtor estiver inconsistente.
     #
@@ -42,6 +56,12 @@ class MainMemory:
         if ((vmsize % 4) != 0):
             raise ValueError('Armazenamento em mem virtual incorreto, deve ser múltiplo de 4.')
 
+    # Informa se a memória guarda as words.
+    # @return bool.
+    #
+    def armazenaDados(self):
+        return self.__dados
+
     # Get atribute.
     # @return int.
     #
@@ -75,46 +95,207 @@ class MainMemory:
     # Setar um endereço da memória com determinado valor.
     #
     # @param address : int - endereço de 32 bits.
-    # @param value : int - valor a ser colocado.
+    # @param value : int - valor a ser colocado, 32 bits sem sinal.
     #
-    # @raise TypeError.
+    # @raise TypeError, OverflowError.
     #
-    # return None.
+    # return int - FOUND_IN_MEM ou ADDRESS_OUT_OF_RANGE.
     #
     def setDado(self, address, value):
         try:
-            self.__verificaWord(value)
             end = self.getEndMem(address)
         except ValueError:
             return ADDRESS_OUT_OF_RANGE
 
-        self.__dataList[end] = value.copy()
+        if self.__dados:
+            self.escreverWord(end, value)
         return FOUND_IN_MEM
 
     # Obter o valor de um requesitado endereço da memória.
     #
     # @param address : int - endereço de 32bits.
-    # @param value : int - valor a ser recuperado
     #
     # @raise TypeError.
     #
-    # return None.
+    # return int - valor de 32 bits, ou None se o endereço estiver fora da faixa.
     #
-    def getDado(self, address, value):
+    def getDado(self, address):
         try:
-            self.__verificaWord(value)
-            value.set( self.__dataList[self.getEndMem(address)].get() )
+            end = self.getEndMem(address)
         except ValueError:
-            return ADDRESS_OUT_OF_RANGE
+            return None
 
-        return FOUND_IN_MEM
+        return self.lerWord(end) if self.__dados else 0
 
     # Retorna cópia dos dados, para depuração.
     #
     # @return list.
     #
     def getList(self):
-        return list(self.__dataList)
+        return self.lerWords(0, self.__numWords)
+
+    # Verifica se uma imagem binária do tamanho dado pode ser carregada a
+    # partir do endereço, para uma imagem lida em partes ser verificada
+    # inteira antes de a primeira ser copiada.
+    #
+    # @param address : int - endereço inicial, múltiplo de 4.
+    # @param tamanho : int - tamanho da imagem em bytes, múltiplo de 4.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return None.
+    #
+    def verificarImagem(self, address, tamanho):
+        self.__verificaAddress(address)
+
+        if address % 4 != 0:
+            raise ValueError('Endereço da imagem deve ser múltiplo de 4.')
+
+        if tamanho % 4 != 0:
+            raise ValueError('Tamanho da imagem deve ser múltiplo de 4.')
+
+        if address + tamanho > self.__totalSize:
+            raise ValueError('Imagem não cabe na memória a partir do endereço.')
+
+    # Carrega uma imagem binária (words de 32 bits little-endian) a partir
+    # de um endereço, sem passar pelas caches.
+    #
+    # @param address : int - endereço inicial, múltiplo de 4.
+    # @param dados : bytes - conteúdo da imagem, tamanho múltiplo de 4.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return None.
+    #
+    def carregarImagem(self, address, dados):
+        self.verificarImagem(address, len(dados))
+
+        if self.__dados:
+            self.escreverBytes(address // 4, dados)
+
+    # Libera os recursos da memória (ver MappedMainMemory); as páginas
+    # não precisam ser liberadas.
+    #
+    # @return None.
+    #
+    def fechar(self):
+        pass
+
+    # Primitivas de armazenamento, com índices em words e sem verificação de
+    # argumentos. São as únicas que acessam as páginas, variantes da memória
+    # (ver MappedMainMemory) só precisam redefini-las.
+
+    # Lê uma word.
+    #
+    # @param end : int - índice da word.
+    #
+    # @return int.
+    #
+    def lerWord(self, end):
+        pag, pos = divmod(end, MainMemory.palavrasPagina)
+        pagina = self.__paginas.get(pag)
+        return pagina[pos] if pagina != None else 0
+
+    # Escreve uma word.
+    #
+    # @param end : int - índice da word.
+    # @param valor : int - valor de 32 bits.
+    #
+    # @return None.
+    #
+    def escreverWord(self, end, valor):
+        pag, pos = divmod(end, MainMemory.palavrasPagina)
+        self.__getPagina(pag)[pos] = valor
+
+    # Obtém os valores de um intervalo de words, lendo zero das páginas
+    # que não foram escritas.
+    #
+    # @param inicio : int - índice da primeira word.
+    # @param quantidade : int - número de words.
+    #
+    # @raise IndexError.
+    #
+    # @return list.
+    #
+    def lerWords(self, inicio, quantidade):
+        fim = inicio + quantidade
+        if inicio < 0 or fim > self.__numWords:
+            raise IndexError('Intervalo fora da memória.')
+
+        tam = MainMemory.palavrasPagina
+        valores = []
+        while inicio < fim:
+            pag, pos = divmod(inicio, tam)
+            n = min(tam - pos, fim - inicio)
+            pagina = self.__paginas.get(pag)
+            if pagina == None:
+                valores += [0] * n
+            else:
+                valores += pagina[pos:pos + n]
+            inicio += n
+        return valores
+
+    # Escreve um bloco de words little-endian de uma vez, página a página.
+    #
+    # @param inicio : int - índice da primeira word.
+    # @param dados : bytes - words de 32 bits little-endian.
+    #
+    # @return None.
+    #
+    def escreverBytes(self, inicio, dados):
+        tam = MainMemory.palavrasPagina
+        dados = memoryview(dados)
+        while len(dados) > 0:
+            pag, pos = divmod(inicio, tam)
+            n = min(tam - pos, len(dados) // 4)
+            bloco = array('I')
+            bloco.frombytes(dados[:4 * n])
+            if sys.byteorder == 'big':
+                bloco.byteswap()
+            self.__getPagina(pag)[pos:pos + n] = bloco
+            dados = dados[4 * n:]
+            inicio += n
+
+    # Obtém o estado da memória para um checkpoint: as páginas já escritas
+    # (sem cópia, o estado deve ser gravado antes de a memória ser alterada).
+    #
+    # @return dict - número da página -> words.
+    #
+    def getEstado(self):
+        return self.__paginas
+
+    # Restaura um estado obtido com getEstado de uma memória de mesma
+    # capacidade.
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        modelo = array('I', bytes(4 * MainMemory.palavrasPagina))
+        numPaginas = -(-self.__numWords // MainMemory.palavrasPagina)
+
+        paginas = {}
+        for pag, pagina in estado.items():
+            if not 0 <= pag < numPaginas:
+                raise ValueError('Estado salvo incompatível com a memória (página fora da faixa).')
+            paginas[pag] = copiarBuffer(modelo, pagina)
+        self.__paginas = paginas
+
+    # Retorna a página, criando-a (zerada) se ainda não foi escrita.
+    #
+    # @param pag : int - número da página.
+    #
+    # @return array.
+    #
+    def __getPagina(self, pag):
+        pagina = self.__paginas.get(pag)
+        if pagina == None:
+            pagina = array('I', bytes(4 * MainMemory.palavrasPagina))
+            self.__paginas[pag] = pagina
+        return pagina
 
     # Verifica corretude do endereço.
     #
@@ -132,37 +313,38 @@ class MainMemory:
         if address >= self.__totalSize:
             raise ValueError('Endereço fora da faixa.')
 
-    # Verifica corretude da palavra de 32 bits.
-    #
-    # @param word : Word - palavra 32 bits.
-    #
-    # @raise TypeError.
-    #
-    # @return None.
-    #
-    def __verificaWord(self, word):
-        if type(word) != Word:
-            raise TypeError('Word inválida.')
-
     # Pega uma linha inteira que cabe no L3.
     # @param start : int - endereço inicial.
+    # @param numWords : int - tamanho da linha em words (tamLinha // 4).
+    # @raise IndexError.
     # @return list.
     #
-    def getMemoryLine(self, start, tamLinha):
-        # print([self.__dataList[i] for i in range(start//4, start//4 + tamLinha)])
-        return [self.__dataList[i] for i in range(start//4, start//4 + tamLinha)]
+    def getMemoryLine(self, start, numWords):
+        if not self.__dados:
+            if start < 0 or start//4 + numWords > self.__numWords:
+                raise IndexError('Intervalo fora da memória.')
+            return []
+        return self.lerWords(start//4, numWords)
 
 
 ### Funções de interface (adapter):
 
 
-def createMainMemory(ramsize, vmsize):
-    return MainMemory(ramsize, vmsize)
+def createMainMemory(ramsize, vmsize, dados=True):
+    return MainMemory(ramsize, vmsize, dados)
 
 
 def getMainMemoryData(mem, address, value):
-    return mem.getDado(address, value)
+    valor = mem.getDado(address)
+    if valor == None:
+        return ADDRESS_OUT_OF_RANGE
+    value.set(valor)
+    return FOUND_IN_MEM
 
 
 def setMainMemoryData(mem, address, value):
-    return mem.setDado(address, value)
+    return mem.setDado(address, value.get())
+
+
+def loadMainMemoryImage(mem, address, data):
+    mem.carregarImagem(address, data)
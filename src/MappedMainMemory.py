@@ -0,0 +1,164 @@
+import mmap
+import os
+import struct
+from src.MainMemory import MainMemory
+
+
+class MappedMainMemory(MainMemory):
+    # Construtor da Memória principal mapeada em arquivo. O arquivo guarda
+    # as words em sequência (32 bits little-endian) e é criado ou estendido
+    # com zeros até a capacidade total; se já existir, seu conteúdo é a
+    # memória inicial. No modo só de tags (dados False) não há words a
+    # guardar, então o arquivo não é aberto nem criado.
+    #
+    # @param ramsize : int - Capacidade total da memória real, que deve ser múltiplo de 4.
+    #
+    # @param vmsize : int - Capacidade total da memória virtual, que deve ser múltiplo de 4.
+    #
+    # @param caminho : str - caminho do arquivo de apoio.
+    #
+    # @param dados : bool - mesmo de MainMemory.
+    #
+    # @raise TypeError, ValueError, OSError.
+    #
+    def __init__(self, ramsize, vmsize, caminho, dados=True):
+        MainMemory.__init__(self, ramsize, vmsize, dados)
+
+        if type(caminho) != str:
+            raise TypeError('Caminho do arquivo deve ser str.')
+
+        total = self.getTamTotal()
+
+        if total == 0:
+            raise ValueError('Memória mapeada não pode ter capacidade 0.')
+
+        self.__caminho = caminho
+        self.__arquivo = None
+        self.__mapa = None
+
+        if not dados:
+            return
+
+        self.__arquivo = open(caminho, 'r+b' if os.path.exists(caminho) else 'w+b')
+
+        if self.__arquivo.seek(0, 2) < total:
+            self.__arquivo.truncate(total)
+
+        self.__mapa = mmap.mmap(self.__arquivo.fileno(), total)
+
+    # Get atribute.
+    # @return str.
+    #
+    def getCaminho(self):
+        return self.__caminho
+
+    # Grava as páginas alteradas no arquivo e libera o mapeamento.
+    #
+    # @return None.
+    #
+    def fechar(self):
+        if self.__mapa != None and not self.__mapa.closed:
+            self.__mapa.flush()
+            self.__mapa.close()
+            self.__arquivo.close()
+
+    # Obtém o estado da memória para um checkpoint: as páginas do
+    # mapeamento que não são só zeros.
+    #
+    # @return dict - número da página -> bytes.
+    #
+    def getEstado(self):
+        if self.__mapa == None:
+            return MainMemory.getEstado(self)
+
+        tam = 4 * MainMemory.palavrasPagina
+        zeros = bytes(tam)
+        paginas = {}
+        for inicio in range(0, len(self.__mapa), tam):
+            pagina = self.__mapa[inicio:inicio + tam]
+            if pagina != zeros[:len(pagina)]:
+                paginas[inicio // tam] = pagina
+        return paginas
+
+    # Restaura um estado obtido com getEstado de uma memória de mesma
+    # capacidade, sobrescrevendo o arquivo mapeado.
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if self.__mapa == None:
+            return MainMemory.setEstado(self, estado)
+
+        tam = 4 * MainMemory.palavrasPagina
+        total = len(self.__mapa)
+
+        for pag, pagina in estado.items():
+            if type(pagina) != bytes or pag < 0 or pag * tam + len(pagina) > total or len(pagina) > tam:
+                raise ValueError('Estado salvo incompatível com a memória (página fora da faixa).')
+
+        zeros = bytes(tam)
+        for inicio in range(0, total, tam):
+            fim = min(inicio + tam, total)
+            self.__mapa[inicio:fim] = zeros[:fim - inicio]
+
+        for pag, pagina in estado.items():
+            self.__mapa[pag * tam:pag * tam + len(pagina)] = pagina
+
+    # Lê uma word.
+    #
+    # @param end : int - índice da word.
+    #
+    # @return int.
+    #
+    def lerWord(self, end):
+        return struct.unpack_from('<I', self.__mapa, 4 * end)[0]
+
+    # Escreve uma word.
+    #
+    # @param end : int - índice da word.
+    # @param valor : int - valor de 32 bits.
+    #
+    # @return None.
+    #
+    def escreverWord(self, end, valor):
+        struct.pack_into('<I', self.__mapa, 4 * end, valor)
+
+    # Obtém os valores de um intervalo de words.
+    #
+    # @param inicio : int - índice da primeira word.
+    # @param quantidade : int - número de words.
+    #
+    # @raise IndexError.
+    #
+    # @return list.
+    #
+    def lerWords(self, inicio, quantidade):
+        if self.__mapa == None:
+            return MainMemory.lerWords(self, inicio, quantidade)
+
+        if inicio < 0 or inicio + quantidade > self.getTamTotal() // 4:
+            raise IndexError('Intervalo fora da memória.')
+
+        return list(struct.unpack_from('<{}I'.format(quantidade), self.__mapa, 4 * inicio))
+
+    # Escreve um bloco de words little-endian de uma vez, copiando os
+    # bytes direto para o mapeamento.
+    #
+    # @param inicio : int - índice da primeira word.
+    # @param dados : bytes - words de 32 bits little-endian.
+    #
+    # @return None.
+    #
+    def escreverBytes(self, inicio, dados):
+        self.__mapa[4 * inicio:4 * inicio + len(dados)] = dados
+
+
+### Funções de interface (adapter):
+
+
+def createMappedMainMemory(ramsize, vmsize, path, dados=True):
+    return MappedMainMemory(ramsize, vmsize, path, dados)
@@ -13,61 +13,147 @@ class Memory:
         self.__apuraInput(cache, mem)
         self.__cache = cache
         self.__mem = mem
+        self.__coerente = cache.getCoerencia() != None
 
     # Obtém um dado pelo endereço em algum nível na hierarquia.
-    # Retorna o nível em que foi encontrado.
+    # Retorna o nível em que foi encontrado e o valor.
     # @param adddress : int - endereço de 32 bits.
-    # @param data : Word - palavra de retorno de 32 bits.
-    # @raise TypeError.
-    # @return int.
+    # @raise TypeError, ValueError.
+    # @return tuple - (nível, valor de 32 bits ou None se fora da faixa).
     #
-    def getDado(self, address, data):
-        if 0 <= address < self.__mem.getTamTotal():
-            return self.__cache.getCacheData(self.__mem, address, data)
+    def getDado(self, address):
+        if self.__verificaAddress(address):
+            return self.__cache.getCacheData(self.__mem, address)
         else:
-            return ADDRESS_OUT_OF_RANGE
+            return ADDRESS_OUT_OF_RANGE, None
 
     # Obtém uma instrução pelo endereço em algum nível na hierarquia.
-    # Retorna o nível em que foi encontrado.
+    # Retorna o nível em que foi encontrada e o valor.
     # @param adddress : int - endereço de 32 bits.
-    # @param data : Word - palavra de retorno de 32 bits.
-    # @raise TypeError.
-    # @return int.
+    # @raise TypeError, ValueError.
+    # @return tuple - (nível, valor de 32 bits ou None se fora da faixa).
     #
-    def getInstrucao(self, address, instruction):
-        if 0 <= address < self.__mem.getTamTotal():
-            return self.__cache.getCacheInst(self.__mem, address, instruction)
+    def getInstrucao(self, address):
+        if self.__verificaAddress(address):
+            return self.__cache.getCacheInst(self.__mem, address)
         else:
-            return ADDRESS_OUT_OF_RANGE
+            return ADDRESS_OUT_OF_RANGE, None
 
     # Insere um dado na memória, obedecendo a hierarquia.
     # @param adddress : int - endereço de 32 bits.
-    # @param data : Word - palavra a inserir de 32 bits.
-    # @return None.
+    # @param data : int - palavra a inserir de 32 bits.
+    # @raise TypeError, ValueError.
+    # @return int.
     #
     def setDado(self, address, data):
-        if 0 <= address < self.__mem.getTamTotal():
+        self.__verificaValor(data)
+        data &= MASCARA_WORD
+
+        if self.__verificaAddress(address):
+            # Com coerência, as cópias dos outros núcleos são invalidadas antes.
+            if self.__coerente:
+                self.__cache.obterExclusividade(self.__mem, address)
+
             nivel = self.__cache.setCacheData(address, data)
-            self.__mem.setDado(address, data)
-            self.__cache.setLineCacheData(self.__mem, address)
+
+            # Em write-back o store fica só no nível do hit (na memória se
+            # não acertou nenhum) e a linha é trazida para os níveis acima.
+            if self.__cache.getEscrita() == ESCRITA_WRITE_BACK:
+                if nivel == FOUND_IN_MEM:
+                    self.__mem.setDado(address, data)
+                    self.__cache.contabilizaEscritaMemoria()
+                if nivel != FOUND_IN_L1:
+                    self.__cache.trazerLinha(self.__mem, address, False, nivel)
+            else:
+                self.__mem.setDado(address, data)
+                self.__cache.contabilizaEscritaMemoria()
+                self.__cache.setLineCacheData(self.__mem, address)
+
             return nivel
         else:
             return ADDRESS_OUT_OF_RANGE
 
     # Insere uma instrução na memória, obedecendo a hierarquia.
     # @param adddress : int - endereço de 32 bits.
-    # @param data : Word - palavra a inserir de 32 bits.
-    # @return None.
+    # @param data : int - palavra a inserir de 32 bits.
+    # @raise TypeError, ValueError.
+    # @return int.
     #
     def setInstrucao(self, address, instruction):
-        if 0 <= address <self.__mem.getTamTotal():
+        self.__verificaValor(instruction)
+        instruction &= MASCARA_WORD
+
+        if self.__verificaAddress(address):
+            # Com coerência, as cópias dos outros núcleos são invalidadas antes.
+            if self.__coerente:
+                self.__cache.obterExclusividade(self.__mem, address)
+
             nivel = self.__cache.setCacheInst(address, instruction)
-            self.__mem.setDado(address, instruction)
-            self.__cache.setLineCacheInst(self.__mem, address)
+
+            # Em write-back o store fica só no nível do hit (na memória se
+            # não acertou nenhum) e a linha é trazida para os níveis acima.
+            if self.__cache.getEscrita() == ESCRITA_WRITE_BACK:
+                if nivel == FOUND_IN_MEM:
+                    self.__mem.setDado(address, instruction)
+                    self.__cache.contabilizaEscritaMemoria()
+                if nivel != FOUND_IN_L1:
+                    self.__cache.trazerLinha(self.__mem, address, True, nivel)
+            else:
+                self.__mem.setDado(address, instruction)
+                self.__cache.contabilizaEscritaMemoria()
+                self.__cache.setLineCacheInst(self.__mem, address)
+
             return nivel
         else:
             return ADDRESS_OUT_OF_RANGE
 
+    # Get instance.
+    # @return Cache.
+    #
+    def getCache(self):
+        return self.__cache
+
+    # Invalida nas caches privadas do núcleo (L1d, L1i e L2) as linhas que
+    # têm algum byte da faixa, escrevendo de volta as sujas.
+    # @param inicio : int - endereço inicial da faixa.
+    # @param tamanho : int - tamanho em bytes da faixa.
+    # @return None.
+    #
+    def invalidarFaixa(self, inicio, tamanho):
+        self.__cache.invalidarLinha(self.__mem, inicio, tamanho)
+
+    # Invalida no L3, compartilhado, as linhas que têm algum byte da faixa,
+    # escrevendo de volta na memória principal as sujas.
+    # @param inicio : int - endereço inicial da faixa.
+    # @param tamanho : int - tamanho em bytes da faixa.
+    # @return None.
+    #
+    def invalidarFaixaL3(self, inicio, tamanho):
+        self.__cache.invalidarFaixaL3(self.__mem, inicio, tamanho)
+
+    # Obtém o estado da hierarquia para um checkpoint. A memória principal,
+    # o L3 e os contadores de escrita são compartilhados entre os núcleos,
+    # então só são incluídos se pedido.
+    # @param compartilhado : bool - inclui o que é compartilhado.
+    # @return dict.
+    #
+    def getEstado(self, compartilhado=True):
+        return {
+            'cache': self.__cache.getEstado(compartilhado),
+            'memoria': self.__mem.getEstado() if compartilhado else None,
+        }
+
+    # Restaura um estado obtido com getEstado de uma hierarquia de mesma
+    # configuração.
+    # @param estado : dict - estado salvo.
+    # @raise ValueError.
+    # @return None.
+    #
+    def setEstado(self, estado):
+        self.__cache.setEstado(estado['cache'])
+        if estado['memoria'] != None:
+            self.__mem.setEstado(estado['memoria'])
+
     # Duplica.
     # @return Memory.
     #
@@ -79,7 +165,7 @@ class Memory:
     # @param cache : Cache - mesmo do construtor.
     # @param mem : MainMemory - mesmo do construtor.
     #
-    # @raise TypeError
+    # @raise TypeError, ValueError.
     #
     # @return None.
     #
@@ -87,9 +173,48 @@ class Memory:
         if type(cache) != Cache:
             raise TypeError('Tipo objeto Cache incorreto.')
 
-        if type(mainMem) != MainMemory:
+        if not isinstance(mainMem, MainMemory):
             raise TypeError('Tipo objeto Memory incorreto.')
 
+        if cache.armazenaDados() != mainMem.armazenaDados():
+            raise ValueError('Cache e memória principal devem estar no mesmo modo (dados ou só tags).')
+
+    # Verifica o endereço de um acesso. É a única verificação do caminho
+    # do acesso, os níveis da cache recebem o endereço já verificado.
+    #
+    # @param address : int - endereço de 32 bits.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return bool - se o endereço está na faixa da memória principal.
+    #
+    def __verificaAddress(self, address):
+        if type(address) != int:
+            raise TypeError('Endereço deve ser int.')
+
+        if not 0 <= address < self.__mem.getTamTotal():
+            return False
+
+        if address.bit_length() > 32:
+            raise ValueError('Endereço inválido.')
+
+        return True
+
+    # Verifica o valor a ser escrito, que vai como inteiro pela hierarquia
+    # (negativos em complemento de dois, ver MASCARA_WORD).
+    #
+    # @param valor : int - palavra de 32 bits.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return None.
+    #
+    def __verificaValor(self, valor):
+        if type(valor) != int:
+            raise TypeError('Valor da word deve ser int.')
+        if valor.bit_length() > 32:
+            raise ValueError('Tamanho da word deve ser no máx. 32 bits.')
+
 
 ### Funções de interface (adapter):
 
@@ -99,21 +224,26 @@ def createMemory(c, mem):
 
 
 def getData(mem, address, value):
-    return mem.getDado(address, value)
+    nivel, valor = mem.getDado(address)
+    if valor != None:
+        value.set(valor)
+    return nivel
 
 
 def getInstruction(mem, address, value):
-    return mem.getInstrucao(address, value)
+    nivel, valor = mem.getInstrucao(address)
+    if valor != None:
+        value.set(valor)
+    return nivel
 
 
 def setData(mem, address, value):
-    return mem.setDado(address, value)
+    return mem.setDado(address, value.get())
 
 
 def setInstruction(mem, address, value):
-    return mem.setInstrucao(address, value)
+    return mem.setInstrucao(address, value.get())
 
 
 def duplicateMemory(mem):
     return mem.duplicate()
-
@@ -0,0 +1,157 @@
+from time import perf_counter
+from io import StringIO
+import cProfile
+import pstats
+
+
+class Perfil:
+    # Medidas de desempenho de uma execução do interpretador: tempo de
+    # leitura (análise do arquivo ou dos registros do trace), de construção
+    # da hierarquia e de execução, e tempo e número de cada tipo de comando.
+    # Só é usado no modo de perfil, então a execução normal não paga nada.
+    #
+    # @param cprofile : bool - roda também o cProfile na execução toda e
+    #                          inclui as funções mais caras no relatório.
+    # @param numFuncoes : int - funções listadas do cProfile.
+    #
+    def __init__(self, cprofile=False, numFuncoes=25):
+        self.__fases = {}
+        self.__fase = None
+        self.__tempoLeitura = 0.0
+        self.__inicio = None
+        self.__total = 0.0
+
+        # comando -> [execuções, tempo total]
+        self.__comandos = {}
+
+        self.__profiler = cProfile.Profile() if cprofile else None
+        self.__numFuncoes = numFuncoes
+
+    # Marca o início da execução.
+    # @return None.
+    #
+    def iniciar(self):
+        self.__inicio = perf_counter()
+        if self.__profiler != None:
+            self.__profiler.enable()
+
+    # Marca o fim da execução.
+    # @return None.
+    #
+    def parar(self):
+        if self.__profiler != None:
+            self.__profiler.disable()
+        self.__total = perf_counter() - self.__inicio
+
+    # Inicia uma fase (construção ou execução). O tempo de leitura gasto
+    # durante a fase (ver medirLeitura) é descontado dela.
+    # @param nome : str - nome da fase.
+    # @return None.
+    #
+    def iniciarFase(self, nome):
+        self.__fase = (nome, perf_counter(), self.__tempoLeitura)
+
+    # Termina a fase iniciada por último.
+    # @return None.
+    #
+    def terminarFase(self):
+        nome, inicio, leitura = self.__fase
+        duracao = (perf_counter() - inicio) - (self.__tempoLeitura - leitura)
+        self.__fases[nome] = self.__fases.get(nome, 0.0) + duracao
+        self.__fase = None
+
+    # Conta como leitura o tempo gasto para obter cada item.
+    # @param iteravel : iterable - comandos ou registros a medir.
+    # @return generator.
+    #
+    def medirLeitura(self, iteravel):
+        iterador = iter(iteravel)
+        while True:
+            inicio = perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                self.__tempoLeitura += perf_counter() - inicio
+                return
+            self.__tempoLeitura += perf_counter() - inicio
+            yield item
+
+    # Conta um tempo de leitura medido fora de medirLeitura.
+    # @param duracao : float - segundos.
+    # @return None.
+    #
+    def contabilizaLeitura(self, duracao):
+        self.__tempoLeitura += duracao
+
+    # Contabiliza a execução de um comando.
+    # @param cmd : str - nome do comando.
+    # @param duracao : float - segundos.
+    # @return None.
+    #
+    def comando(self, cmd, duracao):
+        medida = self.__comandos.get(cmd)
+        if medida == None:
+            self.__comandos[cmd] = [1, duracao]
+        else:
+            medida[0] += 1
+            medida[1] += duracao
+
+    # Número de acessos à hierarquia (comandos de leitura, escrita e assert).
+    # @return int.
+    #
+    def getNumAcessos(self):
+        return sum(n for cmd, (n, t) in self.__comandos.items() if cmd != 'limg')
+
+    # Retorna as medidas em segundos.
+    # @return dict - 'total', 'leitura', as fases e 'comandos' (comando ->
+    #                (execuções, tempo)).
+    #
+    def getMedidas(self):
+        medidas = dict(self.__fases)
+        medidas['total'] = self.__total
+        medidas['leitura'] = self.__tempoLeitura
+        medidas['comandos'] = {cmd: tuple(medida) for cmd, medida in self.__comandos.items()}
+        return medidas
+
+    # Tabela com as medidas, para o relatório final.
+    # @param MAX_LENGTH : int - largura usada para centralizar o título.
+    # @return str.
+    #
+    def gerarRelatorio(self, MAX_LENGTH):
+        execucao = self.__fases.get('execução', 0.0)
+        acessos = self.getNumAcessos()
+        taxa = '{:.0f}'.format(acessos / execucao) if execucao > 0 else '-'
+
+        separador = '+----------------------+---------------+---------------+-------------+\n'
+
+        out =  'Perfil da execução'.center(MAX_LENGTH) + '\n'
+        out += separador
+        out += '| Fase                 |   Tempo (s)   |       %       |             |\n'
+        out += separador
+        fases = [('leitura', self.__tempoLeitura)] + list(self.__fases.items())
+        for nome, tempo in fases:
+            out += '| {:<20} | {:>13.4f} | {:>13} |             |\n'.format(nome, tempo, self.__porcentagem(tempo))
+        out += separador
+        out += '| {:<20} | {:>13.4f} | {:>13} |             |\n'.format('total', self.__total, '100.00%')
+        out += separador
+        out += '| Comando              |   Execuções   |   Tempo (s)   |  us/comando |\n'
+        out += separador
+        for cmd, (n, tempo) in sorted(self.__comandos.items()):
+            out += '| {:<20} | {:>13} | {:>13.4f} | {:>11.2f} |\n'.format(cmd, n, tempo, 1e6 * tempo / n)
+        out += separador
+        out += '{} acessos em {:.4f} s de execução: {} acessos/s.'.format(acessos, execucao, taxa)
+
+        if self.__profiler != None:
+            texto = StringIO()
+            estatisticas = pstats.Stats(self.__profiler, stream=texto)
+            estatisticas.sort_stats('cumulative').print_stats(self.__numFuncoes)
+            out += '\n\n\n' + 'cProfile (tempo acumulado)'.center(MAX_LENGTH) + '\n'
+            out += texto.getvalue().rstrip('\n')
+
+        return out
+
+    # Porcentagem do tempo total.
+    # @return str.
+    #
+    def __porcentagem(self, tempo):
+        return '{:.2f}%'.format(100 * tempo / self.__total) if self.__total > 0 else '-'
@@ -33,6 +33,39 @@ class Processor:
     def getCore(self, n):
         return self.__processador[n]
 
+    # Invalida em toda a hierarquia as linhas que têm algum byte da faixa,
+    # escrevendo de volta as sujas, para a memória principal ser alterada
+    # por fora das caches. As caches privadas de todos os núcleos vêm
+    # antes do L3, que é compartilhado e recebe as escritas de volta delas.
+    # @param inicio : int - endereço inicial da faixa.
+    # @param tamanho : int - tamanho em bytes da faixa.
+    # @return None.
+    #
+    def invalidarFaixa(self, inicio, tamanho):
+        for mem in self.__processador:
+            mem.invalidarFaixa(inicio, tamanho)
+        self.__processador[0].invalidarFaixaL3(inicio, tamanho)
+
+    # Obtém o estado de todos os núcleos para um checkpoint. O que é
+    # compartilhado (L3, memória principal) vai só com o núcleo 0.
+    # @return list.
+    #
+    def getEstado(self):
+        return [mem.getEstado(n == 0) for n, mem in enumerate(self.__processador)]
+
+    # Restaura um estado obtido com getEstado de um processador de mesma
+    # configuração.
+    # @param estado : list - estado salvo.
+    # @raise ValueError.
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if len(estado) != len(self.__processador):
+            raise ValueError('Estado salvo incompatível com o processador (número de núcleos diferente).')
+
+        for mem, estadoNucleo in zip(self.__processador, estado):
+            mem.setEstado(estadoNucleo)
+
 
 ### Função de interface (adpter):
 
@@ -1,5 +1,9 @@
+from src.exportacao import exportarTabela
 from src.constantes import *
 
+# Níveis das contagens por núcleo, na ordem das tabelas.
+NIVEIS_RELATORIO = ('L1d', 'L1i', 'L2', 'L3', 'Mem')
+
 class Relatorio:
     # Cria um novo objeto responsável por montar o relatório
     # final do programa.
@@ -16,6 +20,37 @@ class Relatorio:
         self.__numHits4 = 0
         self.__numErros = 0
 
+        # Acessos por (núcleo, instrução, escrita, nível em que foi
+        # encontrado), de onde saem as contagens por nível (ver getEstatisticas).
+        self.__acessos = {}
+        self.__processador = None
+        self.__perfil = None
+
+    # Informa o processador, para obter os eventos de linha (preenchimentos,
+    # substituições e escritas de volta) da hierarquia de cada núcleo.
+    # @param processador : Processor - processador do programa.
+    #
+    def setProcessador(self, processador):
+        self.__processador = processador
+
+    # Informa as medidas de desempenho da execução, incluídas no fim do
+    # relatório (modo de perfil).
+    # @param perfil : Perfil - medidas da execução.
+    #
+    def setPerfil(self, perfil):
+        self.__perfil = perfil
+
+    # Método para contabilizar um acesso de um núcleo. Os totais por nível
+    # continuam sendo contados por hit1, hit2, hit3, hit4 e erro.
+    # @param nucleo : int - número do núcleo.
+    # @param instrucao : bool - acesso de instrução (L1i).
+    # @param escrita : bool - acesso de escrita.
+    # @param nivel : int - onde o endereço foi encontrado (FOUND_IN_* ou erro).
+    #
+    def acesso(self, nucleo, instrucao, escrita, nivel):
+        chave = (nucleo, instrucao, escrita, nivel)
+        self.__acessos[chave] = self.__acessos.get(chave, 0) + 1
+
     # Método para contabilizar um hit no nível L1.
     #
     def hit1(self):
@@ -41,6 +76,80 @@ class Relatorio:
     def erro(self):
         self.__numErros += 1
 
+    # Obtém as contagens para um checkpoint.
+    # @return dict.
+    #
+    def getEstado(self):
+        return {
+            'contagens': self.getContagens(),
+            'acessos': dict(self.__acessos),
+        }
+
+    # Restaura as contagens de um estado obtido com getEstado.
+    # @param estado : dict - estado salvo.
+    #
+    def setEstado(self, estado):
+        contagens = estado['contagens']
+        self.__numHits1 = contagens[FOUND_IN_L1]
+        self.__numHits2 = contagens[FOUND_IN_L2]
+        self.__numHits3 = contagens[FOUND_IN_L3]
+        self.__numHits4 = contagens[FOUND_IN_MEM]
+        self.__numErros = contagens[ADDRESS_OUT_OF_RANGE]
+        self.__acessos = dict(estado['acessos'])
+
+    # Retorna as contagens de cada código de retorno.
+    # @return dict.
+    #
+    def getContagens(self):
+        return {
+            FOUND_IN_L1: self.__numHits1,
+            FOUND_IN_L2: self.__numHits2,
+            FOUND_IN_L3: self.__numHits3,
+            FOUND_IN_MEM: self.__numHits4,
+            ADDRESS_OUT_OF_RANGE: self.__numErros,
+        }
+
+    # Retorna as contagens por núcleo e por nível (L1d, L1i, L2, L3 e Mem):
+    # acessos, hits e misses de leitura e de escrita, e preenchimentos,
+    # substituições e escritas de volta. Um acesso encontrado em um nível
+    # é miss nos níveis acima dele; em write-through todo store também
+    # escreve na memória.
+    # @return dict - núcleo -> nome do nível -> dict de contagens.
+    #
+    def getEstatisticas(self):
+        numCores = self.__processador.getNumCores() if self.__processador != None else 1
+        campos = ('leituras', 'leiturasHits', 'leiturasMisses', 'escritas', 'escritasHits',
+                  'escritasMisses', 'preenchimentos', 'substituicoes', 'escritasDeVolta')
+
+        estatisticas = {}
+        for n in range(numCores):
+            niveis = {nome: dict.fromkeys(campos, 0) for nome in NIVEIS_RELATORIO}
+            if self.__processador != None:
+                for nome, eventos in self.__processador.getCore(n).getCache().getEventos().items():
+                    niveis[nome].update(eventos)
+            estatisticas[n] = niveis
+
+        writeThrough = self.__cache.getEscrita() == ESCRITA_WRITE_THROUGH
+
+        for (n, instrucao, escrita, nivel), total in self.__acessos.items():
+            if nivel == ADDRESS_OUT_OF_RANGE:
+                continue
+
+            niveis = estatisticas[n % numCores]
+            nomes = ('L1i' if instrucao else 'L1d', 'L2', 'L3', 'Mem')
+            tipo = 'escritas' if escrita else 'leituras'
+
+            for k in range(nivel):
+                contagens = niveis[nomes[k]]
+                contagens[tipo] += total
+                contagens[tipo + ('Hits' if k == nivel - 1 else 'Misses')] += total
+
+            if escrita and writeThrough and nivel != FOUND_IN_MEM:
+                niveis['Mem']['escritas'] += total
+                niveis['Mem']['escritasHits'] += total
+
+        return estatisticas
+
     # Método que gera o relatório final do programa,
     # em forma de tabela.
     # @return str.
@@ -117,4 +226,199 @@ class Relatorio:
         out += '|  Erro |{}  |  {}  |\n'.format(cod5, cont5)
         out += '+-------+--------------------+----------------------------------------+'
 
-        return out
\ No newline at end of file
+        if self.__cache.getEscrita() == ESCRITA_WRITE_BACK:
+            out += '\n\n\n' + self.__gerarTabelaEscritas(MAX_LENGTH, TAM_CELULA)
+
+        for n, niveis in sorted(self.getEstatisticas().items()):
+            out += '\n\n\n' + self.__gerarTabelaNucleo(MAX_LENGTH, n, niveis)
+
+        coerencia = self.getCoerencia()
+        if coerencia != None:
+            out += '\n\n\n' + self.__gerarTabelaCoerencia(MAX_LENGTH, coerencia)
+
+        classificacao = self.getClassificacaoMisses()
+        if classificacao != None:
+            out += '\n\n\n' + self.__gerarTabelaClassificacao(MAX_LENGTH, classificacao)
+
+        if self.__perfil != None:
+            out += '\n\n\n' + self.__perfil.gerarRelatorio(MAX_LENGTH)
+
+        return out
+
+    # Retorna as contagens de coerência de cada núcleo: misses de coerência
+    # (primeiro acesso a uma linha perdida por invalidação), invalidações e
+    # rebaixamentos recebidos, atualizações (escritas em linha compartilhada)
+    # e linhas sujas escritas de volta por causa delas.
+    # @return list - dict de contagens por núcleo, ou None se a coerência
+    #                não estiver ativa.
+    #
+    def getCoerencia(self):
+        diretorio = self.__cache.getDiretorio()
+        if diretorio == None:
+            return None
+        return diretorio.getContagens()
+
+    # Retorna os misses de cada nível por classe (compulsórios, de
+    # capacidade e de conflito), somados entre os núcleos; o L3 é
+    # compartilhado e conta uma vez só.
+    # @return dict - nome do nível -> dict de contagens, ou None se a
+    #                classificação não estiver ativa.
+    #
+    def getClassificacaoMisses(self):
+        if self.__cache.getL1d().getClassificacao() == None:
+            return None
+
+        if self.__processador != None:
+            caches = [self.__processador.getCore(n).getCache() for n in range(self.__processador.getNumCores())]
+        else:
+            caches = [self.__cache]
+
+        niveis = {
+            'L1d': [c.getL1d() for c in caches],
+            'L1i': [c.getL1i() for c in caches],
+            'L2': [c.getL2() for c in caches],
+            'L3': [self.__cache.getL3()],
+        }
+
+        classificacao = {}
+        for nome, lista in niveis.items():
+            total = {'compulsorios': 0, 'capacidade': 0, 'conflito': 0}
+            for sac in lista:
+                for classe, valor in sac.getClassificacao().items():
+                    total[classe] += valor
+            classificacao[nome] = total
+        return classificacao
+
+    # Exporta os contadores por conjunto de cada nível, um arquivo por nível
+    # e núcleo (o L3 compartilhado tem um só): <prefixo>_<nível>_nucleo<n>.<formato>
+    # e <prefixo>_L3.<formato>. Cada linha é um conjunto (lookup), com os
+    # acessos, misses e substituições.
+    # @param prefixo : str - caminho e início do nome dos arquivos.
+    # @param formato : str - FORMATO_CSV ou FORMATO_NPY (ver src/exportacao.py).
+    # @raise ValueError - se a contagem por conjunto não estiver ativa.
+    # @return list - caminhos dos arquivos escritos.
+    #
+    def exportarConjuntos(self, prefixo, formato):
+        if self.__cache.getL1d().getContadoresConjuntos() == None:
+            raise ValueError('Contagem por conjunto não está ativa.')
+
+        if self.__processador != None:
+            caches = [self.__processador.getCore(n).getCache() for n in range(self.__processador.getNumCores())]
+        else:
+            caches = [self.__cache]
+
+        arquivos = []
+        for n, cache in enumerate(caches):
+            for nome, sac in (('L1d', cache.getL1d()), ('L1i', cache.getL1i()), ('L2', cache.getL2())):
+                arquivos.append(('{}_{}_nucleo{}.{}'.format(prefixo, nome, n, formato), sac))
+        arquivos.append(('{}_L3.{}'.format(prefixo, formato), self.__cache.getL3()))
+
+        colunas = ('conjunto', 'acessos', 'misses', 'substituicoes')
+        for caminho, sac in arquivos:
+            c = sac.getContadoresConjuntos()
+            linhas = list(zip(range(sac.getNumConjuntos()), c['acessos'], c['misses'], c['substituicoes']))
+            exportarTabela(caminho, formato, colunas, linhas)
+
+        return [caminho for caminho, sac in arquivos]
+
+    # Tabela das contagens de coerência por núcleo, com o total.
+    # @return str.
+    #
+    def __gerarTabelaCoerencia(self, MAX_LENGTH, coerencia):
+        campos = ('missesCoerencia', 'invalidacoes', 'rebaixamentos', 'atualizacoes', 'escritasDeVolta')
+        separador = '+--------+' + '+'.join(['------------'] * 5) + '+\n'
+        total = {campo: sum(c[campo] for c in coerencia) for campo in campos}
+
+        out =  'Coerência ({})'.format(self.__cache.getCoerencia().upper()).center(MAX_LENGTH) + '\n'
+        out += separador
+        out += '| Núcleo |Misses coer.|Invalidações|Rebaixamento|Atualizações|Esc. volta  |\n'
+        out += separador
+        for n, c in enumerate(coerencia):
+            out += '| {:^6} |{}|\n'.format(n, '|'.join('{:^12}'.format(c[campo]) for campo in campos))
+        out += separador
+        out += '| total  |{}|\n'.format('|'.join('{:^12}'.format(total[campo]) for campo in campos))
+        out += separador.rstrip('\n')
+        return out
+
+    # Tabela dos misses por classe de cada nível.
+    # @return str.
+    #
+    def __gerarTabelaClassificacao(self, MAX_LENGTH, classificacao):
+        out =  'Classificação dos misses (3C)'.center(MAX_LENGTH) + '\n'
+        out += '+-------+---------------------+---------------------+---------------------+\n'
+        out += '| Nível |    Compulsórios     |     Capacidade      |      Conflito       |\n'
+        out += '+-------+---------------------+---------------------+---------------------+\n'
+        for nome in NIVEIS_RELATORIO[:-1]:
+            c = classificacao[nome]
+            out += '| {:^5} |{:^21}|{:^21}|{:^21}|\n'.format(
+                nome, c['compulsorios'], c['capacidade'], c['conflito']
+            )
+        out += '+-------+---------------------+---------------------+---------------------+'
+        return out
+
+    # Tabelas de um núcleo: acessos, hits, misses e taxas de miss local
+    # (misses / acessos do nível) e global (misses / acessos do L1) por
+    # nível e tipo de acesso, e os eventos de linha por nível.
+    # @return str.
+    #
+    def __gerarTabelaNucleo(self, MAX_LENGTH, n, niveis):
+        def taxa(misses, acessos):
+            return '{:.2f}%'.format(100 * misses / acessos) if acessos > 0 else '-'
+
+        separador = '+-------+-------+' + '+'.join(['----------'] * 5) + '+\n'
+
+        out =  'Núcleo {}: acessos por nível'.format(n).center(MAX_LENGTH) + '\n'
+        out += separador
+        out += '| Nível | Tipo  | Acessos  |   Hits   |  Misses  |Miss local|Miss glob.|\n'
+        out += separador
+        for nome in NIVEIS_RELATORIO:
+            for tipo, rotulo in (('leituras', 'leit.'), ('escritas', 'escr.')):
+                c = niveis[nome]
+                if nome == 'Mem':
+                    local = glob = '-'
+                else:
+                    l1 = (nome,) if nome in ('L1d', 'L1i') else ('L1d', 'L1i')
+                    local = taxa(c[tipo + 'Misses'], c[tipo])
+                    glob = taxa(c[tipo + 'Misses'], sum(niveis[x][tipo] for x in l1))
+                celulas = (c[tipo], c[tipo + 'Hits'], c[tipo + 'Misses'], local, glob)
+                out += '| {:^5} | {} |{}|\n'.format(
+                    nome if tipo == 'leituras' else '', rotulo,
+                    '|'.join('{:^10}'.format(x) for x in celulas)
+                )
+        out += separador
+        out += '\n'
+        out += 'Núcleo {}: eventos de linha por nível'.format(n).center(MAX_LENGTH) + '\n'
+        out += '+-------+---------------------+---------------------+---------------------+\n'
+        out += '| Nível |   Preenchimentos    |    Substituições    |  Escritas de volta  |\n'
+        out += '+-------+---------------------+---------------------+---------------------+\n'
+        for nome in NIVEIS_RELATORIO[:-1]:
+            c = niveis[nome]
+            out += '| {:^5} |{:^21}|{:^21}|{:^21}|\n'.format(
+                nome, c['preenchimentos'], c['substituicoes'], c['escritasDeVolta']
+            )
+        out += '+-------+---------------------+---------------------+---------------------+'
+        return out
+
+    # Tabela de escritas da hierarquia write-back: linhas sujas escritas de
+    # volta por nível e escritas que chegaram na memória principal.
+    # @return str.
+    #
+    def __gerarTabelaEscritas(self, MAX_LENGTH, TAM_CELULA):
+        contadores = self.__cache.getContadoresEscrita()
+        linhas = [str(contadores[x]).center(TAM_CELULA * 3) for x in ('L1d', 'L1i', 'L2', 'L3', 'linhas', 'words')]
+
+        out =  'Escritas (write-back)'.center(MAX_LENGTH) + '\n'
+        out += '+-------+-------------------------------------------------------------+\n'
+        out += '| Nível |                  Linhas escritas de volta                   |\n'
+        out += '+-------+-------------------------------------------------------------+\n'
+        out += '|  L1d  |    {}   |\n'.format(linhas[0])
+        out += '|  L1i  |    {}   |\n'.format(linhas[1])
+        out += '|  L2   |    {}   |\n'.format(linhas[2])
+        out += '|  L3   |    {}   |\n'.format(linhas[3])
+        out += '+-------+-------------------------------------------------------------+\n'
+        out += '| Mem.  |                  Escritas na memória principal              |\n'
+        out += '+-------+-------------------------------------------------------------+\n'
+        out += '| linha |    {}   |\n'.format(linhas[4])
+        out += '| word  |    {}   |\n'.format(linhas[5])
+        out += '+-------+-------------------------------------------------------------+'
+        return out
@@ -1,9 +1,20 @@
+from array import array
 from src.util import isPotenciaDois
 from src.util import log2
+from src.util import copiarBuffer
 from src.TACache import TACache
+from src.ArrayStorage import ArrayStorage
+from src.ClassificacaoMisses import ClassificacaoMisses
+from src.Substituicao import criarPolitica
+from src.Substituicao import verificaPolitica
+from src.constantes import *
 
 
 class SACache:
+    # estático: conjuntos vazios por (capacidade do conjunto, tamLinha, dados),
+    # compartilhados por todas as caches de mesma geometria (ver __getConjunto).
+    conjuntosVazios = {}
+
     # Construtor da cache associativa por conjuntos.
     #
     # @param capacidade : int - tamanho total em bytes, deve ser potência de 2 e
@@ -13,10 +24,27 @@ class SACache:
     #
     # @param tamLinha : int - número de bytes por linha de cada conjunto, deve ser potência de 2.
     #
+    # @param armazenamento : int - motor de armazenamento, STORAGE_OBJECTS (um TACache
+    #                              por conjunto) ou STORAGE_ARRAY (buffers contíguos
+    #                              por bloco de conjuntos). Nos dois, só os conjuntos
+    #                              (ou blocos) já preenchidos ocupam memória.
+    #
+    # @param politica : str - política de substituição (POLITICA_*).
+    #
+    # @param dados : bool - guarda as words das linhas; se False (modo só de
+    #                       tags), só tags e estado, e as leituras retornam 0.
+    #
+    # @param classificar : bool - classifica os misses em compulsórios, de
+    #                             capacidade e de conflito (ver ClassificacaoMisses).
+    #
+    # @param contarConjuntos : bool - conta acessos, misses e substituições de
+    #                                 cada conjunto (ver getContadoresConjuntos).
+    #
     # @raise ValueError, TypeError.
     #
-    def __init__(self, capacidade, associatividade, tamLinha):
-        self.__verificaArgumentos(capacidade, associatividade, tamLinha)
+    def __init__(self, capacidade, associatividade, tamLinha, armazenamento=STORAGE_OBJECTS,
+                 politica=POLITICA_FIFO, dados=True, classificar=False, contarConjuntos=False):
+        self.__verificaArgumentos(capacidade, associatividade, tamLinha, armazenamento, politica)
 
         self.__capacidade = capacidade
         self.__numLinhasConjunto = associatividade
@@ -25,22 +53,51 @@ class SACache:
         self.__numColunas = tamLinha // 4
         self.__tamOffset = log2(self.__tamLinha)
         self.__tamLookup = log2(self.__numConjuntos)
+        self.__mascaraLookup = self.__numConjuntos - 1
+        self.__armazenamento = armazenamento
+        self.__politica = politica
+        self.__dados = dados
+
+        self.__classificacao = ClassificacaoMisses(capacidade, tamLinha) if classificar else None
+
+        # Acessos, misses e substituições por conjunto, indexados pelo lookup.
+        if contarConjuntos:
+            self.__acessosConjunto = array('Q', bytes(8 * self.__numConjuntos))
+            self.__missesConjunto = array('Q', bytes(8 * self.__numConjuntos))
+            self.__substituicoesConjunto = array('Q', bytes(8 * self.__numConjuntos))
+        else:
+            self.__acessosConjunto = None
 
-        c = self.__capacidade // self.__numConjuntos
-        l = self.__tamLinha
-        self.__conjuntos = [TACache(c, l) for i in range(self.__numConjuntos)]
+        # Estado da política de todos os conjuntos, nos dois motores.
+        self.__estado = criarPolitica(politica, self.__numConjuntos, associatividade)
+
+        if armazenamento == STORAGE_ARRAY:
+            # Cada bloco de conjuntos é alocado no primeiro preenchimento
+            # de um deles (ver ArrayStorage).
+            self.__conjuntos = None
+            self.__banco = ArrayStorage(self.__numConjuntos, associatividade, tamLinha, self.__estado,
+                                        dados)
+        else:
+            # Conjuntos são criados no primeiro preenchimento (ver __getConjunto),
+            # até lá as buscas vão para um conjunto vazio compartilhado com as
+            # outras caches de mesma geometria (ex. as dos outros núcleos).
+            self.__conjuntos = [None] * self.__numConjuntos
+            self.__conjuntoVazio = self.__getConjuntoVazio()
+            self.__banco = None
 
     # Lança exceção se algum dos argumentos do construtor estiver errado.
     # 
     # @param capacidade : int - mesmo do construtor.
     # @param associatividade : int - mesmo do construtor.
     # @param tamLinha : int - mesmo do construtor.
+    # @param armazenamento : int - mesmo do construtor.
+    # @param politica : str - mesmo do construtor.
     #
     # @raise ValueError, TypeError.
     #
     # @return None.
     #
-    def __verificaArgumentos(self, capacidade, associatividade, tamLinha):
+    def __verificaArgumentos(self, capacidade, associatividade, tamLinha, armazenamento, politica):
         if type(capacidade) != int:
             raise TypeError('Capacidade inválida, deve ser inteiro.')
 
@@ -65,6 +122,11 @@ class SACache:
         if capacidade % (tamLinha * associatividade) != 0:
             raise ValueError('Capacidade inválida, deve ser múltiplo de (assoc)x(tamLinha).')
 
+        if armazenamento not in (STORAGE_OBJECTS, STORAGE_ARRAY):
+            raise ValueError('Motor de armazenamento inválido.')
+
+        verificaPolitica(politica)
+
     # Obtém a quantidade de bits de lookup.
     #
     # @return int.
@@ -114,6 +176,50 @@ class SACache:
     def getNumConjuntos(self):
         return self.__numConjuntos
 
+    # Obtém o motor de armazenamento.
+    #
+    # @return int.
+    #
+    def getArmazenamento(self):
+        return self.__armazenamento
+
+    # Obtém a política de substituição.
+    #
+    # @return str.
+    #
+    def getPolitica(self):
+        return self.__politica
+
+    # Informa se a cache guarda as words das linhas.
+    #
+    # @return bool.
+    #
+    def armazenaDados(self):
+        return self.__dados
+
+    # Obtém uma cópia dos contadores por conjunto, se estiverem ativos.
+    #
+    # @return dict - 'acessos', 'misses' e 'substituicoes' -> array indexado
+    #                pelo lookup, ou None.
+    #
+    def getContadoresConjuntos(self):
+        if self.__acessosConjunto == None:
+            return None
+        return {
+            'acessos': array('Q', self.__acessosConjunto),
+            'misses': array('Q', self.__missesConjunto),
+            'substituicoes': array('Q', self.__substituicoesConjunto),
+        }
+
+    # Obtém os misses por classe, se a classificação estiver ativa.
+    #
+    # @return dict - 'compulsorios', 'capacidade' e 'conflito', ou None.
+    #
+    def getClassificacao(self):
+        if self.__classificacao == None:
+            return None
+        return self.__classificacao.getContagens()
+
     # Obtém os bits de lookup de um dado endereço.
     #
     # @param address : int - endereço de 32 bits (4 bytes).
@@ -124,18 +230,74 @@ class SACache:
     #
     def getBitsLookup(self, address):
         self.__verificaAddress(address)
-        return (address >> self.__tamOffset) & (2 ** self.__tamLookup - 1)
+        return (address >> self.__tamOffset) & self.__mascaraLookup
 
     # Representação em string.
     #
     # @return str.
     #
     def __repr__(self):
-        out = '#{}:\n{}'.format(0, self.__conjuntos[0])
+        out = '#{}:\n{}'.format(0, self.__getReprConjunto(0))
         for i in range(1, self.__numConjuntos):
-            out += '\n#{}:\n{}'.format(i, self.__conjuntos[i])
+            out += '\n#{}:\n{}'.format(i, self.__getReprConjunto(i))
         return out
 
+    # Representação em string de um conjunto.
+    #
+    # @param lookup : int - índice do conjunto.
+    #
+    # @return str.
+    #
+    def __getReprConjunto(self, lookup):
+        if self.__banco != None:
+            return self.__banco.reprConjunto(lookup)
+        else:
+            return str(self.__getConjunto(lookup, False))
+
+    # Cria um conjunto vazio (TACache), que usa o estado da política
+    # compartilhado.
+    #
+    # @param lookup : int - índice do conjunto.
+    #
+    # @return TACache.
+    #
+    def __novoConjunto(self, lookup):
+        return TACache(self.__capacidade // self.__numConjuntos, self.__tamLinha,
+                       self.__politica, self.__estado, lookup, self.__dados)
+
+    # Obtém o conjunto vazio da geometria desta cache, criando-o na primeira
+    # vez. Ele só é consultado, nunca alterado (as buscas sempre falham e não
+    # chegam à política), então pode ser o mesmo para todas as caches.
+    #
+    # @return TACache.
+    #
+    def __getConjuntoVazio(self):
+        chave = (self.__capacidade // self.__numConjuntos, self.__tamLinha, self.__dados)
+        tac = SACache.conjuntosVazios.get(chave)
+        if tac == None:
+            tac = SACache.conjuntosVazios[chave] = TACache(chave[0], self.__tamLinha, POLITICA_FIFO,
+                                                           dados=self.__dados)
+        return tac
+
+    # Obtém o conjunto do lookup. Se ele nunca foi preenchido, é criado
+    # quando criar for True; senão retorna o conjunto vazio compartilhado,
+    # que só pode ser consultado (nunca alterado).
+    #
+    # @param lookup : int - índice do conjunto.
+    # @param criar : bool - cria o conjunto se ainda não existir.
+    #
+    # @return TACache.
+    #
+    def __getConjunto(self, lookup, criar):
+        tac = self.__conjuntos[lookup]
+        if tac != None:
+            return tac
+        elif criar:
+            tac = self.__conjuntos[lookup] = self.__novoConjunto(lookup)
+            return tac
+        else:
+            return self.__conjuntoVazio
+
     # Operador <.
     #
     # @param other : SACache - instância de comparação.
@@ -153,48 +315,263 @@ class SACache:
     # Obtém o dado salvo do endereço.
     #
     # @param address : int - endereço de 32 bits (4 bytes).
-    # @param word : Word - palavra de 32 bits (4 bytes).
     #
     # @raise TypeError, ValueError, IndexError.
     #
-    # @return bool.
+    # @return int - valor de 32 bits, ou None em caso de miss.
     #
-    def getDado(self, address, word):
+    def getDado(self, address):
         self.__verificaAddress(address)
-        lookup = self.getBitsLookup(address)
-        tac = self.__conjuntos[lookup]
-        return tac.getDado(address, word)
+        return self.lerDado(address)
 
+    # Obtém uma cópia da linha que começa no endereço.
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return array - words da linha, ou None se ela não estiver na cache.
+    #
+    def getLinha(self, address):
+        self.__verificaAddress(address)
+        return self.lerLinha(address)
 
     # Insere uma linha da memória na cache.
     #
     # @param address : int - endereço de origem.
-    # @param linha : list - valores da linha da memória.
+    # @param linha : list - valores (int) da linha da memória.
     #
     # @raise TypeError, IndexError, ValueError.
     #
-    # return None.
+    # return tuple - (endereço, words, bits de sujo) da linha suja
+    #                substituída, ou None.
     #
     def setLine(self, address, linha):
         self.__verificaAddress(address)
-        lookup = self.getBitsLookup(address)
-        tac = self.__conjuntos[lookup]
-        tac.setLine(address, linha)
+        self.__verificaLinha(linha)
+        return self.escreverLinha(address, linha)[1]
 
     # Insere um dado lido da memória na cache.
     #
     # @param address : int - endereço de origem do dado.
-    # @param valor : Word - palavra de 32 bits (4 bytes).
+    # @param valor : int - palavra de 32 bits (4 bytes).
+    # @param sujar : bool - marca a linha como suja (write-back).
     #
     # @raise TypeError, ValueError.
     #
     # return bool.
     #
-    def setDado(self, address, valor):
+    def setDado(self, address, valor, sujar=False):
         self.__verificaAddress(address)
-        lookup = self.getBitsLookup(address)
-        tac = self.__conjuntos[lookup]
-        return tac.setDado(address, valor)
+        return self.escreverDado(address, valor, sujar)
+
+    # Escreve words na linha que começa no endereço, se ela estiver na
+    # cache, e as marca como sujas.
+    #
+    # @param address : int - endereço de início da linha.
+    # @param inicio : int - índice da primeira word na linha.
+    # @param words : list - valores (int) a escrever.
+    # @param sujas : bytes - bits de sujo das words; só as sujas são
+    #                        escritas (None escreve todas).
+    #
+    # @raise TypeError, ValueError, IndexError.
+    #
+    # @return bool.
+    #
+    def escreverPalavras(self, address, inicio, words, sujas=None):
+        self.__verificaAddress(address)
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            return self.__banco.escreverPalavras(lookup, address, inicio, words, sujas)
+        else:
+            return self.__getConjunto(lookup, False).escreverPalavras(address, inicio, words, sujas)
+
+    # Primitivas de acesso sem verificação de argumentos, usadas pela Cache
+    # com endereços já verificados na entrada da hierarquia (ver Memory).
+    # Fazem o mesmo que getDado, getLinha, setLine e setDado.
+
+    # Obtém o dado salvo do endereço.
+    #
+    # @param address : int - endereço de 32 bits (4 bytes).
+    #
+    # @raise IndexError.
+    #
+    # @return int - valor de 32 bits, ou None em caso de miss.
+    #
+    def lerDado(self, address):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            valor = self.__banco.lerDado(lookup, address)
+        else:
+            valor = self.__getConjunto(lookup, False).lerDado(address)
+
+        if self.__acessosConjunto != None:
+            self.__acessosConjunto[lookup] += 1
+            if valor == None:
+                self.__missesConjunto[lookup] += 1
+
+        if self.__classificacao != None:
+            self.__classificacao.acesso(address, valor != None)
+        return valor
+
+    # Obtém uma cópia da linha que começa no endereço.
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return array - words da linha, ou None se ela não estiver na cache.
+    #
+    def lerLinha(self, address):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            return self.__banco.lerLinha(lookup, address)
+        else:
+            return self.__getConjunto(lookup, False).lerLinha(address)
+
+    # Insere uma linha na cache.
+    #
+    # @param address : int - endereço de origem.
+    # @param linha : list - valores (int) da linha.
+    #
+    # @raise OverflowError.
+    #
+    # return tuple - (LINHA_*, (endereço, words, bits de sujo) da linha suja
+    #                substituída ou None).
+    #
+    def escreverLinha(self, address, linha):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            codigo, vitima = self.__banco.escreverLinha(lookup, address, linha)
+        else:
+            codigo, vitima = self.__getConjunto(lookup, True).escreverLinha(address, linha)
+
+        if codigo == LINHA_SUBSTITUIDA and self.__acessosConjunto != None:
+            self.__substituicoesConjunto[lookup] += 1
+        return codigo, vitima
+
+    # Insere um dado na linha que contém o endereço, se ela estiver na cache.
+    #
+    # @param address : int - endereço de origem do dado.
+    # @param valor : int - palavra de 32 bits (4 bytes).
+    # @param sujar : bool - marca a linha como suja (write-back).
+    #
+    # @raise IndexError, OverflowError.
+    #
+    # return bool.
+    #
+    def escreverDado(self, address, valor, sujar=False):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            hit = self.__banco.escreverDado(lookup, address, valor, sujar)
+        else:
+            hit = self.__getConjunto(lookup, False).escreverDado(address, valor, sujar)
+
+        if self.__acessosConjunto != None:
+            self.__acessosConjunto[lookup] += 1
+            if not hit:
+                self.__missesConjunto[lookup] += 1
+
+        if self.__classificacao != None:
+            self.__classificacao.acesso(address, hit)
+        return hit
+
+    # Remove a linha que começa no endereço, se ela estiver na cache
+    # (invalidação por coerência, ver Diretorio).
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def invalidarLinha(self, address):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            return self.__banco.invalidarLinha(lookup, address)
+        else:
+            return self.__getConjunto(lookup, False).invalidarLinha(address)
+
+    # Limpa os bits de sujo da linha que começa no endereço, que continua
+    # na cache (rebaixamento por coerência, ver Diretorio).
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def limparLinha(self, address):
+        lookup = (address >> self.__tamOffset) & self.__mascaraLookup
+        if self.__banco != None:
+            return self.__banco.limparLinha(lookup, address)
+        else:
+            return self.__getConjunto(lookup, False).limparLinha(address)
+
+    # Obtém o estado da cache para um checkpoint: estado da política, dos
+    # conjuntos (só os já criados, no motor de objetos), contadores por
+    # conjunto e classificação dos misses. Os buffers não são copiados,
+    # então o estado deve ser gravado antes de a cache ser alterada.
+    #
+    # @return dict.
+    #
+    def getEstado(self):
+        estado = {
+            'politica': self.__estado.getEstado(),
+            'banco': None,
+            'conjuntos': None,
+            'contadores': None,
+            'classificacao': None,
+        }
+
+        if self.__banco != None:
+            estado['banco'] = self.__banco.getEstado()
+        else:
+            estado['conjuntos'] = {lookup: tac.getEstado() for lookup, tac in enumerate(self.__conjuntos)
+                                   if tac != None}
+
+        if self.__acessosConjunto != None:
+            estado['contadores'] = (self.__acessosConjunto, self.__missesConjunto, self.__substituicoesConjunto)
+
+        if self.__classificacao != None:
+            estado['classificacao'] = self.__classificacao.getEstado()
+
+        return estado
+
+    # Restaura um estado obtido com getEstado de uma cache de mesma
+    # configuração (motor, política e opções).
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if (estado['conjuntos'] == None) != (self.__banco != None):
+            raise ValueError('Estado salvo incompatível com a cache (motor de armazenamento diferente).')
+
+        if (estado['contadores'] == None) != (self.__acessosConjunto == None):
+            raise ValueError('Estado salvo incompatível com a cache (contadores por conjunto).')
+
+        if (estado['classificacao'] == None) != (self.__classificacao == None):
+            raise ValueError('Estado salvo incompatível com a cache (classificação dos misses).')
+
+        self.__estado.setEstado(estado['politica'])
+
+        if self.__banco != None:
+            self.__banco.setEstado(estado['banco'])
+        else:
+            self.__conjuntos = [None] * self.__numConjuntos
+            for lookup, estadoConjunto in estado['conjuntos'].items():
+                if not 0 <= lookup < self.__numConjuntos:
+                    raise ValueError('Estado salvo incompatível com a cache (conjunto inexistente).')
+                self.__getConjunto(lookup, True).setEstado(estadoConjunto)
+
+        if self.__acessosConjunto != None:
+            acessos, misses, substituicoes = estado['contadores']
+            self.__acessosConjunto = copiarBuffer(self.__acessosConjunto, acessos)
+            self.__missesConjunto = copiarBuffer(self.__missesConjunto, misses)
+            self.__substituicoesConjunto = copiarBuffer(self.__substituicoesConjunto, substituicoes)
+
+        if self.__classificacao != None:
+            self.__classificacao.setEstado(estado['classificacao'])
 
     # Cria nova SAC com as mesmas características, mas vazia.
     #
@@ -206,7 +583,8 @@ class SACache:
         c = self.getCapacidade()
         a = self.getNumLinhas()
         l = self.getTamLinha()
-        return SACache(c, a, l)
+        return SACache(c, a, l, self.__armazenamento, self.__politica, self.__dados,
+                       self.__classificacao != None, self.__acessosConjunto != None)
 
     # Verifica corretude do endereço.
     #
@@ -222,12 +600,29 @@ class SACache:
         if address.bit_length() > 32 or address < 0:
             raise ValueError('Endereço inválido.')
 
+    # Verifica corretude da linha da memória.
+    #
+    # @param linha : list - lista de valores (os valores são verificados
+    #                       ao serem copiados para o array).
+    #
+    # @raise TypeError, IndexError.
+    #
+    # @return None.
+    #
+    def __verificaLinha(self, linha):
+        if type(linha) != list and type(linha) != array:
+            raise TypeError('Linha deve ser list ou array.')
+
+        if len(linha) > self.__tamLinha:
+            raise IndexError('Linha é maior que a capacidade da cache.')
+
 
 ### FUNÇÕES DE INTERFACE (adapter):
 
 
-def createSACache(c, a, l):
-    return SACache(c, a, l)
+def createSACache(c, a, l, armazenamento=STORAGE_OBJECTS, politica=POLITICA_FIFO, dados=True,
+                  classificar=False, contarConjuntos=False):
+    return SACache(c, a, l, armazenamento, politica, dados, classificar, contarConjuntos)
 
 
 def getSACacheCapacity(sac):
@@ -239,15 +634,19 @@ def getSACacheLineSize(sac):
 
 
 def getSACacheData(sac, address, value):
-    return sac.getDado(address, value)
+    valor = sac.getDado(address)
+    if valor == None:
+        return CACHE_MISS
+    value.set(valor)
+    return CACHE_HIT
 
 
 def setSACacheLine(sac, address, line):
-    sac.setLine(address, line)
+    sac.setLine(address, [word.get() for word in line])
 
 
 def setSACacheData(sac, address, value):
-    return sac.setDado(address, value)
+    return sac.setDado(address, value.get())
 
 
 def duplicateSACache(sac):
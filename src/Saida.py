@@ -0,0 +1,73 @@
+import sys
+from src.constantes import *
+
+
+class Saida:
+    # Cria o objeto que recebe as mensagens dos comandos do interpretador.
+    #
+    # @param modo : str - modo de saída (SAIDA_*).
+    # @param destino : object - onde escrever (qualquer objeto com write),
+    #                           por padrão a saída padrão.
+    # @param linhasPorLote : int - mensagens acumuladas antes de cada escrita
+    #                              no modo SAIDA_BUFFER.
+    #
+    # @raise ValueError.
+    #
+    def __init__(self, modo=SAIDA_NORMAL, destino=None, linhasPorLote=4096):
+        if modo not in (SAIDA_NORMAL, SAIDA_SILENCIOSA, SAIDA_BUFFER, SAIDA_FALHAS):
+            raise ValueError('Modo de saída inválido.')
+
+        if type(linhasPorLote) != int or linhasPorLote < 1:
+            raise ValueError('Tamanho do lote deve ser inteiro positivo.')
+
+        self.__modo = modo
+        self.__destino = destino
+        self.__linhasPorLote = linhasPorLote
+        self.__lote = []
+
+    # Get atribute.
+    # @return str.
+    #
+    def getModo(self):
+        return self.__modo
+
+    # Indica se as mensagens de comandos (construção, leituras, escritas e
+    # asserts corretos) devem ser geradas.
+    # @return bool.
+    #
+    def imprimeComandos(self):
+        return self.__modo in (SAIDA_NORMAL, SAIDA_BUFFER)
+
+    # Indica se as mensagens de asserts que falharam devem ser geradas.
+    # @return bool.
+    #
+    def imprimeFalhas(self):
+        return self.__modo != SAIDA_SILENCIOSA
+
+    # Escreve uma mensagem (uma linha).
+    # @param texto : str - mensagem.
+    # @return None.
+    #
+    def escrever(self, texto):
+        if self.__modo == SAIDA_BUFFER:
+            self.__lote.append(texto)
+            if len(self.__lote) >= self.__linhasPorLote:
+                self.descarregar()
+        elif self.__modo != SAIDA_SILENCIOSA:
+            print(texto, file=self.__getDestino())
+
+    # Escreve as mensagens acumuladas no destino.
+    # @return None.
+    #
+    def descarregar(self):
+        if self.__lote != []:
+            self.__lote.append('')
+            self.__getDestino().write('\n'.join(self.__lote))
+            self.__lote = []
+
+    # Destino atual, sys.stdout é resolvido na hora para respeitar
+    # redirecionamentos.
+    # @return object.
+    #
+    def __getDestino(self):
+        return self.__destino if self.__destino != None else sys.stdout
@@ -0,0 +1,244 @@
+from src.SACache import SACache
+from src.util import isPotenciaDois
+
+
+class StackDistance:
+    # Calcula, em uma passada, a distância de pilha LRU (algoritmo de Mattson)
+    # de cada acesso dentro do seu conjunto, para uma cache com numConjuntos
+    # conjuntos e linhas de tamLinha bytes. Um acesso com distância d é hit em
+    # toda cache LRU dessa geometria com associatividade maior que d.
+    #
+    # Cada conjunto guarda o último instante de acesso de cada linha e uma
+    # árvore de Fenwick marcando esses instantes; a distância é o número de
+    # marcas depois do último acesso da linha, então cada acesso é O(log n).
+    #
+    # @param numConjuntos : int - número de conjuntos, potência de 2.
+    # @param tamLinha : int - bytes por linha, potência de 2 e múltiplo de 4.
+    # @param maxAssociatividade : int - maior associatividade de interesse,
+    #                                   distâncias maiores contam como miss.
+    #
+    # @raise TypeError, ValueError.
+    #
+    def __init__(self, numConjuntos, tamLinha, maxAssociatividade):
+        if type(maxAssociatividade) != int or maxAssociatividade < 1:
+            raise ValueError('Associatividade máxima deve ser inteiro positivo.')
+
+        # Cache de mapeamento direto com a mesma geometria, só para reaproveitar
+        # a decomposição do endereço (getBitsLookup) e a validação dos parâmetros.
+        self.__geometria = SACache(numConjuntos * tamLinha, 1, tamLinha)
+        self.__tamOffset = self.__geometria.getTamOffset()
+        self.__maxAssociatividade = maxAssociatividade
+
+        self.__conjuntos = {}
+
+        # histograma[d] = acessos com distância d (< maxAssociatividade);
+        # os demais (primeiro acesso ou distância maior) ficam em misses.
+        self.__histograma = [0] * maxAssociatividade
+        self.__misses = 0
+
+    # Registra um acesso.
+    #
+    # @param address : int - endereço de 32 bits.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return int - distância de pilha, ou -1 no primeiro acesso à linha.
+    #
+    def acessar(self, address):
+        lookup = self.__geometria.getBitsLookup(address)
+
+        conjunto = self.__conjuntos.get(lookup)
+        if conjunto == None:
+            conjunto = self.__conjuntos[lookup] = PilhaConjunto()
+
+        d = conjunto.acessar(address >> self.__tamOffset)
+
+        if 0 <= d < self.__maxAssociatividade:
+            self.__histograma[d] += 1
+        else:
+            self.__misses += 1
+
+        return d
+
+    # Get atribute.
+    # @return int.
+    #
+    def getNumConjuntos(self):
+        return self.__geometria.getNumConjuntos()
+
+    # Número de hits de uma cache LRU desta geometria com a associatividade dada.
+    #
+    # @param associatividade : int - associatividade, até a máxima.
+    #
+    # @raise ValueError.
+    #
+    # @return int.
+    #
+    def getHits(self, associatividade):
+        if not 1 <= associatividade <= self.__maxAssociatividade:
+            raise ValueError('Associatividade fora da faixa analisada.')
+        return sum(self.__histograma[:associatividade])
+
+    # Número total de acessos registrados.
+    # @return int.
+    #
+    def getNumAcessos(self):
+        return sum(self.__histograma) + self.__misses
+
+
+class PilhaConjunto:
+    # Estado de um conjunto: instante do último acesso de cada linha e a
+    # árvore de Fenwick com uma marca em cada um desses instantes.
+    #
+    def __init__(self):
+        self.__ultimo = {}
+        self.__arvore = [0] * 65
+        self.__capacidade = 64
+        self.__proximo = 1
+        self.__marcas = 0
+
+    # Registra o acesso a uma linha.
+    #
+    # @param linha : int - número da linha (endereço sem offset).
+    #
+    # @return int - distância de pilha, -1 no primeiro acesso.
+    #
+    def acessar(self, linha):
+        if self.__proximo > self.__capacidade:
+            self.__compactar()
+
+        t = self.__ultimo.get(linha)
+
+        if t == None:
+            d = -1
+        else:
+            d = self.__marcas - self.__prefixo(t)
+            self.__somar(t, -1)
+            self.__marcas -= 1
+
+        self.__somar(self.__proximo, 1)
+        self.__ultimo[linha] = self.__proximo
+        self.__proximo += 1
+        self.__marcas += 1
+
+        return d
+
+    # Soma das marcas nos instantes 1..t.
+    #
+    def __prefixo(self, t):
+        arvore = self.__arvore
+        total = 0
+        while t > 0:
+            total += arvore[t]
+            t &= t - 1
+        return total
+
+    # Soma delta à marca do instante t.
+    #
+    def __somar(self, t, delta):
+        arvore = self.__arvore
+        n = self.__capacidade
+        while t <= n:
+            arvore[t] += delta
+            t += t & -t
+
+    # Renumera os instantes das linhas (mantendo a ordem) para 1..k e
+    # reconstrói a árvore, dobrando a capacidade se ela estiver mais que
+    # meio cheia. Custo amortizado O(1) por acesso.
+    #
+    def __compactar(self):
+        ordem = sorted(self.__ultimo, key=self.__ultimo.get)
+        k = len(ordem)
+
+        while 2 * k > self.__capacidade:
+            self.__capacidade *= 2
+
+        for t, linha in enumerate(ordem, 1):
+            self.__ultimo[linha] = t
+
+        # Construção linear da árvore com marcas em 1..k.
+        n = self.__capacidade
+        arvore = [0] * (n + 1)
+        for t in range(1, k + 1):
+            arvore[t] += 1
+            pai = t + (t & -t)
+            if pai <= n:
+                arvore[pai] += arvore[t]
+        for t in range(k + 1, n + 1):
+            pai = t + (t & -t)
+            if pai <= n:
+                arvore[pai] += arvore[t]
+
+        self.__arvore = arvore
+        self.__proximo = k + 1
+
+
+class MissRatioCurve:
+    # Curva de miss ratio de caches LRU com um tamanho de linha, para todas as
+    # combinações de capacidade e associatividade, em uma única passada pelo
+    # trace. Capacidades com o mesmo número de conjuntos compartilham o mesmo
+    # StackDistance.
+    #
+    # @param tamLinha : int - bytes por linha.
+    # @param capacidades : list - capacidades em bytes, potências de 2.
+    # @param associatividades : list - associatividades, potências de 2.
+    #
+    # @raise TypeError, ValueError.
+    #
+    def __init__(self, tamLinha, capacidades, associatividades):
+        self.__tamLinha = tamLinha
+        self.__configuracoes = []
+
+        porConjuntos = {}
+        for c in sorted(set(capacidades)):
+            for a in sorted(set(associatividades)):
+                if not isPotenciaDois(c) or not isPotenciaDois(a):
+                    raise ValueError('Capacidades e associatividades devem ser potências de 2.')
+                if c < a * tamLinha:
+                    continue
+                s = c // (a * tamLinha)
+                porConjuntos[s] = max(porConjuntos.get(s, 0), a)
+                self.__configuracoes.append((c, a, s))
+
+        if self.__configuracoes == []:
+            raise ValueError('Nenhuma configuração válida para o tamanho de linha.')
+
+        self.__pilhas = {s: StackDistance(s, tamLinha, a) for s, a in porConjuntos.items()}
+        self.__numAcessos = 0
+
+    # Registra um acesso em todas as geometrias.
+    #
+    # @param address : int - endereço de 32 bits.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return None.
+    #
+    def acessar(self, address):
+        for pilha in self.__pilhas.values():
+            pilha.acessar(address)
+        self.__numAcessos += 1
+
+    # Get atribute.
+    # @return int.
+    #
+    def getTamLinha(self):
+        return self.__tamLinha
+
+    # Get atribute.
+    # @return int.
+    #
+    def getNumAcessos(self):
+        return self.__numAcessos
+
+    # Resultados de todas as configurações, ordenados por capacidade e
+    # associatividade.
+    #
+    # @return list - tuplas (capacidade, associatividade, hits, misses).
+    #
+    def getResultados(self):
+        resultados = []
+        for c, a, s in self.__configuracoes:
+            hits = self.__pilhas[s].getHits(a)
+            resultados.append((c, a, hits, self.__numAcessos - hits))
+        return resultados
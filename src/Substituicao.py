@@ -0,0 +1,515 @@
+from array import array
+from random import Random
+from src.util import log2
+from src.util import copiarBuffer
+from src.constantes import *
+
+
+# Políticas de substituição. Cada política guarda o estado de todos os
+# conjuntos de uma cache em buffers contíguos, indexados por
+# (conjunto * numVias + via), e é avisada pela cache:
+#
+#   acesso(conjunto, via)        - hit na via;
+#   preenchimento(conjunto, via) - linha nova inserida na via;
+#   vitima(conjunto)             - via a ser substituída, com o conjunto cheio.
+#
+# getEstado e setEstado obtêm e restauram o estado de todos os conjuntos
+# (os próprios buffers, sem cópia, ao obter), para os checkpoints.
+#
+# Enquanto o conjunto tem vias livres a própria cache as ocupa em ordem,
+# então vitima só é chamado com todas as vias válidas.
+#
+# Como acesso e vitima só acontecem depois de algum preenchimento, os
+# buffers só são alocados no primeiro preenchimento: uma cache que nunca
+# recebeu uma linha (ex. a de um núcleo ocioso) não ocupa memória com a
+# política, e criar as caches de muitos núcleos custa pouco. A alocação é
+# de todos os conjuntos de uma vez (até 8 bytes por linha, conforme a
+# política), ao contrário das linhas, que ocupam memória só nos conjuntos
+# (TACache) ou blocos de conjuntos (ArrayStorage) já preenchidos.
+
+
+class FIFO:
+    # Fila circular por conjunto: substitui a linha inserida há mais tempo.
+    #
+    # @param numConjuntos : int - número de conjuntos.
+    # @param numVias : int - número de linhas por conjunto.
+    #
+    def __init__(self, numConjuntos, numVias):
+        self.__numConjuntos = numConjuntos
+        self.__numVias = numVias
+        self.__posInserirFila = None
+
+    # Aloca os buffers, no primeiro preenchimento.
+    #
+    # @return None.
+    #
+    def __alocar(self):
+        self.__posInserirFila = array('I', bytes(4 * self.__numConjuntos))
+
+    # Obtém o nome da política, como em criarPolitica.
+    #
+    # @return str.
+    #
+    def getNome(self):
+        return POLITICA_FIFO
+
+    # Hit não altera a fila.
+    #
+    # @param conjunto : int - conjunto do acesso.
+    # @param via : int - via do acesso.
+    #
+    # @return None.
+    #
+    def acesso(self, conjunto, via):
+        pass
+
+    # Avança a posição de inserção do conjunto para a via seguinte.
+    #
+    # @param conjunto : int - conjunto da linha.
+    # @param via : int - via onde a linha foi inserida.
+    #
+    # @return None.
+    #
+    def preenchimento(self, conjunto, via):
+        if self.__posInserirFila == None:
+            self.__alocar()
+        self.__posInserirFila[conjunto] = (via + 1) % self.__numVias
+
+    # Escolhe a via na posição de inserção da fila.
+    #
+    # @param conjunto : int - conjunto cheio.
+    #
+    # @return int - via.
+    #
+    def vitima(self, conjunto):
+        return self.__posInserirFila[conjunto]
+
+    # Obtém as posições de inserção de todos os conjuntos (sem cópia).
+    #
+    # @return array - ou None se nada foi preenchido.
+    #
+    def getEstado(self):
+        return self.__posInserirFila
+
+    # Restaura as posições de inserção obtidas com getEstado.
+    #
+    # @param estado : array - estado salvo, ou None.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if estado == None:
+            self.__posInserirFila = None
+        else:
+            self.__alocar()
+            self.__posInserirFila = copiarBuffer(self.__posInserirFila, estado)
+
+
+class LRU:
+    # estático: listas vazias (cada nó apontando para si) já montadas, por
+    # número de nós, copiadas por todas as caches de mesma geometria.
+    modelos = {}
+
+    # LRU exata com uma lista duplamente encadeada por conjunto (da menos
+    # para a mais recente), então acesso, preenchimento e vitima são O(1).
+    # O nó numSlots + conjunto é o sentinela da lista do conjunto; um nó
+    # fora da lista aponta para si mesmo.
+    #
+    # @param numConjuntos : int - número de conjuntos.
+    # @param numVias : int - número de linhas por conjunto.
+    #
+    def __init__(self, numConjuntos, numVias):
+        self.__numVias = numVias
+        self.__numSlots = numConjuntos * numVias
+        self.__numNos = self.__numSlots + numConjuntos
+        self.__anterior = None
+        self.__proximo = None
+
+    # Aloca os buffers, no primeiro preenchimento.
+    #
+    # @return None.
+    #
+    def __alocar(self):
+        modelo = LRU.modelos.get(self.__numNos)
+        if modelo == None:
+            modelo = LRU.modelos[self.__numNos] = array('I', range(self.__numNos))
+        self.__anterior = modelo[:]
+        self.__proximo = modelo[:]
+
+    # Obtém o nome da política, como em criarPolitica.
+    #
+    # @return str.
+    #
+    def getNome(self):
+        return POLITICA_LRU
+
+    # Move o nó da via para o fim (mais recente) da lista do conjunto.
+    #
+    # @param conjunto : int - conjunto do acesso.
+    # @param via : int - via do acesso.
+    #
+    # @return None.
+    #
+    def acesso(self, conjunto, via):
+        anterior = self.__anterior
+        proximo = self.__proximo
+        no = conjunto * self.__numVias + via
+        sentinela = self.__numSlots + conjunto
+
+        a, p = anterior[no], proximo[no]
+        proximo[a] = p
+        anterior[p] = a
+
+        ultimo = anterior[sentinela]
+        proximo[ultimo] = no
+        anterior[no] = ultimo
+        proximo[no] = sentinela
+        anterior[sentinela] = no
+
+    # Inserção: a linha passa a ser a mais recente.
+    #
+    # @param conjunto : int - conjunto da linha.
+    # @param via : int - via onde a linha foi inserida.
+    #
+    # @return None.
+    #
+    def preenchimento(self, conjunto, via):
+        if self.__anterior == None:
+            self.__alocar()
+        self.acesso(conjunto, via)
+
+    # Escolhe a via do primeiro nó (menos recente) da lista do conjunto.
+    #
+    # @param conjunto : int - conjunto cheio.
+    #
+    # @return int - via.
+    #
+    def vitima(self, conjunto):
+        return self.__proximo[self.__numSlots + conjunto] - conjunto * self.__numVias
+
+    # Obtém as listas de todos os conjuntos (sem cópia).
+    #
+    # @return tuple - (anterior, proximo), ou None se nada foi preenchido.
+    #
+    def getEstado(self):
+        if self.__anterior == None:
+            return None
+        return self.__anterior, self.__proximo
+
+    # Restaura as listas obtidas com getEstado.
+    #
+    # @param estado : tuple - estado salvo, ou None.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if estado == None:
+            self.__anterior = self.__proximo = None
+        else:
+            anterior, proximo = estado
+            self.__alocar()
+            self.__anterior = copiarBuffer(self.__anterior, anterior)
+            self.__proximo = copiarBuffer(self.__proximo, proximo)
+
+
+class PLRU:
+    # Pseudo-LRU em árvore: numVias - 1 bits por conjunto (nós 1..numVias-1
+    # de uma árvore binária), cada um apontando para a metade menos
+    # recentemente usada. Custo O(log numVias).
+    #
+    # @param numConjuntos : int - número de conjuntos.
+    # @param numVias : int - número de linhas por conjunto, potência de 2.
+    #
+    def __init__(self, numConjuntos, numVias):
+        self.__numConjuntos = numConjuntos
+        self.__numVias = numVias
+        self.__niveis = log2(numVias)
+        self.__bits = None
+
+    # Aloca os buffers, no primeiro preenchimento.
+    #
+    # @return None.
+    #
+    def __alocar(self):
+        self.__bits = bytearray(self.__numConjuntos * self.__numVias)
+
+    # Obtém o nome da política, como em criarPolitica.
+    #
+    # @return str.
+    #
+    def getNome(self):
+        return POLITICA_PLRU
+
+    # Faz os nós do caminho até a via apontarem para o outro lado.
+    #
+    # @param conjunto : int - conjunto do acesso.
+    # @param via : int - via do acesso.
+    #
+    # @return None.
+    #
+    def acesso(self, conjunto, via):
+        bits = self.__bits
+        base = conjunto * self.__numVias
+        no = 1
+        for k in range(self.__niveis - 1, -1, -1):
+            b = (via >> k) & 1
+            bits[base + no] = b ^ 1
+            no = 2 * no + b
+
+    # Inserção: a linha conta como acessada.
+    #
+    # @param conjunto : int - conjunto da linha.
+    # @param via : int - via onde a linha foi inserida.
+    #
+    # @return None.
+    #
+    def preenchimento(self, conjunto, via):
+        if self.__bits == None:
+            self.__alocar()
+        self.acesso(conjunto, via)
+
+    # Escolhe a via seguindo os bits a partir da raiz até uma folha.
+    #
+    # @param conjunto : int - conjunto cheio.
+    #
+    # @return int - via.
+    #
+    def vitima(self, conjunto):
+        bits = self.__bits
+        base = conjunto * self.__numVias
+        no = 1
+        for k in range(self.__niveis):
+            no = 2 * no + bits[base + no]
+        return no - self.__numVias
+
+    # Obtém os bits de todos os conjuntos (sem cópia).
+    #
+    # @return bytearray - ou None se nada foi preenchido.
+    #
+    def getEstado(self):
+        return self.__bits
+
+    # Restaura os bits obtidos com getEstado.
+    #
+    # @param estado : bytearray - estado salvo, ou None.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if estado == None:
+            self.__bits = None
+        else:
+            self.__alocar()
+            self.__bits = copiarBuffer(self.__bits, estado)
+
+
+class Aleatoria:
+    # Substitui uma via sorteada, com gerador de semente fixa para que as
+    # simulações sejam reproduzíveis.
+    #
+    # @param numConjuntos : int - número de conjuntos.
+    # @param numVias : int - número de linhas por conjunto.
+    # @param semente : int - semente do gerador.
+    #
+    def __init__(self, numConjuntos, numVias, semente=0):
+        self.__numVias = numVias
+        self.__semente = semente
+        self.__gerador = Random(semente)
+
+    # Obtém o nome da política, como em criarPolitica.
+    #
+    # @return str.
+    #
+    def getNome(self):
+        return '{}:{}'.format(POLITICA_RANDOM, self.__semente)
+
+    # Hit não altera o sorteio.
+    #
+    # @param conjunto : int - conjunto do acesso.
+    # @param via : int - via do acesso.
+    #
+    # @return None.
+    #
+    def acesso(self, conjunto, via):
+        pass
+
+    # Preenchimento não altera o sorteio.
+    #
+    # @param conjunto : int - conjunto da linha.
+    # @param via : int - via onde a linha foi inserida.
+    #
+    # @return None.
+    #
+    def preenchimento(self, conjunto, via):
+        pass
+
+    # Sorteia uma via do conjunto.
+    #
+    # @param conjunto : int - conjunto cheio.
+    #
+    # @return int - via.
+    #
+    def vitima(self, conjunto):
+        return self.__gerador.randrange(self.__numVias)
+
+    # Obtém o estado do gerador.
+    #
+    # @return tuple.
+    #
+    def getEstado(self):
+        return self.__gerador.getstate()
+
+    # Restaura o estado do gerador obtido com getEstado.
+    #
+    # @param estado : tuple - estado salvo.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        self.__gerador.setstate(estado)
+
+
+class LFU:
+    # Substitui a via com menos acessos desde que foi preenchida (empate:
+    # menor via). Os contadores são O(1) por acesso; a escolha da vítima
+    # percorre as vias do conjunto, só em miss.
+    #
+    # @param numConjuntos : int - número de conjuntos.
+    # @param numVias : int - número de linhas por conjunto.
+    #
+    def __init__(self, numConjuntos, numVias):
+        self.__numConjuntos = numConjuntos
+        self.__numVias = numVias
+        self.__contagens = None
+
+    # Aloca os buffers, no primeiro preenchimento.
+    #
+    # @return None.
+    #
+    def __alocar(self):
+        self.__contagens = array('I', bytes(4 * self.__numConjuntos * self.__numVias))
+
+    # Obtém o nome da política, como em criarPolitica.
+    #
+    # @return str.
+    #
+    def getNome(self):
+        return POLITICA_LFU
+
+    # Conta um acesso à via, saturando em 32 bits.
+    #
+    # @param conjunto : int - conjunto do acesso.
+    # @param via : int - via do acesso.
+    #
+    # @return None.
+    #
+    def acesso(self, conjunto, via):
+        slot = conjunto * self.__numVias + via
+        if self.__contagens[slot] < 0xFFFFFFFF:
+            self.__contagens[slot] += 1
+
+    # Inserção: a linha começa com um acesso.
+    #
+    # @param conjunto : int - conjunto da linha.
+    # @param via : int - via onde a linha foi inserida.
+    #
+    # @return None.
+    #
+    def preenchimento(self, conjunto, via):
+        if self.__contagens == None:
+            self.__alocar()
+        self.__contagens[conjunto * self.__numVias + via] = 1
+
+    # Escolhe a via com menos acessos no conjunto (empate: a menor).
+    #
+    # @param conjunto : int - conjunto cheio.
+    #
+    # @return int - via.
+    #
+    def vitima(self, conjunto):
+        base = conjunto * self.__numVias
+        contagens = self.__contagens[base:base + self.__numVias]
+        return contagens.index(min(contagens))
+
+    # Obtém os contadores de todos os conjuntos (sem cópia).
+    #
+    # @return array - ou None se nada foi preenchido.
+    #
+    def getEstado(self):
+        return self.__contagens
+
+    # Restaura os contadores obtidos com getEstado.
+    #
+    # @param estado : array - estado salvo, ou None.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        if estado == None:
+            self.__contagens = None
+        else:
+            self.__alocar()
+            self.__contagens = copiarBuffer(self.__contagens, estado)
+
+
+# Políticas pelo nome.
+POLITICAS = {
+    POLITICA_FIFO: FIFO,
+    POLITICA_LRU: LRU,
+    POLITICA_PLRU: PLRU,
+    POLITICA_RANDOM: Aleatoria,
+    POLITICA_LFU: LFU,
+}
+
+
+# Verifica o nome de uma política ('random' aceita 'random:<semente>').
+#
+# @param politica : str - nome da política.
+#
+# @raise TypeError, ValueError.
+#
+# @return None.
+#
+def verificaPolitica(politica):
+    if type(politica) != str:
+        raise TypeError('Política de substituição deve ser str.')
+
+    nome, _, semente = politica.partition(':')
+
+    if nome not in POLITICAS:
+        raise ValueError('Política de substituição inválida: {} (válidas: {}).'.format(
+            politica, ', '.join(POLITICAS)
+            )
+        )
+
+    if semente != '' and (nome != POLITICA_RANDOM or not semente.isdigit()):
+        raise ValueError('Semente inválida na política {}.'.format(politica))
+
+
+# Cria o estado de uma política para uma cache.
+#
+# @param politica : str - nome da política.
+# @param numConjuntos : int - número de conjuntos.
+# @param numVias : int - número de linhas por conjunto.
+#
+# @raise TypeError, ValueError.
+#
+# @return FIFO, LRU, PLRU, Aleatoria ou LFU.
+#
+def criarPolitica(politica, numConjuntos, numVias):
+    verificaPolitica(politica)
+
+    nome, _, semente = politica.partition(':')
+
+    if nome == POLITICA_RANDOM:
+        return Aleatoria(numConjuntos, numVias, int(semente) if semente != '' else 0)
+    else:
+        return POLITICAS[nome](numConjuntos, numVias)
@@ -1,6 +1,9 @@
+from array import array
 from src.util import isPotenciaDois
 from src.util import log2
-from src.util import Word
+from src.util import copiarBuffer
+from src.Substituicao import criarPolitica
+from src.Substituicao import verificaPolitica
 from src.constantes import *
 
 
@@ -12,34 +15,75 @@ class TACache:
     #
     # @param tamLinha : int - número de bytes por linha, deve ser potência de 2.
     #
+    # @param politica : str - política de substituição (POLITICA_*).
+    #
+    # @param estado : object - estado da política já criado com criarPolitica,
+    #                          compartilhado pelos conjuntos de uma SACache; se
+    #                          None, é criado um só para esta cache.
+    #
+    # @param conjunto : int - índice desta cache no estado compartilhado.
+    #
+    # @param dados : bool - guarda as words das linhas; se False, só as tags e o
+    #                       estado (válido, sujo, substituição) e as leituras
+    #                       que acertam retornam 0.
+    #
     # @raise TypeError, ValueError.
     #
-    def __init__(self, capacidade, tamLinha):
-        self.__verificaArgumentos(capacidade, tamLinha)
+    def __init__(self, capacidade, tamLinha, politica=POLITICA_FIFO, estado=None, conjunto=0,
+                 dados=True):
+        self.__verificaArgumentos(capacidade, tamLinha, politica)
 
         self.__capacidade = capacidade
         self.__tamLinha = tamLinha
         self.__numLinhas = capacidade // tamLinha
         self.__numColunas = tamLinha // 4
         self.__tamOffset = log2(self.__numColunas)
+        self.__mascaraOffset = self.__numColunas - 1
 
         self.__tags = [None] * self.__numLinhas
 
-        # cada célula tem uma word de 4 bytes (32 bits)
-        self.__matriz = [[Word(0)] * self.__numColunas for i in range(self.__numLinhas)]
+        # índice tag -> linha, mantido em sincronia com self.__tags
+        self.__indice = {}
+
+        # cada célula tem uma word de 4 bytes (32 bits), as linhas ficam em
+        # sequência (linha * largura + coluna); no modo só de tags a largura
+        # é 0 e nenhuma word é guardada.
+        self.__armazenaDados = dados
+        self.__largura = self.__numColunas if dados else 0
+        self.__matriz = array('I', bytes(4 * self.__numLinhas * self.__largura))
+
+        # bit de sujo de cada word (alterada e ainda não escrita de volta),
+        # em sequência como a matriz mas também no modo só de tags; só as
+        # words sujas são escritas de volta, para não sobrescrever as que
+        # foram escritas direto no nível de baixo depois do preenchimento.
+        self.__sujas = bytearray(self.__numLinhas * self.__numColunas)
+        self.__limpas = bytes(self.__numColunas)
+
+        # linhas ocupadas, preenchidas em ordem antes de haver substituição.
+        self.__numOcupadas = 0
+
+        # posições de linhas invalidadas (coerência), ocupadas antes de
+        # haver nova substituição.
+        self.__livres = []
 
-        self.__posInserirFila = 0
+        self.__politica = politica
+        self.__estado = estado if estado != None else criarPolitica(politica, 1, self.__numLinhas)
+        self.__conjunto = conjunto
+
+        # o estado da política só é salvo com a cache se for só dela.
+        self.__estadoProprio = estado == None
 
     # Lança exceção se algum dos argumentos do construtor estiver errado.
     # 
     # @param capacidade : int - mesmo do construtor.
     # @param tamLinha : int - mesmo do construtor.
+    # @param politica : str - mesmo do construtor.
     #
     # @raise TypeError, ValueError.
     #
     # @return None.
     #
-    def __verificaArgumentos(self, capacidade, tamLinha):
+    def __verificaArgumentos(self, capacidade, tamLinha, politica):
         if type(capacidade) != int:
             raise ValueError('Capacidade inválida, deve ser inteiro.')
 
@@ -58,14 +102,24 @@ class TACache:
         if capacidade % tamLinha != 0:
             raise ValueError('Capacidade inválida, deve ser múltiplo de tamLinha.')
 
-    # Obtém a posição correta para se inserir uma nova tag na lista (fila circular)
+        verificaPolitica(politica)
+
+    # Obtém a posição para se inserir uma nova tag: a menor linha
+    # invalidada, a próxima linha livre ou, com a cache cheia, a vítima
+    # escolhida pela política.
     #
     # @return int.
     #
-    def __getPosicaoInserirFila(self):
-        posAtual = self.__posInserirFila
-        self.__posInserirFila = (self.__posInserirFila + 1) % self.__numLinhas
-        return posAtual
+    def __getPosicaoInserir(self):
+        if self.__livres:
+            pos = min(self.__livres)
+            self.__livres.remove(pos)
+            return pos
+        elif self.__numOcupadas < self.__numLinhas:
+            self.__numOcupadas += 1
+            return self.__numOcupadas - 1
+        else:
+            return self.__estado.vitima(self.__conjunto)
 
     # Obtém a capacidade. 
     #
@@ -88,6 +142,20 @@ class TACache:
     def getNumLinhas(self):
         return self.__numLinhas
 
+    # Obtém a política de substituição.
+    #
+    # @return str.
+    #
+    def getPolitica(self):
+        return self.__politica
+
+    # Informa se a cache guarda as words das linhas.
+    #
+    # @return bool.
+    #
+    def armazenaDados(self):
+        return self.__armazenaDados
+
     # Obtém os bits de offset de um dado endereço. 
     #
     # @param address : int - endereço de 32 bits (4 bytes).
@@ -98,7 +166,7 @@ class TACache:
     #
     def getBitsOffset(self, address):
         self.__verificaAddress(address)
-        return address & (self.__numColunas - 1)
+        return address & self.__mascaraOffset
 
     # Obtém os bits de tag de um dado endereço. 
     #
@@ -117,102 +185,333 @@ class TACache:
     # @return str.
     #
     def __repr__(self):
-        out = '{} -> {}'.format(self.__tags[0], self.__matriz[0])
+        out = '{} -> {}'.format(self.__tags[0], self.__getValores(0))
         for i in range(1, self.__numLinhas):
-            out += '\n{} -> {}'.format(self.__tags[i], self.__matriz[i])
+            out += '\n{} -> {}'.format(self.__tags[i], self.__getValores(i))
         return out
 
+    # Obtém uma cópia das words de uma linha.
+    #
+    # @param pos : int - posição da linha.
+    #
+    # @return array.
+    #
+    def __getValores(self, pos):
+        n = self.__largura
+        return self.__matriz[pos * n:(pos + 1) * n]
+
+    # Retira a linha da posição para ser escrita de volta, se ela tem
+    # alguma word suja, limpando os bits de sujo.
+    #
+    # @param pos : int - posição da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo das words), ou None.
+    #
+    def __retirarSuja(self, pos):
+        c = self.__numColunas
+        if self.__sujas.find(1, pos * c, (pos + 1) * c) == -1:
+            return None
+
+        sujas = self.__sujas[pos * c:(pos + 1) * c]
+        self.__sujas[pos * c:(pos + 1) * c] = self.__limpas
+        return self.__tags[pos] << self.__tamOffset, self.__getValores(pos), sujas
+
     # Obtém o dado salvo do endereço. 
     #
     # @param address : int - endereço de 32 bits (4 bytes).
-    # @param word : Word - inteiro de 32 bits passado por valor.
+    #
+    # @raise TypeError, ValueError, IndexError.
+    #
+    # @return int - valor de 32 bits, ou None em caso de miss.
+    #
+    def getDado(self, address):
+        self.__verificaAddress(address)
+        return self.lerDado(address)
+
+    # Obtém uma cópia da linha que começa no endereço.
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @raise TypeError, ValueError.
+    #
+    # @return array - words da linha, ou None se ela não estiver na cache.
+    #
+    def getLinha(self, address):
+        self.__verificaAddress(address)
+        return self.lerLinha(address)
+
+    # Insere uma linha da memória na cache. Se for preciso substituir uma
+    # linha suja, ela é retornada para ser escrita de volta.
+    #
+    # @param address : int - endereço de origem.
+    # @param linha : list - valores (int) da linha da memória; só as primeiras
+    #                       tamLinha // 4 words são guardadas, faltando são 0.
+    #
+    # @raise TypeError, IndexError, ValueError, OverflowError.
+    #
+    # return tuple - (endereço, words, bits de sujo) da linha suja
+    #                substituída, ou None.
+    #
+    def setLine(self, address, linha):
+        self.__verificaAddress(address)
+        self.__verificaLinha(linha)
+        return self.escreverLinha(address, linha)[1]
+
+    # Insere um dado lido da memória na cache.
+    #
+    # @param address : int - endereço de origem do dado.
+    # @param valor : int - dado a ser inserido, 32 bits sem sinal.
+    # @param sujar : bool - marca a linha como suja (write-back).
+    #
+    # @raise TypeError, ValueError, OverflowError.
+    #
+    # return bool.
+    #
+    def setDado(self, address, valor, sujar=False):
+        self.__verificaAddress(address)
+        return self.escreverDado(address, valor, sujar)
+
+    # Escreve words na linha que começa no endereço, se ela estiver na
+    # cache, e as marca como sujas. Usado na escrita de volta de uma linha
+    # menor de um nível acima.
+    #
+    # @param address : int - endereço de início da linha.
+    # @param inicio : int - índice da primeira word na linha.
+    # @param words : list - valores (int) a escrever.
+    # @param sujas : bytes - bits de sujo das words; só as sujas são
+    #                        escritas (None escreve todas).
     #
     # @raise TypeError, ValueError, IndexError.
     #
     # @return bool.
     #
-    def getDado(self, address, word):
+    def escreverPalavras(self, address, inicio, words, sujas=None):
         self.__verificaAddress(address)
-        self.__verificaWord(word)
 
-        tag = self.getBitsTag(address)
-        offset = self.getBitsOffset(address)
+        pos = self.__indice.get(address >> self.__tamOffset, -1)
+
+        if pos == -1:
+            return CACHE_MISS
+
+        if sujas == None:
+            sujas = b'\x01' * len(words)
+
+        if inicio < 0 or inicio + len(sujas) > self.__numColunas:
+            raise IndexError('Words fora da linha.')
+
+        k = pos * self.__numColunas + inicio
+        for j, suja in enumerate(sujas):
+            if suja:
+                if self.__armazenaDados:
+                    self.__matriz[pos * self.__largura + inicio + j] = words[j]
+                self.__sujas[k + j] = 1
+
+        return CACHE_HIT
+
+    # Primitivas de acesso sem verificação de argumentos, para quem já
+    # verificou o endereço (ver SACache e Memory). Fazem o mesmo que
+    # getDado, getLinha, setLine e setDado.
+
+    # Obtém o dado salvo do endereço.
+    #
+    # @param address : int - endereço de 32 bits (4 bytes).
+    #
+    # @raise IndexError.
+    #
+    # @return int - valor de 32 bits, ou None em caso de miss.
+    #
+    def lerDado(self, address):
+        offset = address & self.__mascaraOffset
 
         if offset % 4 != 0:
             raise IndexError('Offset deve ser múltiplo de 4.')
 
-        pos = self.buscaTag(tag)
+        pos = self.__indice.get(address >> self.__tamOffset, -1)
 
         if pos != -1:
-            celula = self.__matriz[pos][offset]
-            word.set(celula.get())
-            return CACHE_HIT
+            self.__estado.acesso(self.__conjunto, pos)
+            return self.__matriz[pos * self.__largura + offset] if self.__armazenaDados else 0
         else:
-            return CACHE_MISS
+            return None
+
+    # Obtém uma cópia da linha que começa no endereço.
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return array - words da linha, ou None se ela não estiver na cache.
+    #
+    def lerLinha(self, address):
+        pos = self.__indice.get(address >> self.__tamOffset, -1)
+
+        if pos == -1:
+            return None
+        else:
+            return self.__getValores(pos)
 
-    # Insere uma linha da memória na cache.
+    # Insere uma linha na cache.
     #
     # @param address : int - endereço de origem.
-    # @param linha : list - valores da linha da memória.
+    # @param linha : list - valores (int) da linha.
     #
-    # @raise TypeError, IndexError, ValueError.
+    # @raise OverflowError.
     #
-    # return None.
+    # return tuple - (LINHA_*, (endereço, words, bits de sujo) da linha suja
+    #                substituída ou None).
     #
-    def setLine(self, address, linha):
-        self.__verificaAddress(address)
-        self.__verificaLinha(linha)
+    def escreverLinha(self, address, linha):
+        tag = address >> self.__tamOffset
+        pos = self.__indice.get(tag, -1)
+        codigo = LINHA_ATUALIZADA
+        vitima = None
 
-        tag = self.getBitsTag(address)
-        pos = self.buscaTag(tag)
-        linha = [word.copy() for word in linha]
+        if pos == -1:
+            pos = self.__getPosicaoInserir()
+            codigo = LINHA_PREENCHIDA if self.__tags[pos] == None else LINHA_SUBSTITUIDA
 
-        if pos != -1:
-            self.__matriz[pos] = linha
-        else:
-            posFila = self.__getPosicaoInserirFila()
-            self.__tags[posFila] = tag
-            self.__matriz[posFila] = linha
+            if self.__tags[pos] != None:
+                vitima = self.__retirarSuja(pos)
 
-    # Insere um dado lido da memória na cache.
+            self.__indice.pop(self.__tags[pos], None)
+            self.__indice[tag] = pos
+            self.__tags[pos] = tag
+            self.__estado.preenchimento(self.__conjunto, pos)
+
+        # Linha já presente só tem os dados atualizados, a política não
+        # conta como acesso.
+        n = self.__largura
+        valores = array('I', linha[:n])
+        if len(valores) < n:
+            valores.extend(bytes(4 * (n - len(valores))))
+        self.__matriz[pos * n:(pos + 1) * n] = valores
+
+        return codigo, vitima
+
+    # Insere um dado na linha que contém o endereço, se ela estiver na cache.
     #
     # @param address : int - endereço de origem do dado.
-    # @param word : Word - dado a ser inserido.
+    # @param valor : int - dado a ser inserido, 32 bits sem sinal.
+    # @param sujar : bool - marca a linha como suja (write-back).
     #
-    # @raise TypeError, ValueError.
+    # @raise IndexError, OverflowError.
     #
     # return bool.
     #
-    def setDado(self, address, word):
-        self.__verificaAddress(address)
-        self.__verificaWord(word)
-
-        tag = self.getBitsTag(address)
-        linha = self.buscaTag(tag)
+    def escreverDado(self, address, valor, sujar=False):
+        linha = self.__indice.get(address >> self.__tamOffset, -1)
 
         if linha == -1:
             return CACHE_MISS
         else:
-            offset = self.getBitsOffset(address)
+            offset = address & self.__mascaraOffset
 
             if offset % 4 != 0:
                 raise IndexError('Offset deve ser múltiplo de 4.')
 
-            self.__matriz[linha][offset] = word.copy()
+            if self.__armazenaDados:
+                self.__matriz[linha * self.__largura + offset] = valor
+            self.__estado.acesso(self.__conjunto, linha)
+            if sujar:
+                self.__sujas[linha * self.__numColunas + offset] = 1
             return CACHE_HIT
 
+    # Remove a linha que começa no endereço, se ela estiver na cache
+    # (invalidação por coerência). A posição fica livre para o próximo
+    # preenchimento.
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def invalidarLinha(self, address):
+        vitima = self.limparLinha(address)
+        pos = self.__indice.pop(address >> self.__tamOffset, -1)
+
+        if pos == -1:
+            return None
+
+        self.__tags[pos] = None
+        self.__livres.append(pos)
+        return vitima
+
+    # Limpa os bits de sujo da linha que começa no endereço, que continua
+    # na cache (rebaixamento por coerência).
+    #
+    # @param address : int - endereço de início da linha.
+    #
+    # @return tuple - (endereço, words, bits de sujo) da linha, se estava
+    #                 suja, ou None.
+    #
+    def limparLinha(self, address):
+        pos = self.__indice.get(address >> self.__tamOffset, -1)
+
+        if pos != -1:
+            return self.__retirarSuja(pos)
+        else:
+            return None
+
+    # Obtém o estado da cache para um checkpoint: tags das linhas ocupadas
+    # (que são preenchidas em ordem, 0 nas invalidadas), posições
+    # invalidadas, words, bits de sujo das words e o estado da política, se não for
+    # compartilhado. Os buffers não são copiados, então o estado deve ser
+    # gravado antes de a cache ser alterada.
+    #
+    # @return dict.
+    #
+    def getEstado(self):
+        tags = self.__tags[:self.__numOcupadas]
+        for pos in self.__livres:
+            tags[pos] = 0
+
+        return {
+            'tags': array('I', tags),
+            'livres': list(self.__livres),
+            'matriz': self.__matriz,
+            'sujas': self.__sujas,
+            'politica': self.__estado.getEstado() if self.__estadoProprio else None,
+        }
+
+    # Restaura um estado obtido com getEstado de uma cache de mesma
+    # configuração, refazendo o índice de tags.
+    #
+    # @param estado : dict - estado salvo.
+    #
+    # @raise ValueError.
+    #
+    # @return None.
+    #
+    def setEstado(self, estado):
+        tags = estado['tags']
+        if len(tags) > self.__numLinhas:
+            raise ValueError('Estado salvo incompatível com a cache (linhas demais).')
+
+        livres = estado['livres']
+        if any(not 0 <= pos < len(tags) for pos in livres):
+            raise ValueError('Estado salvo incompatível com a cache (linha livre inexistente).')
+
+        self.__matriz = copiarBuffer(self.__matriz, estado['matriz'])
+        self.__sujas = copiarBuffer(self.__sujas, estado['sujas'])
+
+        self.__numOcupadas = len(tags)
+        self.__tags = tags.tolist() + [None] * (self.__numLinhas - len(tags))
+        self.__livres = list(livres)
+        for pos in livres:
+            self.__tags[pos] = None
+        self.__indice = {tag: pos for pos, tag in enumerate(self.__tags) if tag != None}
+
+        if self.__estadoProprio:
+            self.__estado.setEstado(estado['politica'])
+
     # Busca posição (linha) onde está a tag na cache. Se não
-    # encontrar, retorna -1.
+    # encontrar, retorna -1. Consulta o índice de tags, então o custo
+    # não depende da associatividade.
     #
     # @param tag : int - tag a ser buscada
     #
     # @return int.
     #
     def buscaTag(self, tag):
-        for i in range(self.__numLinhas):
-            if tag == self.__tags[i]:
-                return i
-        return -1
+        return self.__indice.get(tag, -1)
 
     # Verifica corretude do endereço.
     #
@@ -228,43 +527,28 @@ class TACache:
         if address.bit_length() > 32 or address < 0:
             raise ValueError('Endereço inválido.')
 
-    # Verifica corretude da palavra de 32 bits.
-    #
-    # @param word : Word - palavra 32 bits.
-    #
-    # @raise TypeError.
-    #
-    # @return None.
-    #
-    def __verificaWord(self, word):
-        if type(word) != Word:
-            raise TypeError('Word inválida.')
-
     # Verifica corretude da linha da memória.
     #
-    # @param linha : list - lista de words.
+    # @param linha : list - lista de valores (os valores são verificados
+    #                       ao serem copiados para o array).
     #
     # @raise TypeError, IndexError.
     #
     # @return None.
     #
     def __verificaLinha(self, linha):
-        if type(linha) != list:
-            raise TypeError('Linha deve ser list.')
+        if type(linha) != list and type(linha) != array:
+            raise TypeError('Linha deve ser list ou array.')
 
         if len(linha) > self.__tamLinha:
             raise IndexError('Linha é maior que a capacidade da cache.')
 
-        for item in linha:
-            if type(item) != Word:
-                raise TypeError('Elementos da linha devem ser Word.')
-
 
 ### FUNÇÕES DE INTERFACE (adapter):
 
 
-def createTACache(c, l):
-    return TACache(c, l)
+def createTACache(c, l, politica=POLITICA_FIFO):
+    return TACache(c, l, politica)
 
 
 def getTACacheCapacity(tac):
@@ -276,12 +560,16 @@ def getTACacheLineSize(tac):
 
 
 def getTACacheData(tac, address, value):
-    return tac.getDado(address, value)
+    valor = tac.getDado(address)
+    if valor == None:
+        return CACHE_MISS
+    value.set(valor)
+    return CACHE_HIT
 
 
 def setTACacheLine(tac, address, line):
-    tac.setLine(address, line)
+    tac.setLine(address, [word.get() for word in line])
 
 
 def setTACacheData(tac, address, value):
-    return tac.setDado(address, value)
+    return tac.setDado(address, value.get())
@@ -0,0 +1,62 @@
+import pickle
+import struct
+import os
+
+
+# Formato do arquivo de checkpoint:
+#
+#   cabeçalho : 'SMCK' + versão (uint16)
+#   estado    : dict serializado com pickle (protocolo mais alto)
+#
+# O estado (ver Interpreter) guarda os buffers das caches, das políticas e
+# da memória como arrays e bytes, que o pickle grava em blocos, então o
+# custo depende do tamanho da hierarquia e não do número de words. O pickle
+# pode executar código ao ler, então só devem ser carregados checkpoints
+# gravados pelo próprio simulador.
+
+MAGIC = b'SMCK'
+VERSAO = 4
+
+CABECALHO = struct.Struct('<4sH')
+
+
+# Grava um checkpoint. O arquivo é escrito ao lado e só então substitui o
+# anterior, para que uma falha durante a gravação não perca o último
+# checkpoint válido.
+#
+# @param caminho : str - arquivo de destino.
+# @param estado : dict - estado do simulador.
+#
+# @return None.
+#
+def gravarCheckpoint(caminho, estado):
+    temporario = caminho + '.tmp'
+
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(MAGIC, VERSAO))
+        pickle.dump(estado, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(temporario, caminho)
+
+
+# Lê um checkpoint gravado com gravarCheckpoint.
+#
+# @param caminho : str - arquivo do checkpoint.
+#
+# @raise ValueError, OSError.
+#
+# @return dict - estado do simulador.
+#
+def lerCheckpoint(caminho):
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read(CABECALHO.size)
+        if len(dados) != CABECALHO.size:
+            raise ValueError('Checkpoint sem cabeçalho.')
+
+        magic, versao = CABECALHO.unpack(dados)
+        if magic != MAGIC:
+            raise ValueError('Arquivo não é um checkpoint.')
+        if versao != VERSAO:
+            raise ValueError('Versão de checkpoint não suportada: {}.'.format(versao))
+
+        return pickle.load(arquivo)
@@ -11,4 +11,50 @@ ADDRESS_OUT_OF_RANGE = -1
 FOUND_IN_L1 = 1
 FOUND_IN_L2 = 2
 FOUND_IN_L3 = 3
-FOUND_IN_MEM = 4
\ No newline at end of file
+FOUND_IN_MEM = 4
+
+# Constantes para selecionar o motor de armazenamento
+# das caches associativas por conjuntos.
+STORAGE_OBJECTS = 0     # um TACache por conjunto
+STORAGE_ARRAY = 1       # buffers contíguos compartilhados
+
+
+# Constantes para selecionar o modo de saída
+# das mensagens de cada comando do interpretador.
+SAIDA_NORMAL = 'normal'          # imprime tudo, na hora
+SAIDA_SILENCIOSA = 'silencioso'  # nada, só o relatório final
+SAIDA_BUFFER = 'buffer'          # tudo, escrito em lotes no destino
+SAIDA_FALHAS = 'falhas'          # só os asserts que falharam
+
+
+# Constantes para selecionar a política de substituição
+# das caches (ver src/Substituicao.py).
+POLITICA_FIFO = 'fifo'       # fila circular por conjunto
+POLITICA_LRU = 'lru'         # menos recentemente usada
+POLITICA_PLRU = 'plru'       # pseudo-LRU em árvore
+POLITICA_RANDOM = 'random'   # aleatória com semente ('random:<semente>')
+POLITICA_LFU = 'lfu'         # menos frequentemente usada
+
+
+# Constantes para selecionar a política de escrita
+# da hierarquia (comando cmem).
+ESCRITA_WRITE_THROUGH = 'wt'   # escreve na memória a cada store e recarrega as linhas
+ESCRITA_WRITE_BACK = 'wb'      # escreve só no nível do hit, linhas sujas voltam na substituição
+
+
+# Constantes para informar o que escreverLinha fez
+# com a linha inserida em uma cache.
+LINHA_ATUALIZADA = 0     # já estava na cache, só os dados mudaram
+LINHA_PREENCHIDA = 1     # ocupou uma linha livre
+LINHA_SUBSTITUIDA = 2    # tomou o lugar de outra linha
+
+
+# Constantes para selecionar o protocolo de coerência
+# entre as caches privadas dos núcleos (comando cmem).
+COERENCIA_MSI = 'msi'     # modificada, compartilhada ou inválida
+COERENCIA_MESI = 'mesi'   # e exclusiva: a escrita de quem lê sozinho não gera tráfego
+
+
+# Máscara das words guardadas nas caches e na memória, que são
+# de 32 bits sem sinal: valores negativos ficam em complemento de dois.
+MASCARA_WORD = 0xFFFFFFFF
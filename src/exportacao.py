@@ -0,0 +1,87 @@
+from array import array
+import struct
+import sys
+
+
+# Funções para exportar tabelas de contadores inteiros sem depender de
+# bibliotecas externas.
+
+
+# Formatos de exportação aceitos (extensão dos arquivos).
+FORMATO_CSV = 'csv'
+FORMATO_NPY = 'npy'
+
+
+# Escreve uma tabela em CSV separado por ';', com cabeçalho.
+#
+# @param caminho : str - arquivo de destino.
+# @param colunas : tuple - nomes das colunas.
+# @param linhas : iterable - sequências de inteiros, uma por linha.
+#
+# @return None.
+#
+def escreverCSV(caminho, colunas, linhas):
+    with open(caminho, 'w') as arquivo:
+        arquivo.write(';'.join(colunas) + '\n')
+        for linha in linhas:
+            arquivo.write(';'.join(str(x) for x in linha) + '\n')
+
+
+# Escreve uma tabela de inteiros sem sinal de 64 bits no formato .npy
+# (versão 1.0), que o numpy lê com numpy.load como matriz (linhas x colunas).
+#
+# @param caminho : str - arquivo de destino.
+# @param numColunas : int - número de colunas.
+# @param linhas : iterable - sequências de numColunas inteiros.
+#
+# @raise ValueError, OverflowError.
+#
+# @return None.
+#
+def escreverNPY(caminho, numColunas, linhas):
+    dados = array('Q')
+    numLinhas = 0
+    for linha in linhas:
+        if len(linha) != numColunas:
+            raise ValueError('Linha com número de colunas diferente.')
+        dados.extend(linha)
+        numLinhas += 1
+
+    if sys.byteorder == 'big':
+        dados.byteswap()
+
+    # O cabeçalho termina em '\n' e é completado com espaços para que os
+    # dados comecem em múltiplo de 64 bytes.
+    cabecalho = "{{'descr': '<u8', 'fortran_order': False, 'shape': ({}, {}), }}".format(
+        numLinhas, numColunas
+    )
+    cabecalho += ' ' * (63 - (10 + len(cabecalho)) % 64) + '\n'
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'\x93NUMPY\x01\x00')
+        arquivo.write(struct.pack('<H', len(cabecalho)))
+        arquivo.write(cabecalho.encode('latin1'))
+        arquivo.write(dados.tobytes())
+
+
+# Escreve uma tabela no formato dado.
+#
+# @param caminho : str - arquivo de destino.
+# @param formato : str - FORMATO_CSV ou FORMATO_NPY.
+# @param colunas : tuple - nomes das colunas (só o CSV guarda os nomes).
+# @param linhas : list - sequências de inteiros, uma por linha.
+#
+# @raise ValueError.
+#
+# @return None.
+#
+def exportarTabela(caminho, formato, colunas, linhas):
+    if formato == FORMATO_CSV:
+        escreverCSV(caminho, colunas, linhas)
+    elif formato == FORMATO_NPY:
+        escreverNPY(caminho, len(colunas), linhas)
+    else:
+        raise ValueError('Formato de exportação inválido, deve ser {} ou {}.'.format(
+            FORMATO_CSV, FORMATO_NPY
+            )
+        )
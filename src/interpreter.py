@@ -1,11 +1,25 @@
 from src.SACache import SACache
 from src.Cache import Cache
 from src.MainMemory import MainMemory
+from src.MappedMainMemory import MappedMainMemory
 from src.Memory import Memory
 from src.Processor import Processor
 from src.Relatorio import Relatorio
-from src.util import Word
+from src.Saida import Saida
 from src.constantes import *
+from src.trace import lerCabecalho
+from src.trace import lerRegistros
+from src.trace import OP_RI, OP_WI, OP_RD, OP_WD, OP_ASSERTI, OP_ASSERTD
+from src.trace import OPERACOES
+from src.trace import REGISTRO
+from src.trace import NUM_ARGUMENTOS
+from src.checkpoint import gravarCheckpoint
+from src.checkpoint import lerCheckpoint
+from io import StringIO
+from time import perf_counter
+from os import fstat
+from heapq import merge
+from operator import itemgetter
 
 
 
@@ -31,7 +45,8 @@ class CompilationError(BaseException):
     #
     def getMessage(self):
         msg =  'Erro durante a compilação:\n'
-        msg += '  Arquivo de comandos "{}", linha {}\n'.format(self.__arquivo.name, self.__linha)
+        nome = getattr(self.__arquivo, 'name', '<cabeçalho>')
+        msg += '  Arquivo de comandos "{}", linha {}\n'.format(nome, self.__linha)
         msg += '    {}'.format(self.__getFileLine())
         msg += '    ^\n'
         msg += '{}: {}'.format(self.__tipo, self.__detalhes)
@@ -53,29 +68,36 @@ class CompilationError(BaseException):
 class Interpreter:
     # estático.
     comandosValidos = {
-        'cl1d': '<c> <a> <l>',
+        'cl1d': '<c> <a> <l> [politica]',
         # Cria uma variável L1D que é uma cache associativa por conjuntos com
         # capacidade c, associatividade a e l bytes por linha.
 
-        'cl1i': '<c> <a> <l>',
+        'cl1i': '<c> <a> <l> [politica]',
         # Cria uma variável L1I que é uma cache associativa por conjuntos com
         # capacidade c, associatividade a e l bytes por linha.
 
-        'cl2': '<c> <a> <l>',
+        'cl2': '<c> <a> <l> [politica]',
         # Cria uma variável L2 que é uma cache associativa por conjuntos com capacidade
         # c, associatividade a e l bytes por linha.
 
-        'cl3': '<c> <a> <l>',
+        'cl3': '<c> <a> <l> [politica]',
         # Cria uma variável L3 que é uma cache associativa por conjuntos com capacidade
         # c, associatividade a e l bytes por linha.
+        #
+        # Nos quatro comandos acima, politica é a política de substituição do
+        # nível: fifo (padrão), lru, plru, random[:semente] ou lfu.
 
-        'cmp': '<ramsize> <vmsize>',
+        'cmp': '<ramsize> <vmsize> [arquivo]',
         # Cria uma variável MP que é uma memória principal com ramsize
-        # bytes de RAM e vmsize bytes de memória virtual.
+        # bytes de RAM e vmsize bytes de memória virtual. Se arquivo for dado,
+        # a memória é mapeada nele (words de 32 bits little-endian).
 
-        'cmem': '',
+        'cmem': '[escrita] [coerencia]',
         # Cria uma variável MEM que é uma hierarquia de memória criada com L1D, L1I, L2, L3
-        # e MP já criados anteriormente.
+        # e MP já criados anteriormente. escrita é a política de escrita: wt
+        # (write-through, padrão) ou wb (write-back com bits de sujo). coerencia é
+        # o protocolo de coerência entre as caches privadas dos núcleos, com um
+        # diretório no L3: msi ou mesi (padrão: nenhum).
 
         'cp': '<n>',
         # Cria um __processador com n núcleos, sendo que cada núcleo terá uma hierarquia de
@@ -100,16 +122,106 @@ class Interpreter:
         # memória do núcleo n e verifica se o valor foi lido do nível level (variando de 1 a 5 conforme
         # retorno de getInstruction) e o valor lido é igual a value.
 
-        'assertd': '<n> <addr> <level> <value>'
+        'assertd': '<n> <addr> <level> <value>',
         # Lê o dado de endereço addr na hierarquia de memória
         # do núcleo n e verifica se o valor foi lido do nível level (variando de 1 a 5 conforme retorno de
         # getData) e o valor lido é igual a value.
+
+        'limg': '<addr> <arquivo>'
+        # Carrega na memória principal, a partir do endereço addr, a imagem binária
+        # (words de 32 bits little-endian) do arquivo, de uma vez e sem passar pelas caches;
+        # as linhas da faixa são antes invalidadas em todas elas (as sujas escritas de volta).
     }
 
+    # Argumentos que são texto, os demais são inteiros.
+    argumentosTexto = ('<arquivo>', '[arquivo]', '[politica]', '[escrita]', '[coerencia]')
+
+    # Bytes lidos por vez ao carregar uma imagem binária.
+    tamBlocoImagem = 1 << 20
+
     # Inicializa o interpretador.
     # @param arquivo : open() - buffer do arquivo de comandos.
+    # @param armazenamento : int - motor de armazenamento das caches (STORAGE_*).
+    # @param binario : bool - arquivo é um trace binário (ver src/trace.py),
+    #                         aberto em modo 'rb'.
+    # @param streaming : bool - executa cada comando assim que é lido, sem
+    #                           compilar o arquivo todo antes (memória constante).
+    # @param saida : Saida - destino e modo das mensagens dos comandos
+    #                        (por padrão imprime tudo).
+    # @param configuracao : dict - argumentos que substituem os dos comandos de
+    #                              construção do arquivo (ex. {'cl2': [c, a, l]}).
+    # @param somenteTags : bool - simula só tags e estado das linhas, sem guardar
+    #                             words; os níveis (e o relatório) são os mesmos,
+    #                             os valores lidos são 0 e os asserts só conferem
+    #                             o nível.
+    # @param classificarMisses : bool - classifica os misses de cada nível em
+    #                                   compulsórios, de capacidade e de conflito.
+    # @param contarConjuntos : bool - conta acessos, misses e substituições por
+    #                                 conjunto de cada nível (ver Relatorio.exportarConjuntos).
+    # @param perfil : Perfil - mede os tempos da execução e de cada comando,
+    #                          incluídos no relatório (None não mede nada).
+    # @param checkpoint : str - arquivo onde gravar o estado do simulador a cada
+    #                           intervaloCheckpoint acessos (None não grava).
+    # @param intervaloCheckpoint : int - comandos executados entre checkpoints
+    #                                    (registros, no trace binário).
+    # @param retomar : str - checkpoint de onde continuar a execução; a hierarquia
+    #                        é criada pelo arquivo, que deve ter a mesma construção,
+    #                        e os comandos seguem da posição salva.
+    # @param nucleos : list - arquivos texto abertos com os acessos de cada núcleo
+    #                         (o i-ésimo é do núcleo i), com um timestamp antes
+    #                         de cada um (ver __lerNucleo). Depois dos comandos do
+    #                         arquivo principal, eles são executados intercalados
+    #                         pelo timestamp, lidos conforme são executados.
     #
-    def __init__(self, arquivo):
+    # Com checkpoint ou retomar o arquivo texto é lido em streaming, linha a
+    # linha, para que a posição de cada comando seja conhecida.
+    #
+    # @raise CompilationError, ValueError.
+    #
+    def __init__(self, arquivo, armazenamento=STORAGE_OBJECTS, binario=False, streaming=False,
+                 saida=None, configuracao=None, somenteTags=False, classificarMisses=False,
+                 contarConjuntos=False, perfil=None, checkpoint=None, intervaloCheckpoint=1000000,
+                 retomar=None, nucleos=None):
+        self.__armazenamento = armazenamento
+        self.__somenteTags = somenteTags
+        self.__classificarMisses = classificarMisses
+        self.__contarConjuntos = contarConjuntos
+        self.__configuracao = configuracao if configuracao != None else {}
+
+        if checkpoint != None and (type(intervaloCheckpoint) != int or intervaloCheckpoint <= 0):
+            raise ValueError('Intervalo entre checkpoints deve ser um inteiro positivo.')
+
+        self.__arquivo = arquivo
+        self.__binario = binario
+        self.__checkpoint = checkpoint
+        self.__intervaloCheckpoint = intervaloCheckpoint
+
+        # Comandos executados (registros, no trace binário) e linhas lidas
+        # do arquivo texto, para a posição dos checkpoints.
+        self.__executados = 0
+        self.__numLinha = 0
+        self.__inicioRegistros = None
+
+        # Arquivos por núcleo e, para cada um, posição e linhas lidas depois
+        # do último acesso executado; fimPrincipal é a posição no arquivo
+        # principal, já todo executado, enquanto eles são executados.
+        self.__nucleos = nucleos if nucleos != None else []
+        self.__posicoesNucleos = [(0, 0)] * len(self.__nucleos)
+        self.__fimPrincipal = None
+
+        # Comandos de construção executados, para conferir a configuração
+        # ao retomar um checkpoint.
+        self.__construcao = []
+
+        posicionavel = checkpoint != None or retomar != None
+        if posicionavel:
+            streaming = True
+
+        self.__saida = saida if saida != None else Saida()
+        self.__imprimeComandos = self.__saida.imprimeComandos()
+        self.__imprimeFalhas = self.__saida.imprimeFalhas()
+        self.__escrever = self.__saida.escrever
+
         self.__L1D = None
         self.__L1I = None
         self.__L2 = None
@@ -119,10 +231,82 @@ class Interpreter:
         self.__PROC = None
 
         self.__relatorio = None
-        self.__comandos = self.__compilarArquivo(arquivo)
+        self.__perfil = perfil
+        self.__executar = self.executarComando if perfil == None else self.__executarMedindo
+
+        if perfil != None:
+            perfil.iniciar()
+            inicio = perf_counter()
+
+        if binario:
+            arquivoComandos = StringIO(lerCabecalho(arquivo))
+            self.__inicioRegistros = arquivo.tell()
+        else:
+            arquivoComandos = arquivo
+
+        if streaming:
+            comandos = self.__lerComandos(arquivoComandos, 0, posicionavel and not binario)
+        else:
+            comandos = iter(self.__compilarArquivo(arquivoComandos))
+
+        if perfil != None:
+            perfil.contabilizaLeitura(perf_counter() - inicio)
+            comandos = perfil.medirLeitura(comandos)
+
+        try:
+            if perfil != None:
+                perfil.iniciarFase('construção')
+            self.__crirarHierarquia(comandos)
+
+            if len(self.__nucleos) > self.__PROC.getNumCores():
+                raise ValueError('Mais arquivos por núcleo ({}) que núcleos ({}).'.format(
+                    len(self.__nucleos), self.__PROC.getNumCores()
+                    )
+                )
 
-        self.__crirarHierarquia()
-        self.__executarComandos()
+            if retomar != None:
+                comandos = self.__retomar(retomar)
+                if perfil != None:
+                    comandos = perfil.medirLeitura(comandos)
+
+            if perfil != None:
+                perfil.terminarFase()
+                perfil.iniciarFase('execução')
+                self.__relatorio.setPerfil(perfil)
+            self.__executarComandos(comandos, checkpoint != None and not binario)
+
+            if binario:
+                registros = lerRegistros(arquivo)
+                if perfil != None:
+                    registros = perfil.medirLeitura(registros)
+                self.__executarRegistros(registros)
+
+            if self.__nucleos != []:
+                if posicionavel:
+                    self.__fimPrincipal = arquivo.tell()
+                comandos = self.__intercalarNucleos(posicionavel)
+                if perfil != None:
+                    comandos = perfil.medirLeitura(comandos)
+                self.__executarComandos(comandos, checkpoint != None)
+
+            if perfil != None:
+                perfil.terminarFase()
+        except BaseException:
+            self.fechar()
+            raise
+        finally:
+            self.__saida.descarregar()
+            if perfil != None:
+                perfil.parar()
+
+    # Libera a memória principal (grava e desfaz o mapeamento da memória
+    # em arquivo). Chamado pelo construtor se a execução falhar; depois
+    # dela, deve ser chamado por quem criou o interpretador.
+    # @return None.
+    #
+    def fechar(self):
+        if self.__MP != None:
+            self.__MP.fechar()
 
     # Retorna uma referência para o objeto que compõe o relatório
     # de execução.
@@ -138,8 +322,22 @@ class Interpreter:
     # @return list.
     #
     def __compilarArquivo(self, arquivo):
-        lines = []
-        for num, line in enumerate(arquivo):
+        return list(self.__lerComandos(arquivo))
+
+    # Faz a análise sintática/léxica do arquivo de comandos linha a
+    # linha, gerando cada comando compilado assim que é lido.
+    # @param arquivo : open() - buffer do arquivo.
+    # @param numLinha : int - linhas já lidas antes da posição atual.
+    # @param posicionavel : bool - lê com readline, para que arquivo.tell()
+    #                              seja a posição depois do último comando
+    #                              gerado, e conta as linhas em self.__numLinha.
+    # @raise CompilationError.
+    # @return generator.
+    #
+    def __lerComandos(self, arquivo, numLinha=0, posicionavel=False):
+        linhas = iter(arquivo.readline, '') if posicionavel else arquivo
+
+        for num, line in enumerate(linhas, numLinha):
             lista = line.split()
             if lista == [] or line[0] == '#':
                 # Vazio ou Comentário, ignora e busca próxima linha.
@@ -148,11 +346,12 @@ class Interpreter:
                 try:
                     # Verifica o comando, senão lança erro de compilação.
                     cmd = self.__extrairComando(lista)
-                    lines.append(cmd)
                 except BaseException as e:
                     erro = CompilationError(e, num+1, arquivo)
                     raise erro
-        return lines
+                if posicionavel:
+                    self.__numLinha = num + 1
+                yield cmd
 
     # Extrai o comando de uma string para um formato que o interpretador
     # consegue executar (chave da instrução + argumentos inteiros).
@@ -164,99 +363,363 @@ class Interpreter:
         args = lista
 
         if cmd in self.comandosValidos:
-            length = len(self.comandosValidos[cmd].split())
-            if length == len(args):
-                return cmd, map(int, args)
+            formato = self.comandosValidos[cmd].split()
+            minimo = len([arg for arg in formato if arg[0] == '<'])
+            if minimo <= len(args) <= len(formato):
+                return cmd, [arg if tipo in self.argumentosTexto else int(arg)
+                             for tipo, arg in zip(formato, args)]
+            elif minimo == len(formato):
+                raise IndexError('Número de args incorreto. Esperado {}, dado {}.'.format(minimo, len(args)))
             else:
-                raise IndexError('Número de args incorreto. Esperado {}, dado {}.'.format(length, len(args)))
+                raise IndexError('Número de args incorreto. Esperado {} a {}, dado {}.'.format(
+                    minimo, len(formato), len(args)))
         else:
             raise KeyError('{} não é um comando válido.'.format(cmd))
 
+    # Faz a análise dos acessos do arquivo de um núcleo linha a linha,
+    # gerando cada um assim que é lido. Cada linha tem um timestamp
+    # (inteiro, não decrescente no arquivo) e um acesso sem o número do
+    # núcleo: '<timestamp> rd <addr>', '<timestamp> wd <addr> <value>',
+    # e da mesma forma ri, wi, assertd e asserti. Vazias e comentários
+    # (#) são ignorados.
+    # @param arquivo : open() - arquivo texto do núcleo.
+    # @param n : int - número do núcleo.
+    # @param numLinha : int - linhas já lidas antes da posição atual.
+    # @param posicionavel : bool - lê com readline e inclui em cada acesso a
+    #                              posição do arquivo depois dele.
+    # @raise CompilationError.
+    # @return generator - tuplas (timestamp, n, cmd, args, posição, linha).
+    #
+    def __lerNucleo(self, arquivo, n, numLinha=0, posicionavel=False):
+        linhas = iter(arquivo.readline, '') if posicionavel else arquivo
+        anterior = None
+
+        for num, line in enumerate(linhas, numLinha):
+            lista = line.split()
+            if lista == [] or line[0] == '#':
+                continue
+
+            try:
+                timestamp, cmd, args = self.__extrairAcesso(lista, n)
+                if anterior != None and timestamp < anterior:
+                    raise ValueError('Timestamp {} menor que o do acesso anterior ({}).'.format(
+                        timestamp, anterior
+                        )
+                    )
+            except BaseException as e:
+                erro = CompilationError(e, num+1, arquivo)
+                raise erro
+
+            anterior = timestamp
+            posicao = arquivo.tell() if posicionavel else None
+            yield timestamp, n, cmd, args, posicao, num + 1
+
+    # Extrai o timestamp e o comando de um acesso do arquivo de um núcleo,
+    # no formato dos comandos do arquivo principal (com o núcleo).
+    # @param lista : list - lista de string.
+    # @param n : int - número do núcleo.
+    # @return tuple - (timestamp, chave do comando, argumentos inteiros).
+    #
+    def __extrairAcesso(self, lista, n):
+        if len(lista) < 2:
+            raise IndexError('Acesso incompleto, esperado <timestamp> <comando> <args>.')
+
+        timestamp, cmd, args = int(lista[0]), lista[1], lista[2:]
+
+        if cmd not in NUM_ARGUMENTOS:
+            raise KeyError('{} não é um acesso válido.'.format(cmd))
+
+        if len(args) != NUM_ARGUMENTOS[cmd] - 1:
+            raise IndexError('Número de args incorreto. Esperado {}, dado {}.'.format(
+                NUM_ARGUMENTOS[cmd] - 1, len(args)))
+
+        return timestamp, cmd, [n] + [int(arg) for arg in args]
+
+    # Intercala os acessos dos arquivos por núcleo pelo timestamp, com um
+    # merge de k vias em heap que só guarda o próximo acesso de cada arquivo.
+    # Timestamps iguais saem na ordem dos núcleos. A posição de cada arquivo
+    # depois do último acesso gerado fica em self.__posicoesNucleos, de onde
+    # a leitura começa (0 ou a de um checkpoint retomado).
+    # @param posicionavel : bool - guarda as posições, para os checkpoints.
+    # @raise CompilationError.
+    # @return generator - comandos compilados.
+    #
+    def __intercalarNucleos(self, posicionavel=False):
+        fluxos = []
+        for n, arquivo in enumerate(self.__nucleos):
+            posicao, numLinha = self.__posicoesNucleos[n]
+            if posicionavel:
+                arquivo.seek(posicao)
+            fluxos.append(self.__lerNucleo(arquivo, n, numLinha, posicionavel))
+
+        for timestamp, n, cmd, args, posicao, numLinha in merge(*fluxos, key=itemgetter(0)):
+            if posicionavel:
+                self.__posicoesNucleos[n] = (posicao, numLinha)
+            yield cmd, args
+
+    # Cria uma cache de um dos comandos cl1d, cl1i, cl2 ou cl3.
+    # @param args : list - argumentos do comando (c, a, l e política opcional).
+    # @return SACache.
+    #
+    def __criarSACache(self, args):
+        c, a, l = args[:3]
+        politica = args[3] if len(args) > 3 else POLITICA_FIFO
+        return SACache(c, a, l, self.__armazenamento, politica, not self.__somenteTags,
+                       self.__classificarMisses, self.__contarConjuntos)
+
     # Cria a hierarquia toda executando os comandos na ordem correta.
     # Inicializa os atributos conforme comandos do arquivo.
+    # @param comandos : iterator - comandos compilados, consome os 7 primeiros.
     # @return None.
     #
-    def __crirarHierarquia(self):
+    def __crirarHierarquia(self, comandos):
         # 7 comandos executados em ordem.
         ordem = ('cl1d','cl1i','cl2','cl3','cmp','cmem','cp')
 
         for i in range(7):
-            cmd, args = self.__comandos[i]
+            cmd, args = next(comandos, (None, None))
             if cmd != ordem[i]:
                 raise RuntimeError('Construção da hierarquia falhou (comandos fora da ordem definida).')
 
-            elif i == 0:
-                c, a, l = args
-                aux = self.__L1D = SACache(c, a, l)
+            args = self.__configuracao.get(cmd, args)
+            self.__construcao.append((cmd, list(args)))
+
+            if i == 0:
+                aux = self.__L1D = self.__criarSACache(args)
 
-                print('Criado cache L1d (lookup {}, offset {}, tag {}).'.format(
-                    aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                if self.__imprimeComandos:
+                    self.__escrever('Criado cache L1d (lookup {}, offset {}, tag {}).'.format(
+                        aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                        )
                     )
-                )
 
             elif i == 1:
-                c, a, l = args
-                aux = self.__L1I = SACache(c, a, l)
+                aux = self.__L1I = self.__criarSACache(args)
 
-                print('Criado cache L1i (lookup {}, offset {}, tag {}).'.format(
-                    aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                if self.__imprimeComandos:
+                    self.__escrever('Criado cache L1i (lookup {}, offset {}, tag {}).'.format(
+                        aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                        )
                     )
-                )
 
             elif i == 2:
-                c, a, l = args
-                aux = self.__L2 = SACache(c, a, l)
+                aux = self.__L2 = self.__criarSACache(args)
 
-                print('Criado cache L2 (lookup {}, offset {}, tag {}).'.format(
-                    aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                if self.__imprimeComandos:
+                    self.__escrever('Criado cache L2 (lookup {}, offset {}, tag {}).'.format(
+                        aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                        )
                     )
-                )
 
             elif i == 3:
-                c, a, l = args
-                aux = self.__L3 = SACache(c, a, l)
+                aux = self.__L3 = self.__criarSACache(args)
 
-                print('Criado cache L3 (lookup {}, offset {}, tag {}).'.format(
-                    aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                if self.__imprimeComandos:
+                    self.__escrever('Criado cache L3 (lookup {}, offset {}, tag {}).'.format(
+                        aux.getTamLookup(), aux.getTamOffset(), aux.getTamTag()
+                        )
                     )
-                )
 
             elif i == 4:
-                ramsize, vmsize = args
-                aux = self.__MP = MainMemory(ramsize, vmsize)
-
-                print('Criada memória principal (capacidade {} bytes, endereços [0, {}]).'.format(
-                    aux.getTamTotal(), aux.getTamTotal() - 1
+                if len(args) == 3:
+                    aux = self.__MP = MappedMainMemory(*args, not self.__somenteTags)
+                else:
+                    ramsize, vmsize = args
+                    aux = self.__MP = MainMemory(ramsize, vmsize, not self.__somenteTags)
+
+                if self.__imprimeComandos:
+                    self.__escrever('Criada memória principal (capacidade {} bytes, endereços [0, {}]).'.format(
+                        aux.getTamTotal(), aux.getTamTotal() - 1
+                        )
                     )
-                )
 
             elif i == 5:
-                cache = Cache(self.__L1D, self.__L1I, self.__L2, self.__L3)
+                escrita = args[0] if len(args) > 0 else ESCRITA_WRITE_THROUGH
+                coerencia = args[1] if len(args) > 1 else None
+                cache = Cache(self.__L1D, self.__L1I, self.__L2, self.__L3, escrita, coerencia)
                 memprinc = self.__MP
                 self.__relatorio = Relatorio(cache, memprinc)
                 self.__MEM = Memory(cache, memprinc)
 
-                print('Criada hierarquia de memória.')
+                if self.__imprimeComandos:
+                    detalhes = []
+                    if escrita == ESCRITA_WRITE_BACK:
+                        detalhes.append('write-back')
+                    if coerencia != None:
+                        detalhes.append('coerência {}'.format(coerencia.upper()))
+
+                    if detalhes != []:
+                        self.__escrever('Criada hierarquia de memória ({}).'.format(', '.join(detalhes)))
+                    else:
+                        self.__escrever('Criada hierarquia de memória.')
 
             elif i == 6:
                 n = tuple(args)[0]
                 aux = self.__PROC = Processor(self.__MEM, n)
+                self.__relatorio.setProcessador(aux)
 
-                print('Criada CPU com {} núcleos.'.format(aux.getNumCores()))
+                if self.__imprimeComandos:
+                    self.__escrever('Criada CPU com {} núcleos.'.format(aux.getNumCores()))
 
             else:
                 raise RuntimeError('Isso não deveria ter acontecido!')
 
-    # Executa todos os comandos de leitura/escrita do arquivo de uma vez.
+    # Configuração da hierarquia e opções que mudam o estado salvo nos
+    # checkpoints, que precisam ser as mesmas ao retomar.
+    # @return dict.
+    #
+    def __getConfiguracao(self):
+        return {
+            'construcao': self.__construcao,
+            'armazenamento': self.__armazenamento,
+            'somenteTags': self.__somenteTags,
+            'classificarMisses': self.__classificarMisses,
+            'contarConjuntos': self.__contarConjuntos,
+            'binario': self.__binario,
+            'nucleos': len(self.__nucleos),
+        }
+
+    # Grava o estado do simulador no arquivo de checkpoint: hierarquia de
+    # todos os núcleos (com o L3 e a memória principal), contagens do
+    # relatório e posição no arquivo de comandos e nos arquivos por núcleo.
+    # As mensagens acumuladas são escritas antes, para a saída acompanhar
+    # o checkpoint.
+    # @return None.
+    #
+    def __gravarCheckpoint(self):
+        self.__saida.descarregar()
+
+        if self.__fimPrincipal != None:
+            posicao = self.__fimPrincipal
+        elif self.__binario:
+            posicao = self.__inicioRegistros + self.__executados * REGISTRO.size
+        else:
+            posicao = self.__arquivo.tell()
+
+        gravarCheckpoint(self.__checkpoint, {
+            'configuracao': self.__getConfiguracao(),
+            'posicao': posicao,
+            'linha': self.__numLinha,
+            'executados': self.__executados,
+            'nucleos': list(self.__posicoesNucleos),
+            'processador': self.__PROC.getEstado(),
+            'relatorio': self.__relatorio.getEstado(),
+        })
+
+    # Restaura o estado de um checkpoint na hierarquia recém-criada e
+    # posiciona o arquivo de comandos depois do último comando executado
+    # (os arquivos por núcleo são posicionados ao serem intercalados).
+    # @param caminho : str - arquivo do checkpoint.
+    # @raise ValueError.
+    # @return iterator - comandos texto restantes (nenhum no trace binário,
+    #                    cujo cabeçalho já tinha sido executado).
+    #
+    def __retomar(self, caminho):
+        estado = lerCheckpoint(caminho)
+
+        if estado['configuracao'] != self.__getConfiguracao():
+            raise ValueError('Checkpoint "{}" foi gravado com outra hierarquia ou outras opções.'.format(caminho))
+
+        self.__PROC.setEstado(estado['processador'])
+        self.__relatorio.setEstado(estado['relatorio'])
+        self.__executados = estado['executados']
+        self.__numLinha = estado['linha']
+        self.__posicoesNucleos = list(estado['nucleos'])
+        self.__arquivo.seek(estado['posicao'])
+
+        if self.__imprimeComandos:
+            self.__escrever('Retomado checkpoint "{}" ({} comandos executados).'.format(
+                caminho, self.__executados
+                )
+            )
+
+        if self.__binario:
+            return iter(())
+        else:
+            return self.__lerComandos(self.__arquivo, self.__numLinha, True)
+
+    # Executa todos os comandos de leitura/escrita restantes, na ordem.
+    # @param comandos : iterable - comandos compilados.
+    # @param checkpoints : bool - conta os comandos e grava os checkpoints.
     # @return None.
     #
-    def __executarComandos(self):
-        for i in range(7, len(self.__comandos)):
-            cmd, args = self.__comandos[i]
+    def __executarComandos(self, comandos, checkpoints=False):
+        executar = self.__executarComCheckpoint if checkpoints else self.__executar
+
+        for cmd, args in comandos:
             if cmd in ('cl1d','cl1i','cl2','cl3','cmp','cmem','cp'):
                 raise RuntimeError('Comando de construção de hierarquia fora do lugar.')
             else:
-                self.executarComando(cmd, args)
+                executar(cmd, args)
+
+    # Executa um comando e grava um checkpoint a cada intervaloCheckpoint.
+    # @param cmd : str - chave do comando.
+    # @param args : list - lista de parâmetros.
+    # @return None.
+    #
+    def __executarComCheckpoint(self, cmd, args):
+        self.__executar(cmd, args)
+        self.__executados += 1
+        if self.__executados % self.__intervaloCheckpoint == 0:
+            self.__gravarCheckpoint()
+
+    # Executa um comando medindo o tempo (modo de perfil).
+    # @param cmd : str - chave do comando.
+    # @param args : list - lista de parâmetros.
+    # @return None.
+    #
+    def __executarMedindo(self, cmd, args):
+        inicio = perf_counter()
+        self.executarComando(cmd, args)
+        self.__perfil.comando(cmd, perf_counter() - inicio)
+
+    # Executa os registros de um trace binário conforme são lidos, sem
+    # convertê-los em comandos texto.
+    # @param registros : iterable - tuplas (op, level, n, addr, value).
+    # @return None.
+    #
+    def __executarRegistros(self, registros):
+        if self.__perfil != None or self.__checkpoint != None:
+            self.__executarComandos(self.__comandosDosRegistros(registros), self.__checkpoint != None)
+            return
+
+        for op, level, n, addr, value in registros:
+            if op == OP_RD:
+                self.rd(n, addr)
+            elif op == OP_WD:
+                self.wd(n, addr, value)
+            elif op == OP_RI:
+                self.ri(n, addr)
+            elif op == OP_WI:
+                self.wi(n, addr, value)
+            elif op == OP_ASSERTD:
+                self.assertd(n, addr, level, value)
+            elif op == OP_ASSERTI:
+                self.asserti(n, addr, level, value)
+            else:
+                raise RuntimeError('Comando inválido.')
+
+    # Converte os registros de um trace binário em comandos, para serem
+    # executados pelo mesmo caminho dos comandos texto (modo de perfil e
+    # checkpoints).
+    # @param registros : iterable - tuplas (op, level, n, addr, value).
+    # @raise RuntimeError.
+    # @return generator.
+    #
+    def __comandosDosRegistros(self, registros):
+        for op, level, n, addr, value in registros:
+            if not 0 <= op < len(OPERACOES):
+                raise RuntimeError('Comando inválido.')
+
+            cmd = OPERACOES[op]
+            if op in (OP_RD, OP_RI):
+                args = (n, addr)
+            elif op in (OP_WD, OP_WI):
+                args = (n, addr, value)
+            else:
+                args = (n, addr, level, value)
+
+            yield cmd, args
 
     # Executa um comando só, passando a instrução e a lista de argumentos.
     # @param cmd : str - chave do comando.
@@ -264,7 +727,7 @@ class Interpreter:
     # @return None.
     #
     def executarComando(self, cmd, args):
-        if cmd not in ('ri', 'wi', 'rd', 'wd', 'asserti', 'assertd'):
+        if cmd not in ('ri', 'wi', 'rd', 'wd', 'asserti', 'assertd', 'limg'):
             raise RuntimeError('Comando inválido.')
 
         elif cmd == 'ri':
@@ -291,14 +754,23 @@ class Interpreter:
             n, addr, level, value = args
             self.assertd(n, addr, level, value)
 
+        elif cmd == 'limg':
+            addr, arquivo = args
+            self.limg(addr, arquivo)
+
         else:
             raise RuntimeError('Isso não deveria ter acontecido!')
 
     # Contabiliza hit
     # @param nivel : int - nível do hit/erro
+    # @param n : int - núcleo do acesso.
+    # @param instrucao : bool - acesso de instrução.
+    # @param escrita : bool - acesso de escrita.
     # @return None.
     #
-    def contabilizaHit(self, nivel):
+    def contabilizaHit(self, nivel, n=0, instrucao=False, escrita=False):
+        self.__relatorio.acesso(n, instrucao, escrita, nivel)
+
         if nivel == FOUND_IN_L1:
             self.__relatorio.hit1()
         elif nivel == FOUND_IN_L2:
@@ -313,69 +785,98 @@ class Interpreter:
     # Executa comando específico.
     #
     def ri(self, n, addr):
-        pointer = Word()
-        x = self.__PROC.getCore(n).getInstrucao(addr, pointer)
+        x, valor = self.__PROC.getCore(n).getInstrucao(addr)
 
-        self.contabilizaHit(x)
+        self.contabilizaHit(x, n, True, False)
 
-        if pointer.get() != None:
-            print('Obtida instrução "{}" no nivel {}'.format(pointer.get(), x))
-        else:
-            print('Endereço fora da faixa.')
+        if self.__imprimeComandos:
+            if valor != None:
+                self.__escrever('Obtida instrução "{}" no nivel {}'.format(valor, x))
+            else:
+                self.__escrever('Endereço fora da faixa.')
 
     # Executa comando específico.
     #
     def wi(self, n, addr, value):
-        pointer = Word(value)
-        x = self.__PROC.getCore(n).setInstrucao(addr, pointer)
+        x = self.__PROC.getCore(n).setInstrucao(addr, value)
 
-        self.contabilizaHit(x)
+        self.contabilizaHit(x, n, True, True)
 
-        print('Salvo instrução "{}" no nível {}.'.format(pointer.get(), x))
+        if self.__imprimeComandos:
+            self.__escrever('Salvo instrução "{}" no nível {}.'.format(value, x))
 
     # Executa comando específico.
     #
     def rd(self, n, addr):
-        pointer = Word()
-        x = self.__PROC.getCore(n).getDado(addr, pointer)
+        x, valor = self.__PROC.getCore(n).getDado(addr)
 
-        self.contabilizaHit(x)
+        self.contabilizaHit(x, n, False, False)
 
-        if pointer.get() != None:
-            print('Obtido dado "{}" no nivel {}'.format(pointer.get(), x))
-        else:
-            print('Endereço fora da faixa.')
+        if self.__imprimeComandos:
+            if valor != None:
+                self.__escrever('Obtido dado "{}" no nivel {}'.format(valor, x))
+            else:
+                self.__escrever('Endereço fora da faixa.')
 
     # Executa comando específico.
     #
     def wd(self, n, addr, value):
-        pointer = Word(value)
-        x = self.__PROC.getCore(n).setDado(addr, pointer)
+        x = self.__PROC.getCore(n).setDado(addr, value)
 
-        self.contabilizaHit(x)
+        self.contabilizaHit(x, n, False, True)
 
-        print('Salvo dado "{}" no nível {}.'.format(pointer.get(), x))
+        if self.__imprimeComandos:
+            self.__escrever('Salvo dado "{}" no nível {}.'.format(value, x))
 
     # Executa comando específico.
     #
     def asserti(self, n, addr, level, value):
-        pointer = Word()
-        x = self.__PROC.getCore(n).getInstrucao(addr, pointer)
-
-        self.contabilizaHit(x)
+        x, valor = self.__PROC.getCore(n).getInstrucao(addr)
 
-        if x == level and pointer.get() == value:
-            print('OK.')
-        else:
-            print('ERRADO.')
+        self.contabilizaHit(x, n, True, False)
+        self.__resultadoAssert('asserti', n, addr, level, value, x, valor)
 
     # Executa comando específico.
     #
     def assertd(self, n, addr, level, value):
-        pointer = Word()
-        x = self.__PROC.getCore(n).getDado(addr, pointer)
+        x, valor = self.__PROC.getCore(n).getDado(addr)
 
-        if x == level and pointer.get() == value:
-            print('OK.')
-        else:
-            print('ERRADO.')
\ No newline at end of file
+        self.contabilizaHit(x, n, False, False)
+        self.__resultadoAssert('assertd', n, addr, level, value, x, valor)
+
+    # Informa o resultado de um assert conforme o modo de saída. No modo
+    # só de falhas, a mensagem traz o comando e o que foi lido. Um valor
+    # esperado negativo é comparado em complemento de dois, como é guardado.
+    # @return None.
+    #
+    def __resultadoAssert(self, cmd, n, addr, level, value, nivelLido, valorLido):
+        esperado = value & MASCARA_WORD if value < 0 else value
+
+        if nivelLido == level and (valorLido == esperado or self.__somenteTags):
+            if self.__imprimeComandos:
+                self.__escrever('OK.')
+        elif self.__imprimeComandos:
+            self.__escrever('ERRADO.')
+        elif self.__imprimeFalhas:
+            self.__escrever('ERRADO: {} {} {} {} {} (lido "{}" no nível {}).'.format(
+                cmd, n, addr, level, value, valorLido, nivelLido
+                )
+            )
+
+    # Executa comando específico.
+    #
+    def limg(self, addr, arquivo):
+        total = 0
+        with open(arquivo, 'rb') as imagem:
+            tamanho = fstat(imagem.fileno()).st_size
+            self.__MP.verificarImagem(addr, tamanho)
+            self.__PROC.invalidarFaixa(addr, tamanho)
+
+            bloco = imagem.read(self.tamBlocoImagem)
+            while bloco:
+                self.__MP.carregarImagem(addr + total, bloco)
+                total += len(bloco)
+                bloco = imagem.read(self.tamBlocoImagem)
+
+        if self.__imprimeComandos:
+            self.__escrever('Carregada imagem "{}" ({} bytes) no endereço {}.'.format(arquivo, total, addr))
@@ -0,0 +1,196 @@
+import struct
+
+
+# Formato binário do arquivo de comandos (trace):
+#
+#   cabeçalho : 'SMCT' + versão (uint16) + tamanho do texto (uint32) + texto
+#   registros : op (uint8), level (uint8), n (int16), addr (int64), value (int64)
+#
+# O texto do cabeçalho são os comandos que vêm antes do primeiro acesso
+# (construção da hierarquia, limg...), no formato do arquivo texto. Cada
+# acesso vira um registro de tamanho fixo, little-endian.
+
+MAGIC = b'SMCT'
+VERSAO = 1
+
+CABECALHO = struct.Struct('<4sHI')
+REGISTRO = struct.Struct('<BBhqq')
+
+# Código de cada operação no campo op (posição na tupla).
+OPERACOES = ('ri', 'wi', 'rd', 'wd', 'asserti', 'assertd')
+OP_RI, OP_WI, OP_RD, OP_WD, OP_ASSERTI, OP_ASSERTD = range(len(OPERACOES))
+
+# Número de argumentos inteiros de cada operação no arquivo texto.
+NUM_ARGUMENTOS = {'ri': 2, 'wi': 3, 'rd': 2, 'wd': 3, 'asserti': 4, 'assertd': 4}
+
+# Registros lidos por vez do arquivo.
+REGISTROS_POR_BLOCO = 65536
+
+
+# Verifica se o arquivo no caminho é um trace binário.
+#
+# @param caminho : str - caminho do arquivo.
+#
+# @return bool.
+#
+def ehTraceBinario(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read(len(MAGIC)) == MAGIC
+
+
+# Converte um arquivo de comandos texto para o formato binário.
+#
+# @param entrada : open() - arquivo texto de comandos.
+# @param saida : open() - arquivo binário de destino (modo 'wb').
+#
+# @raise ValueError.
+#
+# @return int - número de registros escritos.
+#
+def converterTrace(entrada, saida):
+    cabecalho = []      # None depois do primeiro acesso
+    bloco = []
+    total = 0
+
+    for num, line in enumerate(entrada):
+        lista = line.split()
+        if lista == [] or line[0] == '#':
+            continue
+
+        cmd = lista[0]
+        if cmd not in NUM_ARGUMENTOS:
+            if cabecalho == None:
+                raise ValueError('Linha {}: {} depois de um acesso não é suportado no formato binário.'.format(num+1, cmd))
+            cabecalho.append(' '.join(lista))
+            continue
+
+        if cabecalho != None:
+            escreverCabecalho(saida, cabecalho)
+            cabecalho = None
+
+        args = [int(x) for x in lista[1:]]
+        if len(args) != NUM_ARGUMENTOS[cmd]:
+            raise ValueError('Linha {}: número de args incorreto.'.format(num+1))
+
+        bloco.append(empacotarRegistro(OPERACOES.index(cmd), args))
+
+        if len(bloco) == REGISTROS_POR_BLOCO:
+            saida.write(b''.join(bloco))
+            total += len(bloco)
+            bloco = []
+
+    if cabecalho != None:
+        escreverCabecalho(saida, cabecalho)
+
+    saida.write(b''.join(bloco))
+    return total + len(bloco)
+
+
+# Escreve o cabeçalho do trace binário.
+#
+# @param saida : open() - arquivo binário de destino.
+# @param comandos : list - linhas de comando do cabeçalho.
+#
+# @return None.
+#
+def escreverCabecalho(saida, comandos):
+    texto = '\n'.join(comandos).encode('utf-8')
+    saida.write(CABECALHO.pack(MAGIC, VERSAO, len(texto)))
+    saida.write(texto)
+
+
+# Monta a tupla de registro (op, level, n, addr, value) de um acesso.
+#
+# @param op : int - código da operação.
+# @param args : list - argumentos inteiros do comando.
+#
+# @return tuple.
+#
+def montarRegistro(op, args):
+    n, addr = args[0], args[1]
+    level = value = 0
+
+    if len(args) == 3:
+        value = args[2]
+    elif len(args) == 4:
+        level, value = args[2], args[3]
+
+    return op, level, n, addr, value
+
+
+# Empacota um acesso em um registro.
+#
+# @param op : int - código da operação.
+# @param args : list - argumentos inteiros do comando.
+#
+# @return bytes.
+#
+def empacotarRegistro(op, args):
+    return REGISTRO.pack(*montarRegistro(op, args))
+
+
+# Lê o cabeçalho de um trace binário.
+#
+# @param arquivo : open() - arquivo binário posicionado no início.
+#
+# @raise ValueError.
+#
+# @return str - comandos do cabeçalho, um por linha.
+#
+def lerCabecalho(arquivo):
+    dados = arquivo.read(CABECALHO.size)
+    if len(dados) != CABECALHO.size:
+        raise ValueError('Trace binário sem cabeçalho.')
+
+    magic, versao, tamanho = CABECALHO.unpack(dados)
+    if magic != MAGIC:
+        raise ValueError('Arquivo não é um trace binário.')
+    if versao != VERSAO:
+        raise ValueError('Versão de trace binário não suportada: {}.'.format(versao))
+
+    return arquivo.read(tamanho).decode('utf-8')
+
+
+# Lê os registros de um trace binário em blocos grandes, depois do
+# cabeçalho. Gera tuplas (op, level, n, addr, value).
+#
+# @param arquivo : open() - arquivo binário posicionado após o cabeçalho.
+# @param registrosPorBloco : int - registros lidos por vez.
+#
+# @raise ValueError.
+#
+# @return generator.
+#
+def lerRegistros(arquivo, registrosPorBloco=REGISTROS_POR_BLOCO):
+    tamBloco = REGISTRO.size * registrosPorBloco
+
+    while True:
+        dados = arquivo.read(tamBloco)
+        if not dados:
+            return
+        if len(dados) % REGISTRO.size != 0:
+            raise ValueError('Trace binário truncado.')
+        yield from REGISTRO.iter_unpack(dados)
+
+
+# Lê os acessos de um arquivo de comandos texto como registros, ignorando
+# os demais comandos. Gera as mesmas tuplas que lerRegistros.
+#
+# @param arquivo : open() - arquivo texto de comandos.
+#
+# @raise ValueError.
+#
+# @return generator.
+#
+def lerRegistrosTexto(arquivo):
+    for num, line in enumerate(arquivo):
+        lista = line.split()
+        if lista == [] or line[0] == '#' or lista[0] not in NUM_ARGUMENTOS:
+            continue
+
+        cmd = lista[0]
+        args = [int(x) for x in lista[1:]]
+        if len(args) != NUM_ARGUMENTOS[cmd]:
+            raise ValueError('Linha {}: número de args incorreto.'.format(num+1))
+
+        yield montarRegistro(OPERACOES.index(cmd), args)
@@ -1,3 +1,6 @@
+from src.constantes import *
+
+
 # Verifica se x é potência de 2.
 # 
 # @param x : int - número a ser verificado. 
@@ -39,6 +42,23 @@ def log2(x):
     return cont
 
 
+# Copia um buffer do estado salvo de uma cache ou política (ver os
+# métodos getEstado), que deve ter o tipo e o tamanho do buffer em uso.
+#
+# @param atual : array ou bytearray - buffer em uso.
+# @param salvo : array ou bytearray - buffer do estado salvo.
+#
+# @raise ValueError.
+#
+# @return array ou bytearray - cópia de salvo.
+#
+def copiarBuffer(atual, salvo):
+    if type(salvo) != type(atual) or len(salvo) != len(atual) \
+            or getattr(salvo, 'typecode', None) != getattr(atual, 'typecode', None):
+        raise ValueError('Estado salvo incompatível com a hierarquia (buffer de tipo ou tamanho diferente).')
+    return salvo[:]
+
+
 class Word:
     # Cria uma palavra de 32 bits (4 bytes).
     #
@@ -55,7 +75,8 @@ class Word:
         if valor != None:
             self.set(valor)
     
-    # Método set, para mudar o valor da variável.
+    # Método set, para mudar o valor da variável. Valores negativos
+    # ficam em complemento de dois.
     #
     # @param valor : int - novo valor.
     #
@@ -69,7 +90,7 @@ class Word:
         if valor.bit_length() > 32:
             raise ValueError('Tamanho da word deve ser no máx. 32 bits.')
 
-        self.__valor = valor
+        self.__valor = valor & MASCARA_WORD
     
     # Método para obter o valor da variável.
     #
@@ -0,0 +1,154 @@
+from src.interpreter import Interpreter
+from src.interpreter import CompilationError
+from src.trace import ehTraceBinario
+from src.Saida import Saida
+from src.constantes import *
+from argparse import ArgumentParser
+from itertools import product
+from multiprocessing import Pool
+from traceback import print_exc
+from sys import stdout
+from sys import stderr
+import os
+
+
+# Ordem dos níveis na configuração e nas colunas da tabela.
+NIVEIS = ('cl1d', 'cl1i', 'cl2', 'cl3', 'cmp', 'cmem')
+
+
+# Executa o trace com uma configuração, sem imprimir os comandos e só
+# com as tags (as contagens não dependem dos valores). Roda em um
+# processo do pool, então recebe e devolve só dados simples.
+#
+# @param tarefa : tuple - (caminho do trace, dict de configuração).
+#
+# @return tuple - (configuração, dict de contagens ou None, mensagem de erro ou None).
+#
+def simular(tarefa):
+    filePath, configuracao = tarefa
+    binario = ehTraceBinario(filePath)
+
+    try:
+        with open(filePath, 'rb' if binario else 'r') as arquivo:
+            simulador = Interpreter(arquivo, binario=binario, streaming=True,
+                                    saida=Saida(SAIDA_SILENCIOSA), configuracao=configuracao,
+                                    somenteTags=True)
+            simulador.fechar()
+            return configuracao, simulador.getRelatorio().getContagens(), None
+    except CompilationError as e:
+        return configuracao, None, e.getMessage()
+    except Exception as e:
+        return configuracao, None, '{}: {}'.format(type(e).__name__, e)
+
+
+# Monta todas as combinações da grade. Níveis sem valores ficam com os
+# parâmetros do próprio trace.
+#
+# @param grade : dict - nível -> lista de listas de argumentos.
+#
+# @return list - dicts de configuração.
+#
+def combinacoes(grade):
+    niveis = [n for n in NIVEIS if grade.get(n)]
+    return [dict(zip(niveis, valores)) for valores in product(*(grade[n] for n in niveis))]
+
+
+# Converte 'c,a,l[,politica]' em lista de argumentos, inteiros exceto
+# a política.
+#
+# @param texto : str.
+#
+# @return list.
+#
+def parametros(texto):
+    return [int(x) if x.isdigit() else x for x in texto.split(',')]
+
+
+# Formata a configuração de um nível para a tabela.
+#
+def formatar(configuracao, nivel):
+    args = configuracao.get(nivel)
+    return 'trace' if args == None else ','.join(str(x) for x in args)
+
+
+# Executa todas as configurações em paralelo e imprime uma tabela com as
+# contagens do relatório de cada uma.
+#
+# @param filePath : str - caminho do arquivo de comandos (texto ou trace binário).
+# @param grade : dict - nível -> lista de listas de argumentos.
+# @param processos : int - processos do pool.
+# @param csv : bool - imprime em CSV em vez de tabela; as falhas e o resumo
+#                     vão para a saída de erro, para o CSV ficar só com as linhas.
+#
+def main(filePath, grade, processos, csv=False):
+    tarefas = [(filePath, c) for c in combinacoes(grade)]
+    colunas = NIVEIS + ('L1', 'L2', 'L3', 'MEM', 'erros')
+    codigos = (FOUND_IN_L1, FOUND_IN_L2, FOUND_IN_L3, FOUND_IN_MEM, ADDRESS_OUT_OF_RANGE)
+
+    if csv:
+        print(';'.join(colunas))
+    else:
+        linha = '+' + '+'.join('-' * 21 for _ in NIVEIS) + '+' + '+'.join('-' * 12 for _ in codigos) + '+'
+        print(linha)
+        print('|' + '|'.join(' {:^19} '.format(x) for x in NIVEIS) + '|'
+                  + '|'.join(' {:^10} '.format(x) for x in colunas[len(NIVEIS):]) + '|')
+        print(linha)
+
+    falhas = 0
+    avisos = stderr if csv else stdout
+
+    # imap mantém a ordem da grade na tabela.
+    with Pool(processos) as pool:
+        for configuracao, contagens, erro in pool.imap(simular, tarefas):
+            niveis = [formatar(configuracao, n) for n in NIVEIS]
+
+            if erro != None:
+                falhas += 1
+                valores = ['-'] * len(codigos)
+            else:
+                valores = [str(contagens[x]) for x in codigos]
+
+            if csv:
+                print(';'.join(niveis + valores))
+            else:
+                print('|' + '|'.join(' {:>19} '.format(x) for x in niveis) + '|'
+                          + '|'.join(' {:>10} '.format(x) for x in valores) + '|')
+
+            if erro != None and csv:
+                print('{}: falhou: {}'.format(';'.join(niveis), erro), file=avisos)
+            elif erro != None:
+                print('  falhou: {}'.format(erro))
+
+    if not csv:
+        print(linha)
+
+    print('{} configurações, {} com falha.'.format(len(tarefas), falhas), file=avisos)
+
+
+
+# Faz a correção dos parâmetros se o arquivo for executado direto
+# do terminal.
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Varredura de configurações da hierarquia em paralelo.')
+    parser.add_argument('arquivo', help='arquivo de comandos (texto ou trace binário)')
+    for nivel in NIVEIS[:4]:
+        parser.add_argument('--' + nivel, type=parametros, nargs='+', metavar='C,A,L[,POLITICA]',
+                            help='configurações de {} (padrão: a do trace)'.format(nivel))
+    parser.add_argument('--cmp', type=parametros, nargs='+', metavar='RAM,VM',
+                        help='configurações da memória principal (padrão: a do trace)')
+    parser.add_argument('--cmem', nargs='+', choices=(ESCRITA_WRITE_THROUGH, ESCRITA_WRITE_BACK),
+                        help='políticas de escrita da hierarquia (padrão: a do trace)')
+    parser.add_argument('--processos', type=int, default=os.cpu_count(),
+                        help='processos simultâneos (padrão: número de núcleos)')
+    parser.add_argument('--csv', action='store_true', help='imprime em CSV separado por ";"')
+    args = parser.parse_args()
+
+    grade = {n: getattr(args, n) for n in NIVEIS}
+    if grade['cmem'] != None:
+        grade['cmem'] = [[x] for x in grade['cmem']]
+
+    try:
+        main(args.arquivo, grade, args.processos, args.csv)
+    except:
+        print_exc()
+        exit(1)